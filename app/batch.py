@@ -0,0 +1,104 @@
+import csv
+import time
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+from loguru import logger
+
+from app.client import SZUNetworkClient
+
+
+class Account(NamedTuple):
+    """One row of an accounts CSV."""
+    username: str
+    password: str
+    ip: str = ""  # Optional fixed IP to authenticate (defaults to the local IP)
+
+
+@dataclass
+class VerificationResult:
+    """Outcome of checking one account."""
+    username: str
+    success: bool
+    latency_ms: float
+    error: str = ""
+
+
+def load_accounts(path) -> List[Account]:
+    """
+    Load accounts from a CSV file with `username,password[,ip]` rows.
+    A header row is optional; blank lines and rows starting with '#' are skipped.
+    """
+    accounts = []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"Malformed account row (expected username,password): {row[0]!r}")
+            username, password = row[0].strip(), row[1].strip()
+            if username.lower() == 'username' and password.lower() == 'password':
+                continue
+            ip = row[2].strip() if len(row) > 2 else ""
+            accounts.append(Account(username, password, ip))
+    return accounts
+
+
+def verify_account(username: str, password: str, ip: str = "") -> VerificationResult:
+    """Check one account on its own client (own session, own state)."""
+    start = time.perf_counter()
+    client = None
+    try:
+        client = SZUNetworkClient(username=username, password=password, ip=ip or None)
+        success = client.login()
+        error = "" if success else (client.last_error or "Unknown error")
+    except Exception as e:
+        success, error = False, str(e) or type(e).__name__
+    finally:
+        if client is not None:
+            client.close()
+    latency_ms = (time.perf_counter() - start) * 1000
+    return VerificationResult(username, success, latency_ms, error)
+
+
+def verify_accounts(accounts: Iterable[Account], max_workers: int = 8,
+                    on_result: Optional[Callable[[VerificationResult], None]] = None) -> List[VerificationResult]:
+    """
+    Verify many accounts concurrently with a bounded worker pool.
+
+    Args:
+        accounts: Account rows (or plain (username, password) pairs).
+        max_workers: Upper bound on concurrent portal logins.
+        on_result: Optional callback invoked for each result as it is collected.
+
+    Returns:
+        List[VerificationResult] in input order.
+    """
+    accounts = list(accounts)
+    logger.info(f"Verifying {len(accounts)} accounts with {max_workers} workers")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="verify") as pool:
+        futures = [pool.submit(verify_account, *account) for account in accounts]
+        results = []
+        for future in futures:
+            result = future.result()
+            if on_result:
+                on_result(result)
+            results.append(result)
+
+    ok = sum(1 for r in results if r.success)
+    logger.info(f"Verification finished: {ok}/{len(results)} accounts valid")
+    return results
+
+
+def write_report(results: Iterable[VerificationResult], path):
+    """Write verification results to a CSV report."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["username", "success", "latency_ms", "error"])
+        for r in results:
+            writer.writerow([r.username, int(r.success), f"{r.latency_ms:.1f}", r.error])
@@ -0,0 +1,284 @@
+import sys
+import time
+import queue
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+
+# --- Local stand-in for the 204 probe endpoint (runs in its own process) ---
+
+class _ProbeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so socket probes can reuse their connection
+
+    def _reply(self):
+        # Request line + headers as received: what the client actually put on the wire
+        size = len(self.requestline) + 2 + len(str(self.headers))
+        with self.server.bytes_received.get_lock():
+            self.server.bytes_received.value += size
+            self.server.requests.value += 1
+        if self.server.online.value:
+            self.send_response(204)
+        else:
+            # Captive portal behaviour: redirect to the login page
+            self.send_response(302)
+            self.send_header("Location", "http://127.0.0.1/portal")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_HEAD = _reply
+    do_GET = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve_probe(port_queue, bytes_received, requests, online, stop_event):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ProbeHandler)
+    server.daemon_threads = True
+    server.bytes_received = bytes_received
+    server.requests = requests
+    server.online = online
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port_queue.put(server.server_address[1])
+    stop_event.wait()
+    server.shutdown()
+
+
+class StandinProbeServer:
+    """
+    Local generate_204 endpoint in a separate process, so its CPU time never
+    counts against the process being measured. Counts requests and request bytes.
+    `online` (shared flag) switches it to captive-portal redirects to simulate an outage.
+    """
+    def __init__(self):
+        self.bytes_received = multiprocessing.Value("q", 0)
+        self.requests = multiprocessing.Value("q", 0)
+        self.online = multiprocessing.Value("b", 1)
+        self._stop = multiprocessing.Event()
+        self._process: Optional[multiprocessing.Process] = None
+        self.url = ""
+
+    def start(self) -> str:
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve_probe, args=(port_queue, self.bytes_received, self.requests, self.online, self._stop),
+            name="probe-standin", daemon=True
+        )
+        self._process.start()
+        self.url = f"http://127.0.0.1:{port_queue.get(timeout=10)}/generate_204"
+        return self.url
+
+    def reset(self):
+        with self.bytes_received.get_lock():
+            self.bytes_received.value = 0
+            self.requests.value = 0
+
+    def stop(self):
+        self._stop.set()
+        if self._process:
+            self._process.join(5)
+
+
+# --- Idle benchmark ---
+
+@dataclass
+class IdleResult:
+    """Cost of one polling configuration, extrapolated to one hour of idle, online operation."""
+    backend: str
+    interval: int
+    gui_poll_ms: int
+    seconds: float
+    probes: int
+    online: int     # Probes that reported online (anything else measured the offline path)
+    cpu_s_per_hour: float
+    voluntary_csw_per_hour: Optional[float]    # Wakeups (blocking waits that returned)
+    involuntary_csw_per_hour: Optional[float]  # Preemptions
+    bytes_sent_per_hour: float
+    peak_rss_mb: float
+
+
+def process_usage(children: bool = False):
+    """
+    (CPU seconds, voluntary, involuntary context switches) of this process; switches are None on Windows.
+    With `children`, CPU of reaped child processes is added (e.g. the node runtime behind execjs).
+    """
+    if resource is None:
+        return time.process_time(), None, None
+    r = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = r.ru_utime + r.ru_stime
+    if children:
+        c = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += c.ru_utime + c.ru_stime
+    return cpu, r.ru_nvcsw, r.ru_nivcsw
+
+
+def _gui_poll(log_queue, poll_ms: int, stop_event):
+    """Stand-in for SZUNetworkGUI.update_log_console: wake every poll_ms and drain the log queue."""
+    while not stop_event.wait(poll_ms / 1000):
+        while not log_queue.empty():
+            log_queue.get()
+
+
+def _idle_worker(backend: str, interval: int, gui_poll_ms: int, url: str, seconds: float, results):
+    """Child process: run the real keep_alive loop against the stand-in and report rusage deltas."""
+    from loguru import logger
+    from app.config import settings
+    from app.client import SZUNetworkClient
+    from app.log_utils import QueueSink
+    from app.memwatch import current_rss
+    from app.utils import ProbeLadder, get_probe
+
+    # Same formatting work as the GUI/console sinks, without a terminal in the measurement
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    logger.remove()
+    logger.add(QueueSink(log_queue) if gui_poll_ms else (lambda message: None), level="INFO",
+               format="{time:HH:mm:ss} | {level: <8} | {message}")
+
+    settings.CHECK_INTERVAL = interval
+    client = SZUNetworkClient()
+    client.probe = get_probe(backend, test_url=url)
+    if backend == "ladder":
+        # The stand-in is on loopback: the link/DNS stages must accept that instead of reporting offline
+        client.probe = ProbeLadder(url, link_target=("127.0.0.1", 80), allow_private=True)
+    client.login = lambda: False  # Idle means online: never hit the real portal from a benchmark
+    probes = []
+    client.on_probe.append(lambda online, latency_ms: probes.append(online))
+
+    stop_event = threading.Event()
+    if gui_poll_ms:
+        threading.Thread(target=_gui_poll, args=(log_queue, gui_poll_ms, stop_event), daemon=True).start()
+    timer = threading.Timer(seconds, stop_event.set)
+
+    cpu0, vol0, invol0 = process_usage()
+    start = time.monotonic()
+    timer.start()
+    client.keep_alive(stop_event=stop_event)
+    elapsed = time.monotonic() - start
+    cpu1, vol1, invol1 = process_usage()
+
+    peak_rss = current_rss()
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss = max(peak_rss, peak if sys.platform == "darwin" else peak * 1024)
+    results.put((elapsed, probes, cpu1 - cpu0,
+                 None if vol0 is None else vol1 - vol0,
+                 None if invol0 is None else invol1 - invol0, peak_rss))
+
+
+def run_idle_benchmark(backends: Sequence[str], intervals: Sequence[int], seconds: float = 60,
+                       gui_poll_ms: int = 100, on_result=None) -> List[IdleResult]:
+    """
+    Measure each backend x interval configuration in a fresh process for `seconds`
+    of wall time against a local 204 stand-in, and scale the counters to one hour.
+    """
+    server = StandinProbeServer()
+    url = server.start()
+    out = []
+    try:
+        for backend in backends:
+            for interval in intervals:
+                server.reset()
+                results = multiprocessing.Queue()
+                proc = multiprocessing.Process(
+                    target=_idle_worker, args=(backend, interval, gui_poll_ms, url, seconds, results),
+                    name=f"idle-{backend}-{interval}"
+                )
+                proc.start()
+                elapsed, probes, cpu, vol, invol, peak_rss = results.get(timeout=seconds + interval + 60)
+                proc.join()
+                scale = 3600 / elapsed
+                result = IdleResult(
+                    backend=backend, interval=interval, gui_poll_ms=gui_poll_ms,
+                    seconds=round(elapsed, 1), probes=len(probes), online=sum(probes),
+                    cpu_s_per_hour=cpu * scale,
+                    voluntary_csw_per_hour=None if vol is None else vol * scale,
+                    involuntary_csw_per_hour=None if invol is None else invol * scale,
+                    bytes_sent_per_hour=server.bytes_received.value * scale,
+                    peak_rss_mb=peak_rss / 1048576,
+                )
+                out.append(result)
+                if on_result:
+                    on_result(result)
+    finally:
+        server.stop()
+    return out
+
+
+# --- HTTP transport footprint ---
+
+@dataclass
+class TransportFootprint:
+    """Cold-start cost of one HTTP backend, measured in fresh interpreters (medians over `runs`)."""
+    backend: str
+    runs: int
+    import_ms: float        # Importing the transport + building one client-ready instance
+    modules: int            # Modules that import pulled in
+    import_rss_mb: float    # RSS added by that import
+    warm_rss_mb: float      # RSS added after `requests` portal round trips (pools, SSL, buffers)
+    request_ms: float       # Mean GET + JSONP parse against the local portal stand-in
+
+
+# Runs in a fresh interpreter; only what every client process already has is imported before measuring
+_FOOTPRINT_SCRIPT = """
+import sys, json, time
+from app.config import settings
+from app.memwatch import current_rss
+from app.portal import read_portal_response
+
+backend, url, count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+modules0, rss0 = len(sys.modules), current_rss()
+start = time.perf_counter()
+from app.transport import new_transport
+transport = new_transport(backend)
+import_s = time.perf_counter() - start
+modules1, rss1 = len(sys.modules), current_rss()
+start = time.perf_counter()
+for i in range(count):
+    resp = transport.get(url, params={"callback": "jQuery", "username": "bench", "ip": "10.64.0.1", "_": i}, timeout=5)
+    resp.raise_for_status()
+    assert read_portal_response(resp, fields=("challenge",)).challenge
+request_s = (time.perf_counter() - start) / count
+print(json.dumps([import_s * 1000, modules1 - modules0, rss1 - rss0, current_rss() - rss0, request_s * 1000]))
+"""
+
+
+def run_transport_benchmark(backends: Sequence[str] = ("stdlib", "requests"), runs: int = 5,
+                            requests: int = 50, on_result=None) -> List[TransportFootprint]:
+    """Import time, module count and RSS of each HTTP backend, each run in a new interpreter."""
+    import json
+    import statistics
+    import subprocess
+    from app.config import settings
+    from app.portal_standin import CHALLENGE_PATH, PortalStandin
+
+    standin = PortalStandin()
+    url = standin.start() + CHALLENGE_PATH
+    out = []
+    try:
+        for backend in backends:
+            samples = []
+            for _ in range(runs):
+                proc = subprocess.run([sys.executable, "-c", _FOOTPRINT_SCRIPT, backend, url, str(requests)],
+                                      cwd=settings.PROJECT_ROOT, capture_output=True, text=True, timeout=120)
+                if proc.returncode != 0:
+                    raise RuntimeError(f"{backend} footprint run failed: {proc.stderr.strip().splitlines()[-1:]}")
+                samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            med = [statistics.median(column) for column in zip(*samples)]
+            result = TransportFootprint(
+                backend=backend, runs=runs, import_ms=med[0], modules=int(med[1]),
+                import_rss_mb=med[2] / 1048576, warm_rss_mb=med[3] / 1048576, request_ms=med[4],
+            )
+            out.append(result)
+            if on_result:
+                on_result(result)
+    finally:
+        standin.stop()
+    return out
@@ -0,0 +1,328 @@
+import re
+import gzip
+import json
+import atexit
+import time
+import base64
+import statistics
+import threading
+import functools
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from app.transport import HTTPStatusError, TransportError
+
+CASSETTE_VERSION = 1
+# Request parameters carrying credentials (SRUN: plain/hashed/encrypted password, chksum; Dr.COM: account/password)
+# or the host's address
+REDACTED_PARAMS = ("username", "password", "info", "chksum", "user_account", "user_password", "ip", "wlan_user_ip")
+# JSONP reply fields naming the account holder or the host (SRUN challenge/login/rad_user_info, Dr.COM)
+REDACTED_FIELDS = ("access_token", "real_name", "user_name", "client_ip", "online_ip", "user_ip", "v46ip")
+REDACTED = "<redacted>"
+_FIELD_RE = re.compile(rb'("(?:' + b"|".join(f.encode() for f in REDACTED_FIELDS) + rb')"\s*:\s*)"(?:[^"\\]|\\.)*"')
+# Reply headers worth keeping (the rest is noise for replay)
+KEPT_HEADERS = ("content-type", "content-length", "location")
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class CassetteResponse:
+    """Fully read reply held in memory, with the same interface as the transports' responses."""
+    def __init__(self, url: str, status_code: int, reason: str = "", headers: Optional[Dict[str, str]] = None,
+                 body: bytes = b""):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = dict(headers or {})
+        self.content = body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPStatusError(f"{self.status_code} {self.reason} for url: {self.url}")
+
+    def iter_content(self, chunk_size: int = 512):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class CassetteRecorder:
+    """
+    Appends request/response pairs to a JSONL cassette (gzip when the name ends in .gz).
+    Each recording session starts with a header line (zone, CHECK_INTERVAL, probe backend);
+    each exchange is one line: time, method, URL, redacted params, status, kept headers,
+    body (or transport error) and its duration in ms. Credential parameters are replaced
+    by "<redacted>", and their values are also scrubbed from reply bodies, as are the
+    reply fields in REDACTED_FIELDS (token, real name, client/online IP).
+    """
+    def __init__(self, path):
+        from app.config import settings
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries = 0
+        self._lock = threading.Lock()
+        self._file = _open(self.path, "a")
+        self._secrets = {s for s in (settings.SRUN_USERNAME, settings.SRUN_PASSWORD) if s}
+        self._write({"cassette": CASSETTE_VERSION, "recorded_at": round(time.time(), 3),
+                     "zone": settings.NETWORK_ZONE, "check_interval": settings.CHECK_INTERVAL,
+                     "probe_backend": settings.PROBE_BACKEND})
+        logger.info(f"Recording HTTP traffic to {self.path} (credentials redacted)")
+
+    def _write(self, record: Dict[str, Any]):
+        with self._lock:
+            if self._file.closed:  # Late exchange during interpreter shutdown
+                return
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def _redact(self, params: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], set]:
+        redacted, secrets = {}, set(self._secrets)
+        for key, value in (params or {}).items():
+            if key in REDACTED_PARAMS:
+                secrets.add(str(value).rsplit(",", 1)[-1])  # Dr.COM account is ",0,<username>"
+                value = REDACTED
+            redacted[key] = value
+        return redacted, {s for s in secrets if len(s) >= 3}
+
+    def record(self, started: float, elapsed: float, method: str, url: str, params: Optional[Dict[str, Any]],
+               response: Optional[CassetteResponse] = None, error: Optional[BaseException] = None):
+        params, secrets = self._redact(params)
+        record: Dict[str, Any] = {"at": round(started, 3), "ms": round(elapsed * 1000, 2),
+                                  "method": method, "url": url, "params": params}
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        else:
+            body = _FIELD_RE.sub(rb'\1"' + REDACTED.encode() + rb'"', response.content)
+            for secret in secrets:
+                body = body.replace(secret.encode("utf-8"), REDACTED.encode())
+            record["status"] = response.status_code
+            record["reason"] = response.reason
+            record["headers"] = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+            try:
+                record["body"] = body.decode("utf-8")
+            except UnicodeDecodeError:
+                record["body_b64"] = base64.b64encode(body).decode("ascii")  # e.g. GBK Dr.COM replies
+        self._write(record)
+        self.entries += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class RecordingTransport:
+    """
+    Wraps a transport and records every exchange. Replies are read in full before
+    they are handed back (so the recording has the whole body and the real duration);
+    the caller then reads them from memory.
+    """
+    def __init__(self, inner, recorder: CassetteRecorder):
+        self.inner = inner
+        self.recorder = recorder
+
+    def _exchange(self, method: str, url: str, params: Optional[Dict[str, Any]], send) -> CassetteResponse:
+        started, start = time.time(), time.perf_counter()
+        try:
+            resp = send()
+            try:
+                body = resp.content if method == "GET" else b""
+            finally:
+                resp.close()
+        except OSError as e:
+            self.recorder.record(started, time.perf_counter() - start, method, url, params, error=e)
+            raise
+        reply = CassetteResponse(url, resp.status_code, getattr(resp, "reason", ""),
+                                 {k.lower(): v for k, v in resp.headers.items()}, body)
+        self.recorder.record(started, time.perf_counter() - start, method, url, params, response=reply)
+        return reply
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 5, stream: bool = True):
+        return self._exchange("GET", url, params, lambda: self.inner.get(url, params=params, timeout=timeout, stream=True))
+
+    def head(self, url: str, timeout: float = 5, allow_redirects: bool = False):
+        return self._exchange("HEAD", url, None,
+                              lambda: self.inner.head(url, timeout=timeout, allow_redirects=allow_redirects))
+
+    def close(self):
+        self.inner.close()
+
+
+_recorder: Optional[CassetteRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> Optional[CassetteRecorder]:
+    """The process-wide recorder for RECORD_CASSETTE (None when recording is off)."""
+    global _recorder
+    from app.config import settings
+
+    if not settings.RECORD_CASSETTE:
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            path = Path(settings.RECORD_CASSETTE)
+            _recorder = CassetteRecorder(path if path.is_absolute() else settings.PROJECT_ROOT / path)
+            atexit.register(_recorder.close)  # Writes the gzip trailer
+        return _recorder
+
+
+def load_cassette(path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Return (header of the first session, all exchanges in time order)."""
+    header: Dict[str, Any] = {}
+    entries: List[Dict[str, Any]] = []
+    with _open(Path(path), "r") as f:
+        try:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "cassette" in record:
+                    header = header or record
+                else:
+                    entries.append(record)
+        except EOFError:
+            logger.warning(f"{path}: truncated (recorder was killed); replaying the {len(entries)} complete exchanges")
+    entries.sort(key=lambda e: e["at"])
+    return header, entries
+
+
+class ReplayTransport:
+    """
+    Serves recorded replies instead of touching the network. Exchanges are matched
+    per (method, URL path, `action` param) in recorded order, so the portal's logout and
+    login on the same endpoint stay apart and the configured hosts need not match. Each reply takes its recorded duration on
+    `clock` (scaled or virtual time); recorded transport errors are raised again.
+    `finished` is set once every exchange was served or a request had no recording.
+    """
+    def __init__(self, entries: Iterable[Dict[str, Any]], clock=None):
+        from app.clock import SystemClock
+
+        self.clock = clock or SystemClock()
+        self._queues: Dict[tuple, Deque[Dict[str, Any]]] = {}
+        for entry in entries:
+            self._queues.setdefault(self._key(entry["method"], entry["url"], entry.get("params")), deque()).append(entry)
+        self.remaining = sum(len(q) for q in self._queues.values())
+        self.served = 0
+        self.missing = 0
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method: str, url: str, params: Optional[Dict[str, Any]]) -> tuple:
+        return method, urlsplit(url).path, (params or {}).get("action")
+
+    def _next(self, method: str, url: str, params: Optional[Dict[str, Any]]) -> CassetteResponse:
+        with self._lock:
+            queue = self._queues.get(self._key(method, url, params))
+            entry = queue.popleft() if queue else None
+            if entry is None:
+                self.missing += 1
+            else:
+                self.served += 1
+                self.remaining -= 1
+            if entry is None or not self.remaining:
+                self.finished.set()
+        if entry is None:
+            raise TransportError(f"No recorded response for {method} {url}")
+        self.clock.sleep(entry["ms"] / 1000)
+        if "error" in entry:
+            raise TransportError(entry["error"])
+        body = base64.b64decode(entry["body_b64"]) if "body_b64" in entry else entry.get("body", "").encode("utf-8")
+        return CassetteResponse(url, entry["status"], entry.get("reason", ""), entry.get("headers"), body)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 5, stream: bool = True):
+        return self._next("GET", url, params)
+
+    def head(self, url: str, timeout: float = 5, allow_redirects: bool = False):
+        return self._next("HEAD", url, None)
+
+    def close(self):
+        pass
+
+
+@dataclass
+class ReplayResult:
+    """One replay of a cassette through the real client and keep-alive loop."""
+    exchanges: int
+    served: int
+    missing: int             # Requests the cassette had no reply for (the replay diverged)
+    probes: int
+    logins: int
+    login_failures: int
+    recorded_s: float        # Span of the recording
+    replayed_s: float        # Span of the replay on its clock
+    wall_s: float
+    speedup: float
+    probe_ms_p50: float
+    login_ms_p50: float
+    login_ms_max: float
+
+
+def replay_cassette(path, speed: float = 0, check_interval: Optional[int] = None,
+                    quiet: bool = True) -> ReplayResult:
+    """
+    Drive a real SZUNetworkClient.keep_alive with a cassette's replies until it is used up.
+    speed 0 replays in virtual time (as fast as possible, deterministic); otherwise real
+    time runs `speed` times faster (1 = original pace; the client's own CPU time is
+    stretched too, so measured latencies read high above 1x). The recorded zone and
+    CHECK_INTERVAL are used unless `check_interval` overrides the latter.
+    """
+    from app.config import settings
+    from app.client import SZUNetworkClient
+    from app.clock import ScaledClock, VirtualClock
+    from app.singleflight import new_login_flights
+    from app.utils import is_internet_connected
+
+    header, entries = load_cassette(path)
+    if not entries:
+        raise ValueError(f"{path}: no recorded exchanges")
+    clock = VirtualClock(start=entries[0]["at"]) if not speed else ScaledClock(speed)
+    transport = ReplayTransport(entries, clock=clock)
+    probe_url = next((e["url"] for e in entries if e["method"] == "HEAD"), None)
+
+    saved = settings.NETWORK_ZONE, settings.CHECK_INTERVAL
+    settings.NETWORK_ZONE = header.get("zone", settings.NETWORK_ZONE)
+    settings.CHECK_INTERVAL = check_interval or header.get("check_interval", settings.CHECK_INTERVAL)
+    if quiet:
+        logger.disable("app")
+    try:
+        client = SZUNetworkClient()
+        client.transport, client.clock = transport, clock
+        client.login_flights = new_login_flights(clock.perf_counter)
+        if probe_url:
+            client.probe = functools.partial(is_internet_connected, probe_url, transport=transport)
+        probe_ms: List[float] = []
+        login_ms: List[float] = []
+        client.on_probe.append(lambda online, latency_ms: probe_ms.append(latency_ms))
+        client.on_login.append(lambda success, latency_ms, error: login_ms.append(latency_ms))
+
+        start, replay_start = time.perf_counter(), clock.time()
+        client.keep_alive(stop_event=transport.finished)
+        wall = time.perf_counter() - start
+        replayed = clock.time() - replay_start
+    finally:
+        settings.NETWORK_ZONE, settings.CHECK_INTERVAL = saved
+        if quiet:
+            logger.enable("app")
+
+    return ReplayResult(
+        exchanges=len(entries), served=transport.served, missing=transport.missing,
+        probes=len(probe_ms), logins=len(login_ms), login_failures=client.login_failures,
+        recorded_s=entries[-1]["at"] + entries[-1]["ms"] / 1000 - entries[0]["at"], replayed_s=replayed,
+        wall_s=wall, speedup=replayed / wall if wall else 0.0,
+        probe_ms_p50=statistics.median(probe_ms) if probe_ms else 0.0,
+        login_ms_p50=statistics.median(login_ms) if login_ms else 0.0,
+        login_ms_max=max(login_ms, default=0.0),
+    )
@@ -1,42 +1,103 @@
+import os
 import time
-import re
-import json
-import requests
+import hashlib
+import functools
+import threading
 import execjs
 from loguru import logger
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional, Callable, List
 
 from app.config import settings
-from app.utils import get_local_ip,is_internet_connected
-from encryption.srun_md5 import get_md5
-from encryption.srun_sha1 import get_sha1
-from encryption.srun_xencode import get_xencode
+from app.utils import get_local_ip, get_probe
+from app.portal import PortalResponse, read_portal_response
+from app.payload import build_payload
+from app.dns_cache import install_resolver_cache
+from app.transport import new_transport
+from app.clock import SystemClock
+from app.singleflight import CACHED, login_flights
+from app.state import StateStore
+
+@functools.lru_cache(maxsize=1)
+def _load_js_context(js_path: str):
+    """Compile the SRUN encryption script once per process."""
+    if not os.path.exists(js_path):
+        raise FileNotFoundError(f"JS encryption file not found at: {js_path}")
+
+    logger.info(f"Loading JS encryption logic from {js_path}")
+    with open(js_path, 'r', encoding='utf-8') as f:
+        js_code = f.read()
+    return execjs.compile(js_code)
 
 class SZUNetworkClient:
-    def __init__(self, username=None, password=None):
-        self.session = requests.Session()
-        # Bypass system proxies (e.g. Clash) to ensure direct intranet access
-        self.session.trust_env = False
-        self.session.proxies = {}       # Explicitly clear proxies
-        self.session.headers.update({'User-Agent': settings.USER_AGENT})
+    def __init__(self, username=None, password=None, ip=None):
+        self.transport = new_transport()
+        # Resolve portal/probe hosts through the local cache so logins never wait on broken DNS
+        if settings.DNS_CACHE_ENABLED:
+            install_resolver_cache()
         
         # Use provided credentials or fallback to settings
+        # (only settings-backed clients follow credential changes on config reload)
+        self.uses_settings_credentials = not (username or password)
         self.username = username or settings.SRUN_USERNAME
         self.password = password or settings.SRUN_PASSWORD
+        # Optional fixed IP to authenticate (defaults to the detected local IP)
+        self.ip = ip
+
+        # Last parsed portal reply and failure reason (used to classify failures)
+        self.last_response: Optional[PortalResponse] = None
+        self.last_error: str = ""
+
+        # Observers: on_probe(online, latency_ms) / on_login(success, latency_ms, error)
+        self.on_probe: List[Callable[[bool, float], None]] = []
+        self.on_login: List[Callable[[bool, float, str], None]] = []
+        # Run by keep_alive before each check, on the loop thread (e.g. staged config changes)
+        self.before_check: List[Callable[[], None]] = []
+        self.login_failures = 0
+
+        # Connectivity check used by keep_alive (same interface as is_internet_connected)
+        self.probe = get_probe(settings.PROBE_BACKEND)
+        # Login strategy per NETWORK_ZONE; each returns True/False and sets last_error
+        self.login_strategies: Dict[str, Callable[[], bool]] = {
+            "teaching": self._login_teaching,
+            "dorm": self._login_dorm,
+        }
+        # Time source for keep_alive's waits and latency measurements (app.clock.VirtualClock in simulations)
+        self.clock = SystemClock()
+        # Login coalescing; process-wide on real time, a simulation on its own clock swaps in its own
+        self.login_flights = login_flights
+        self._tick_ip: Optional[str] = None  # Local IP detected during the current tick
+
+        # Observable state (online, heartbeat, last login, running/paused) for GUI/tray subscribers;
+        # a front end may swap in its own store before keep_alive starts
+        self.state = StateStore()
+
+        # Set to suspend probing/login in keep_alive (e.g. via the daemon control socket)
+        self.paused = threading.Event()
+
+        # With `wakeable`, request_check() ends keep_alive's sleep early (cooperative mode)
+        self.wakeable = False
+        self.wake = threading.Event()
         
         # Lazy loading of JS context: only initialize if needed (Teaching Zone)
         if settings.NETWORK_ZONE == 'teaching':
             self._init_js_context()
         
+    def reset_session(self):
+        """Drop pooled connections (HTTP transport and probe) and start fresh (soft reset, config reload)."""
+        self.transport.close()
+        self.transport = new_transport()
+        if hasattr(self.probe, "close"):
+            self.probe.close()
+
+    def close(self):
+        """Release pooled connections (HTTP transport and probe) of a client that is done."""
+        self.transport.close()
+        if hasattr(self.probe, "close"):
+            self.probe.close()
+
     def _init_js_context(self):
         """Initialize PyExecJS context with the encryption script."""
-        if not settings.JS_FILE_PATH.exists():
-            raise FileNotFoundError(f"JS encryption file not found at: {settings.JS_FILE_PATH}")
-            
-        logger.info(f"Loading JS encryption logic from {settings.JS_FILE_PATH}")
-        with open(settings.JS_FILE_PATH, 'r', encoding='utf-8') as f:
-            js_code = f.read()
-        self.ctx = execjs.compile(js_code)
+        self.ctx = _load_js_context(str(settings.JS_FILE_PATH))
 
     def _get_token(self, ip: str) -> str:
         """Retrieve the challenge token from the server."""
@@ -50,70 +111,34 @@ class SZUNetworkClient:
         
         logger.debug(f"Requesting challenge token for IP: {ip}")
         try:
-            resp = self.session.get(settings.GET_CHALLENGE_API, params=params, timeout=settings.REQUEST_TIMEOUT)
+            resp = self.transport.get(settings.GET_CHALLENGE_API, params=params, timeout=settings.REQUEST_TIMEOUT, stream=True)
             resp.raise_for_status()
-            # Extract token using regex
-            match = re.search(r'"challenge":"(.*?)"', resp.text)
-            if not match:
-                raise ValueError("Failed to extract challenge token from response")
-            token = match.group(1)
+            # Stop reading as soon as the challenge field has arrived
+            result = read_portal_response(resp, fields=("challenge",))
+            self.last_response = result
+            if not result.challenge:
+                raise ValueError(f"Failed to extract challenge token from response ({result.error_code or 'no challenge'})")
+            token = result.challenge
             logger.debug(f"Got token: {token}")
             return token
-        except requests.exceptions.RequestException as e:
+        except OSError as e:  # TransportError / requests' RequestException / socket errors
             logger.error(f"Network error getting token: {e}")
             raise
         except Exception as e:
             logger.error(f"Error getting token: {e}")
             raise
 
-    def _get_info_str(self, ip: str) -> str:
-        """Construct the info JSON string required for encryption."""
-        info = {
-            "username": self.username,
-            "password": self.password,
-            "ip": ip,
-            "acid": settings.SRUN_AC_ID,
-            "enc_ver": settings.SRUN_ENC
-        }
-        # Mimic the original script's JSON formatting (single quotes to double quotes, no spaces)
-        # Note: Standard json.dumps might add spaces, so we use the original regex method to be safe
-        # or just json.dumps(info, separators=(',', ':')) which removes spaces.
-        # However, the original script used regex on str(dict), which is risky but specific.
-        # Let's use standard JSON but ensure no spaces.
-        return json.dumps(info, separators=(',', ':'))
-
-    def _get_chksum(self, token: str, hmd5: str, ip: str, info_str: str) -> str:
-        """Calculate the checksum."""
-        chkstr = f"{token}{self.username}"
-        chkstr += f"{token}{hmd5}"
-        chkstr += f"{token}{settings.SRUN_AC_ID}"
-        chkstr += f"{token}{ip}"
-        chkstr += f"{token}{settings.SRUN_N}"
-        chkstr += f"{token}{settings.SRUN_TYPE}"
-        chkstr += f"{token}{info_str}"
-        return chkstr
-
     def _encrypt_payload(self, ip: str, token: str) -> Tuple[str, str, str]:
-        """Perform the complex encryption logic."""
-        info_str = self._get_info_str(ip)
-        
-        # 1. Encode info using custom XEncode and Base64 (via JS)
-        xencoded = get_xencode(info_str, token)
-        encoded_info = "{SRBX1}" + self.ctx.call('_encode', xencoded)
-        
-        # 2. MD5 hash of password
-        hmd5 = get_md5(self.password, token)
-        
-        # 3. SHA1 checksum
-        chkstr = self._get_chksum(token, hmd5, ip, encoded_info)
-        chksum = get_sha1(chkstr)
-        
-        return encoded_info, hmd5, chksum
+        """Build the encrypted payload for this challenge."""
+        return build_payload(
+            self.username, self.password, ip, token,
+            encode=lambda s: self.ctx.call('_encode', s)
+        )
         
     def _login_teaching(self) -> bool:
         """Execute the full login flow for Teaching Zone (SRUN)."""
         try:
-            ip = get_local_ip()
+            ip = self.local_ip()
             logger.info(f"Starting login process for IP: {ip} / User: {self.username}")
             
             token = self._get_token(ip)
@@ -138,40 +163,33 @@ class SZUNetworkClient:
             }
             
             logger.debug("Sending login request...")
-            resp = self.session.get(settings.SRUN_PORTAL_API, params=params, timeout=settings.REQUEST_TIMEOUT)
+            resp = self.transport.get(settings.SRUN_PORTAL_API, params=params, timeout=settings.REQUEST_TIMEOUT, stream=True)
             resp.raise_for_status()
             
             # Parse response
-            if '"suc_msg":"' in resp.text:
-                match = re.search(r'"suc_msg":"(.*?)"', resp.text)
-                if match:
-                    msg = match.group(1)
-                    logger.success(f"Login Successful! Server response: {msg}")
-                    return True
-                else:
-                    logger.warning("Login appeared successful but failed to parse success message.")
-                    return True # Still consider success if keyword present
+            result = read_portal_response(resp)
+            self.last_response = result
+            if result.success:
+                logger.success(f"Login Successful! Server response: {result.message}")
+                return True
             else:
-                # Try to capture error message
-                error_msg = "Unknown error"
-                if '"error_msg":"' in resp.text:
-                    match = re.search(r'"error_msg":"(.*?)"', resp.text)
-                    if match:
-                        error_msg = match.group(1)
-                logger.error(f"Login Failed: {error_msg}")
+                self.last_error = result.message or result.error_code or "Unknown error"
+                logger.error(f"Login Failed: {result.message or 'Unknown error'} (code: {result.error_code or '-'})")
                 return False
                 
-        except requests.exceptions.RequestException as e:
+        except OSError as e:
+            self.last_error = f"Network error: {e}"
             logger.error(f"Network error during login: {e}")
             return False
         except Exception as e:
+            self.last_error = str(e) or type(e).__name__
             logger.exception(f"An unexpected error occurred during login: {e}")
             return False
 
     def _login_dorm(self) -> bool:
         """Execute the login flow for Dorm Zone (Dr.COM)."""
         try:
-            ip = get_local_ip()
+            ip = self.local_ip()
             logger.info(f"Starting Dorm Zone login process for IP: {ip} / User: {self.username}")
             
             timestamp = int(time.time() * 1000)
@@ -185,70 +203,181 @@ class SZUNetworkClient:
             }
             
             # Dorm zone URL
-            url = "http://172.30.255.42:801/eportal/portal/login"
+            url = settings.DORM_PORTAL_API
             
             logger.debug("Sending Dorm Zone login request...")
-            resp = self.session.get(url, params=params, timeout=settings.REQUEST_TIMEOUT)
+            resp = self.transport.get(url, params=params, timeout=settings.REQUEST_TIMEOUT, stream=True)
             resp.raise_for_status()
             
-            # Handle potential encoding issues (Dr.COM might return GBK/GB2312)
-            resp.encoding = 'utf-8'  # Try forcing utf-8 first, or rely on apparent_encoding if needed
-
             # Strict success validation
             # Captive portals often return 200 OK even on failure, so we must check the body.
-            if "已经在线" in resp.text or "already online" in resp.text.lower():
+            # The decoder handles GBK/UTF-8 and stops once result/msg/ret_code have arrived.
+            result = read_portal_response(resp, fields=("result", "msg", "ret_code"))
+            self.last_response = result
+
+            if result.already_online:
                 logger.success(f"Dorm Zone: Already online.")
                 return True
 
-            if '"result":1' in resp.text or '"msg":"成功"' in resp.text:
+            if result.success:
                 logger.success(f"Dorm Zone Login Successful!")
                 return True
             else:
-                # Try to capture error message
-                error_msg = "Unknown error"
-                if '"msg":"' in resp.text:
-                    match = re.search(r'"msg":"(.*?)"', resp.text)
-                    if match:
-                        error_msg = match.group(1)
-                
-                logger.error(f"Dorm Zone Login Failed: {error_msg}")
-                logger.debug(f"Full response: {resp.text}")
+                self.last_error = result.message or result.error_code or "Unknown error"
+                logger.error(f"Dorm Zone Login Failed: {result.message or 'Unknown error'}")
+                logger.debug(f"Parsed response: {result.data}")
                 return False
                 
         except Exception as e:
+            self.last_error = str(e) or type(e).__name__
             logger.exception(f"An unexpected error occurred during Dorm Zone login: {e}")
             return False
 
-    def login(self) -> bool:
+    def get_session_info(self) -> Optional[Dict[str, Any]]:
+        """
+        Read this host's SRUN session from rad_user_info (Teaching Zone).
+        Returns the raw fields (add_time, sum_seconds, remain_seconds, sum_bytes, ...),
+        or None when not online or the portal cannot be reached.
+        """
+        timestamp = int(time.time() * 1000)
+        params = {"callback": f"jQuery112406118340540763985_{timestamp}", "_": timestamp}
+        if self.ip:
+            params["ip"] = self.ip
+        try:
+            resp = self.transport.get(settings.USER_INFO_API, params=params, timeout=settings.REQUEST_TIMEOUT, stream=True)
+            resp.raise_for_status()
+            result = read_portal_response(resp)
+        except OSError as e:
+            logger.debug(f"Session info unavailable: {e}")
+            return None
+        if not result.success or not result.data.get("user_name"):
+            logger.debug(f"Session info: not online ({result.error_code or result.message or 'no session'})")
+            return None
+        return result.data
+
+    def logout(self) -> bool:
+        """End this host's SRUN session (Teaching Zone)."""
+        ip = self.local_ip()
+        timestamp = int(time.time() * 1000)
+        params = {
+            "callback": f"jQuery112406118340540763985_{timestamp}",
+            "action": "logout",
+            "username": self.username,
+            "ip": ip,
+            "ac_id": settings.SRUN_AC_ID,
+            "_": timestamp,
+        }
+        try:
+            resp = self.transport.get(settings.SRUN_PORTAL_API, params=params, timeout=settings.REQUEST_TIMEOUT, stream=True)
+            resp.raise_for_status()
+            result = read_portal_response(resp)
+        except OSError as e:
+            logger.error(f"Network error during logout: {e}")
+            return False
+        if not result.success:
+            logger.warning(f"Logout failed: {result.message or result.error_code or 'Unknown error'}")
+        # A login result from just before the logout no longer describes the session
+        self.login_flights.forget(self._login_key(ip))
+        return result.success
+
+    def local_ip(self) -> str:
+        """The IP to log in: the configured one, else detected once per keep-alive tick."""
+        if self.ip:
+            return self.ip
+        if self._tick_ip is None:
+            self._tick_ip = get_local_ip()
+        return self._tick_ip
+
+    def _login_key(self, ip: Optional[str] = None) -> tuple:
+        """Who is being logged in where: logins with equal keys are interchangeable."""
+        secret = hashlib.sha256(self.password.encode("utf-8")).hexdigest()[:16]
+        return (settings.NETWORK_ZONE, self.username, secret, ip or self.local_ip())
+
+    def login(self, coalesce: bool = True) -> bool:
+        """
+        Log in, or join a login for the same account and IP already under way.
+        Concurrent triggers (keep-alive loop, control socket, GUI, verify) share one
+        portal round trip; only the caller that ran it counts failures and fires on_login.
+        `coalesce=False` always makes a real round trip (e.g. profiling N login cycles).
+        """
+        if not coalesce:
+            return self._login_once()[0]
+        (success, error, response), source = self.login_flights.do(self._login_key(), self._login_once)
+        if source == CACHED:
+            self.last_error, self.last_response = error, response
+            logger.info(f"Reusing the login for {self.username} that succeeded within LOGIN_COALESCE_TTL")
+        elif source:
+            self.last_error, self.last_response = error, response
+            logger.info(f"Joined in-flight login for {self.username}: {'success' if success else error or 'failed'}")
+        return success
+
+    def _login_once(self) -> Tuple[bool, str, Optional[PortalResponse]]:
         """
         Dispatch login to the appropriate strategy based on configuration.
         """
+        self.last_error = ""
+        start = self.clock.perf_counter()
         if settings.NETWORK_ZONE == 'dorm':
             logger.info("Executing Dorm Zone Login Strategy")
-            return self._login_dorm()
+            success = self.login_strategies["dorm"]()
         else:
             logger.info("Executing Teaching Zone Login Strategy")
-            return self._login_teaching()
+            success = self.login_strategies["teaching"]()
+
+        if not success:
+            self.login_failures += 1
+        self._notify(self.on_login, success, (self.clock.perf_counter() - start) * 1000, self.last_error)
+        self.state.update(last_login=self.clock.time(), login_ok=success, last_error=self.last_error,
+                          **({"online": True} if success else {}))
+        return success, self.last_error, self.last_response
+
+    def _notify(self, hooks, *args):
+        """Call observer hooks; a broken observer must never break the login path."""
+        for hook in list(hooks):  # Hooks may unregister themselves
+            try:
+                hook(*args)
+            except Exception as e:
+                logger.debug(f"Observer {hook!r} failed: {e}")
 
     def verify_credentials(self, username, password) -> bool:
         """
-        Temporarily use provided credentials to verify if they work.
+        Verify credentials on an isolated client so this instance is never mutated.
+        Safe to call from several threads at once (see app.batch for bulk checks).
         """
-        old_user = self.username
-        old_pwd = self.password
-        self.username = username
-        self.password = password
-        
+        client = SZUNetworkClient(username=username, password=password)
         try:
-            # If we were in dorm zone but switching to teaching, we might need JS context
-            if settings.NETWORK_ZONE == 'teaching' and not hasattr(self, 'ctx'):
-                self._init_js_context()
-            
-            success = self.login()
-            return success
+            return client.login()
         finally:
-            self.username = old_user
-            self.password = old_pwd
+            client.close()
+
+    def _check_and_login(self):
+        """One keep-alive tick: probe, and login if the probe fails."""
+        # 1. 先做体检：网络通吗？
+        start = self.clock.perf_counter()
+        online = self.probe()
+        self._notify(self.on_probe, online, (self.clock.perf_counter() - start) * 1000)
+        # 心跳: 每次探测都更新 last_probe, 订阅者 (GUI/托盘) 只在状态真正变化时重绘
+        self.state.update(online=online, last_probe=self.clock.time())
+        if online:
+            # 网络正常，发送心跳信号（INFO 级别，供日志监控脚本使用；GUI 改用状态订阅）
+            logger.info("SYS_HEARTBEAT_SIGNAL")
+        else:
+            # 2. 网络断了！触发登录
+            logger.warning("⚠️ Network disconnected or captive portal detected! Initiating login...")
+            self.login()
+
+    def replace_probe(self, probe):
+        """Swap the connectivity check, keeping a cooperative (LAN) wrapper in place."""
+        from app.coop import CooperativeProbe
+
+        holder = self.probe if isinstance(self.probe, CooperativeProbe) else self
+        old, holder.probe = holder.probe, probe
+        if hasattr(old, "close"):
+            old.close()
+
+    def request_check(self):
+        """Run the next keep-alive check now instead of after the rest of CHECK_INTERVAL."""
+        self.wake.set()
 
     def keep_alive(self, stop_event=None):
         """
@@ -256,27 +385,38 @@ class SZUNetworkClient:
         :param stop_event: threading.Event or similar object to signal shutdown
         """
         logger.info(f"Starting Keep-Alive Daemon (Check Interval: {settings.CHECK_INTERVAL}s)")
+        if self.wakeable and stop_event is not None:
+            # The loop sleeps on `wake`; stopping must end that sleep too
+            threading.Thread(target=lambda: (stop_event.wait(), self.wake.set()),
+                             name="keep-alive-stop", daemon=True).start()
         
-        while not (stop_event and stop_event.is_set()):
-            try:
-                # 1. 先做体检：网络通吗？
-                if is_internet_connected():
-                    # 网络正常，发送心跳信号（必须是 INFO 级别才能通过 GUI 的日志过滤）
-                    logger.info("SYS_HEARTBEAT_SIGNAL")
-                else:
-                    # 2. 网络断了！触发登录
-                    logger.warning("⚠️ Network disconnected or captive portal detected! Initiating login...")
-                    self.login()
+        self.state.update(running=True)
+        try:
+            while not (stop_event and stop_event.is_set()):
+                self._tick_ip = None  # Re-detect the local IP (DHCP, roaming) once per tick
+                try:
+                    self._notify(self.before_check)
+                    # 暂停中 (例如通过守护进程控制接口)：跳过本轮检测
+                    if not self.paused.is_set():
+                        self._check_and_login()
                     
-            except Exception as e:
-                logger.error(f"Unexpected error in daemon loop: {e}")
+                except Exception as e:
+                    logger.error(f"Unexpected error in daemon loop: {e}")
             
-            # 3. 休息 (Support graceful interrupt during sleep)
-            # Use CHECK_INTERVAL for standard keep-alive
-            interval = settings.CHECK_INTERVAL
-            if stop_event:
-                if stop_event.wait(interval):
-                    logger.info("Daemon stopping received signal.")
-                    break
-            else:
-                time.sleep(interval)
+                # 3. 休息 (Support graceful interrupt during sleep)
+                # Use CHECK_INTERVAL for standard keep-alive
+                interval = settings.CHECK_INTERVAL
+                if self.wakeable:
+                    self.clock.wait(self.wake, interval)
+                    self.wake.clear()
+                    if stop_event and stop_event.is_set():
+                        logger.info("Daemon stopping received signal.")
+                        break
+                elif stop_event:
+                    if self.clock.wait(stop_event, interval):
+                        logger.info("Daemon stopping received signal.")
+                        break
+                else:
+                    self.clock.sleep(interval)
+        finally:
+            self.state.update(running=False)
@@ -0,0 +1,92 @@
+import heapq
+import itertools
+import time
+import threading
+from typing import Callable, List, Optional, Tuple
+
+
+class SystemClock:
+    """Wall-clock time and real waits; the default clock of `SZUNetworkClient`."""
+    @staticmethod
+    def time() -> float:
+        return time.time()
+
+    @staticmethod
+    def perf_counter() -> float:
+        return time.perf_counter()
+
+    @staticmethod
+    def sleep(seconds: float):
+        time.sleep(seconds)
+
+    @staticmethod
+    def wait(event: threading.Event, timeout: float) -> bool:
+        """Block until `event` is set or `timeout` passes; True if the event was set."""
+        return event.wait(timeout)
+
+
+class ScaledClock:
+    """Real time running `speed` times faster: readings are stretched and waits shortened (replays)."""
+    def __init__(self, speed: float = 1.0):
+        self.speed = speed
+        self._t0 = time.time()
+        self._p0 = time.perf_counter()
+
+    def time(self) -> float:
+        return self._t0 + (time.time() - self._t0) * self.speed
+
+    def perf_counter(self) -> float:
+        return self._p0 + (time.perf_counter() - self._p0) * self.speed
+
+    def sleep(self, seconds: float):
+        time.sleep(max(0.0, seconds) / self.speed)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        return event.wait(max(0.0, timeout) / self.speed)
+
+
+class VirtualClock:
+    """
+    Deterministic simulated time for driving the real keep-alive loop.
+
+    Nothing blocks: `sleep`/`wait` jump the clock forward, running callbacks scheduled
+    with `call_at`/`call_later` in due order (ties in scheduling order) on the way.
+    A `wait` ends early, at the callback's time, if that callback set the event.
+    `advance` is for simulated work that takes time (a slow probe or portal reply).
+    """
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._queue: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    perf_counter = time
+
+    def call_at(self, when: float, callback: Callable[[], None]):
+        heapq.heappush(self._queue, (when, next(self._seq), callback))
+
+    def call_later(self, delay: float, callback: Callable[[], None]):
+        self.call_at(self.now + delay, callback)
+
+    def _run_until(self, deadline: float, event: Optional[threading.Event] = None) -> bool:
+        while self._queue and self._queue[0][0] <= deadline:
+            when, _, callback = heapq.heappop(self._queue)
+            self.now = max(self.now, when)
+            callback()
+            if event is not None and event.is_set():
+                return True
+        self.now = max(self.now, deadline)
+        return bool(event is not None and event.is_set())
+
+    def advance(self, seconds: float):
+        self._run_until(self.now + max(0.0, seconds))
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        if event.is_set():
+            return True
+        return self._run_until(self.now + max(0.0, timeout), event)
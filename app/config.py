@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Dict
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -23,9 +24,35 @@ class Settings(BaseSettings):
     def JS_FILE_PATH(self) -> Path:
         return self.PROJECT_ROOT / "encryption" / "srun_base64.js"
 
+    @property
+    def ENV_FILE_PATH(self) -> Path:
+        return self.PROJECT_ROOT / ".env"
+
+    @property
+    def DAEMON_SOCKET_PATH(self) -> Path:
+        return self.PROJECT_ROOT / "logs" / "daemon.sock"
+
+    @property
+    def DAEMON_TOKEN_PATH(self) -> Path:
+        return self.PROJECT_ROOT / "logs" / "daemon.token"
+
+    @property
+    def DAEMON_LOCK_PATH(self) -> Path:
+        return self.PROJECT_ROOT / "logs" / "daemon.lock"
+
+    @property
+    def SNAPSHOT_PATH(self) -> Path:
+        return self.PROJECT_ROOT / "logs" / "state.json"
+
+    @property
+    def HISTORY_DB_PATH(self) -> Path:
+        return self.PROJECT_ROOT / "logs" / "history.db"
+
     # API Endpoints
     GET_CHALLENGE_API: str = "https://net.szu.edu.cn/cgi-bin/get_challenge"
     SRUN_PORTAL_API: str = "https://net.szu.edu.cn/cgi-bin/srun_portal"
+    USER_INFO_API: str = "https://net.szu.edu.cn/cgi-bin/rad_user_info"
+    DORM_PORTAL_API: str = "http://172.30.255.42:801/eportal/portal/login"
     
     # Request Headers
     USER_AGENT: str = 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/63.0.3239.26 Safari/537.36'
@@ -36,6 +63,60 @@ class Settings(BaseSettings):
     REQUEST_TIMEOUT: int = 5   # seconds (New: Request timeout)
     MAX_RETRIES: int = 3
     START_MINIMIZED: bool = False # New: Startup behavior
+    PROFILE_SECONDS: int = 0      # GUI: profile the first N seconds of the daemon (0 = off)
+    LOGIN_COALESCE_TTL: int = 2   # seconds a login result is reused by concurrent callers (0 = join in-flight logins only)
+    # DNS cache for portal/probe hosts; pins map host -> "ip[,ip...]" (JSON in .env)
+    DNS_CACHE_ENABLED: bool = True
+    DNS_CACHE_TTL: int = 300
+    DNS_PINS: Dict[str, str] = {}
+    PROBE_BACKEND: str = 'http'   # Connectivity check: 'http' (HEAD via HTTP_BACKEND), 'requests', 'socket' (raw HEAD) or 'ladder'
+    HTTP_BACKEND: str = 'stdlib'  # Portal/probe HTTP transport: 'stdlib' (http.client) or 'requests' (optional dependency)
+    RECORD_CASSETTE: str = ''     # Record portal/probe HTTP traffic (credentials redacted) to this JSONL(.gz) file; '' = off
+
+    # Fleet Mode (multi-process, many accounts)
+    FLEET_WORKERS: int = 2
+    FLEET_TABLE_NAME: str = "szu_net_fleet"  # Shared-memory status table name
+
+    # Daemon control socket (TCP fallback where Unix sockets are unavailable)
+    DAEMON_PORT: int = 47391
+
+    # Warm restart: persist runtime state (status, IP, DNS answers, latencies, failures) to logs/state.json
+    SNAPSHOT_ENABLED: bool = True
+    SNAPSHOT_INTERVAL: int = 60   # Write at most this often unless the online state flips
+    SNAPSHOT_MAX_AGE: int = 120   # Last-known status/latency from an older snapshot is dropped (DNS answers are always reused)
+
+    # Proactive session renewal (Teaching Zone): read rad_user_info while online and log out + in
+    # again shortly before the portal would end the session, preferably while traffic is low
+    SESSION_RENEWAL: bool = False
+    SESSION_MAX_DURATION: int = 0     # Portal's session limit in seconds if it does not report remain_seconds (0 = unknown)
+    SESSION_RENEW_LEAD: int = 900     # Start looking for a quiet moment this long before expiry
+    SESSION_QUIET_BPS: int = 16384    # "Quiet" = account traffic below this many bytes/s
+    SESSION_INFO_INTERVAL: int = 300  # rad_user_info poll period outside the renewal window
+    SESSION_MAX_RENEWALS: int = 2     # Renewals tried on one session before giving up on it (expiry did not move)
+
+    # Attempt/outage history (SQLite, see `python cli.py stats`)
+    HISTORY_ENABLED: bool = True
+
+    # LAN cooperative mode: daemons on one subnet share one probe per round over UDP multicast
+    COOP_ENABLED: bool = False
+    COOP_GROUP: str = "239.255.47.39"
+    COOP_PORT: int = 47392
+    COOP_INTERFACE: str = ""       # Local IP of the LAN interface ("" = OS default, "127.0.0.1" for local tests)
+    COOP_SECRET: str = ""          # Shared HMAC key, required: COOP_ENABLED is ignored without it
+    COOP_SELF_CHECK_ROUNDS: int = 6   # Probe locally at least every N rounds even if peers report online
+
+    # Hot reload: apply .env changes to the running daemon (inotify on Linux, mtime polling elsewhere)
+    CONFIG_WATCH: bool = True
+    CONFIG_POLL_INTERVAL: int = 5
+
+    # Memory watchdog: RSS + tracemalloc growth every N seconds; soft reset above the budget (0 = no budget)
+    MEMORY_WATCHDOG: bool = False
+    MEMORY_CHECK_INTERVAL: int = 600
+    MEMORY_BUDGET_MB: int = 0
+
+    # Logging: async JSONL file sink (logs/szu_net.jsonl) instead of the synchronous text log
+    LOG_ASYNC: bool = False
+    LOG_QUEUE_SIZE: int = 10000
     
     model_config = SettingsConfigDict(
         env_file=".env", 
@@ -51,13 +132,34 @@ class Settings(BaseSettings):
             raise ValueError('Must not be empty')
         return v
 
-    @field_validator('RETRY_INTERVAL', 'CHECK_INTERVAL', 'REQUEST_TIMEOUT', 'MAX_RETRIES')
+    @field_validator('RETRY_INTERVAL', 'CHECK_INTERVAL', 'REQUEST_TIMEOUT', 'MAX_RETRIES', 'FLEET_WORKERS', 'LOG_QUEUE_SIZE', 'DNS_CACHE_TTL', 'MEMORY_CHECK_INTERVAL', 'COOP_SELF_CHECK_ROUNDS', 'CONFIG_POLL_INTERVAL', 'SNAPSHOT_INTERVAL', 'SESSION_RENEW_LEAD', 'SESSION_INFO_INTERVAL', 'SESSION_MAX_RENEWALS')
     @classmethod
     def validate_positive(cls, v: int) -> int:
         if v <= 0:
             raise ValueError('Must be positive')
         return v
 
+    @field_validator('PROFILE_SECONDS', 'LOGIN_COALESCE_TTL', 'MEMORY_BUDGET_MB', 'SNAPSHOT_MAX_AGE', 'SESSION_MAX_DURATION', 'SESSION_QUIET_BPS')
+    @classmethod
+    def validate_non_negative(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError('Must not be negative')
+        return v
+
+    @field_validator('PROBE_BACKEND')
+    @classmethod
+    def validate_probe_backend(cls, v: str) -> str:
+        if v not in ('http', 'requests', 'socket', 'ladder'):
+            raise ValueError("Must be one of 'http', 'requests', 'socket' or 'ladder'")
+        return v
+
+    @field_validator('HTTP_BACKEND')
+    @classmethod
+    def validate_http_backend(cls, v: str) -> str:
+        if v not in ('stdlib', 'requests'):
+            raise ValueError("Must be 'stdlib' or 'requests'")
+        return v
+
     @field_validator('NETWORK_ZONE')
     @classmethod
     def validate_zone(cls, v: str) -> str:
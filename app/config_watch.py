@@ -0,0 +1,230 @@
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+from pydantic import ValidationError
+
+from app.config import Settings, settings
+
+# Applied live: read on every tick/request, or handled explicitly in `apply_changes`
+_SESSION_FIELDS = {"USER_AGENT", "HTTP_BACKEND"}
+_CREDENTIAL_FIELDS = {"SRUN_USERNAME", "SRUN_PASSWORD"}
+# Bound at startup (sockets, threads, sinks): a change only takes effect after a restart
+_RESTART_FIELDS = {
+    "DAEMON_PORT", "HISTORY_ENABLED", "LOG_ASYNC", "LOG_QUEUE_SIZE", "FLEET_WORKERS", "FLEET_TABLE_NAME",
+    "MEMORY_WATCHDOG", "MEMORY_CHECK_INTERVAL", "MEMORY_BUDGET_MB", "DNS_CACHE_ENABLED",
+    "COOP_ENABLED", "COOP_GROUP", "COOP_PORT", "COOP_INTERFACE", "COOP_SECRET", "COOP_SELF_CHECK_ROUNDS",
+    "PROFILE_SECONDS", "CONFIG_WATCH", "CONFIG_POLL_INTERVAL",
+    "SNAPSHOT_ENABLED", "SNAPSHOT_INTERVAL", "SNAPSHOT_MAX_AGE", "SESSION_RENEWAL", "SESSION_MAX_DURATION",
+    "SESSION_RENEW_LEAD", "SESSION_QUIET_BPS", "SESSION_INFO_INTERVAL", "SESSION_MAX_RENEWALS", "RECORD_CASSETTE",
+}
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (+ name[len])
+
+
+def _inotify():
+    """Return libc with inotify bound via ctypes, or None where unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class ConfigWatcher:
+    """
+    Watch a .env file and call `on_change(new_settings)` with a validated Settings
+    object after it changed. Uses inotify on Linux (no polling wakeups while idle;
+    the directory is watched because editors and python-dotenv replace the file by
+    rename) and mtime polling elsewhere. Invalid files are logged and ignored.
+    """
+    def __init__(self, path, on_change: Callable[[Settings], None], poll_interval: float = 5.0,
+                 debounce: float = 0.3):
+        self.path = Path(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.backend = "inotify" if _inotify() else "polling"
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe() if self.backend == "inotify" else (None, None)
+        self._thread = threading.Thread(target=self._run, name="config-watch", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Watching {self.path} for config changes ({self.backend})")
+
+    def stop(self):
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+        self._thread.join(timeout=5)
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
+
+    def _mtime(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        try:
+            new = Settings(_env_file=str(self.path))
+        except ValidationError as e:
+            logger.error(f"Ignoring invalid config in {self.path}: {e.errors()[0].get('loc')} {e.errors()[0].get('msg')}")
+            return
+        try:
+            self.on_change(new)
+        except Exception as e:
+            logger.error(f"Failed to apply config change: {e}")
+
+    def _run(self):
+        if self.backend == "inotify":
+            self._run_inotify()
+        else:
+            self._run_polling()
+
+    def _run_polling(self):
+        last = self._mtime()
+        while not self._stop.wait(self.poll_interval):
+            current = self._mtime()
+            if current != last:
+                last = current
+                self._stop.wait(self.debounce)
+                self._load()
+
+    def _run_inotify(self):
+        libc = _inotify()
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0 or libc.inotify_add_watch(fd, str(self.path.parent).encode(),
+                                            _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE) < 0:
+            logger.warning(f"inotify unavailable (errno {ctypes.get_errno()}), falling back to polling")
+            if fd >= 0:
+                os.close(fd)
+            self.backend = "polling"
+            return self._run_polling()
+        name = self.path.name.encode()
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd, self._wake_r], [], [])
+                if self._wake_r in ready or self._stop.is_set():
+                    break
+                if self._matches(os.read(fd, 4096), name):
+                    # Coalesce bursts (e.g. one rewrite per key from set_key)
+                    time.sleep(self.debounce)
+                    try:
+                        while os.read(fd, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    self._load()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _matches(buf: bytes, name: bytes) -> bool:
+        offset = 0
+        while offset + _IN_EVENT.size <= len(buf):
+            _, _, _, length = _IN_EVENT.unpack_from(buf, offset)
+            start = offset + _IN_EVENT.size
+            if buf[start:start + length].rstrip(b"\0") == name:
+                return True
+            offset = start + length
+        return False
+
+
+class ConfigReloader:
+    """
+    Applies watched config changes to a running client at a keep-alive loop boundary.
+
+    The watcher thread only stages the diff; the loop thread applies it before its next
+    check (so a tick never sees half a config) and is woken to do so right away.
+    The HTTP session is re-created only if a session-affecting field changed.
+    """
+    def __init__(self, client, path=None):
+        self.client = client
+        self.path = Path(path or settings.ENV_FILE_PATH)
+        self._applied: Dict[str, Any] = settings.model_dump()
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.watcher = ConfigWatcher(self.path, self._stage, poll_interval=settings.CONFIG_POLL_INTERVAL)
+
+    def start(self):
+        self.client.before_check.append(self.apply_pending)
+        self.client.wakeable = True
+        self.watcher.start()
+
+    def stop(self):
+        self.watcher.stop()
+
+    def _stage(self, new: Settings):
+        fresh = new.model_dump()
+        changed = {k: v for k, v in fresh.items() if self._applied.get(k) != v}
+        if not changed:
+            return
+        self._applied = fresh
+        with self._lock:
+            self._pending.update(changed)
+        logger.info(f"Config change detected: {', '.join(sorted(changed))}")
+        self.client.request_check()
+
+    def apply_pending(self):
+        with self._lock:
+            changed, self._pending = self._pending, {}
+        if changed:
+            apply_changes(self.client, changed)
+
+
+def apply_changes(client, changed: Dict[str, Any]):
+    """Assign changed settings and update the live objects that cached them."""
+    restart = sorted(k for k in changed if k in _RESTART_FIELDS)
+    live = {k: v for k, v in changed.items() if k not in _RESTART_FIELDS}
+    for key, value in live.items():
+        setattr(settings, key, value)
+
+    if _CREDENTIAL_FIELDS & live.keys() and client.uses_settings_credentials:
+        client.username = settings.SRUN_USERNAME
+        client.password = settings.SRUN_PASSWORD
+    if _SESSION_FIELDS & live.keys():
+        client.reset_session()
+    if "NETWORK_ZONE" in live and settings.NETWORK_ZONE == "teaching" and not hasattr(client, "ctx"):
+        client._init_js_context()
+    if "LOGIN_COALESCE_TTL" in live:
+        client.login_flights.ttl = settings.LOGIN_COALESCE_TTL
+    if "PROBE_BACKEND" in live:
+        from app.utils import get_probe
+        client.replace_probe(get_probe(settings.PROBE_BACKEND))
+    if live.keys() & {"DNS_PINS", "DNS_CACHE_TTL", "GET_CHALLENGE_API", "SRUN_PORTAL_API", "USER_INFO_API", "DORM_PORTAL_API"}:
+        from app.dns_cache import get_resolver_cache
+        from urllib.parse import urlsplit
+        cache = get_resolver_cache()
+        if cache is not None:
+            cache.ttl = settings.DNS_CACHE_TTL
+            cache.pins = {h.lower(): [ip.strip() for ip in ips.split(",") if ip.strip()]
+                          for h, ips in settings.DNS_PINS.items()}
+            cache.manage(cache.pins)
+            cache.manage(urlsplit(url).hostname for url in (
+                settings.GET_CHALLENGE_API, settings.SRUN_PORTAL_API, settings.USER_INFO_API, settings.DORM_PORTAL_API))
+
+    if live:
+        logger.success(f"Config reloaded: {', '.join(sorted(live))}")
+    if restart:
+        logger.warning(f"Restart required to apply: {', '.join(restart)}")
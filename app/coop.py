@@ -0,0 +1,330 @@
+import hmac
+import json
+import time
+import socket
+import struct
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+PROTOCOL_VERSION = 1
+
+
+def elect(round_no: int, nodes) -> str:
+    """
+    Rendezvous hashing: every node computes the same prober for a round from the
+    same peer view, and the choice rotates across nodes from round to round.
+    """
+    return min(nodes, key=lambda node: hashlib.sha1(f"{round_no}:{node}".encode()).digest())
+
+
+class CoopGroup:
+    """
+    UDP multicast gossip between keep-alive daemons on one LAN segment.
+
+    Messages are small JSON datagrams: `hello` (presence + portal state), `probe`
+    (the round's online/offline result for everyone to reuse) and `recheck` (a host
+    saw a failure; everyone should probe locally right now). Each datagram carries an
+    HMAC over the shared `secret` and unsigned or forged ones are dropped, so a group
+    cannot be opened without one. A datagram whose `ts` is more than `max_skew`
+    seconds off our clock, or not newer than the last one from the same node, is a
+    replay and dropped too. Rechecks are pushed at most once per `recheck_holdoff`
+    seconds across the group, so an outage does not make every host alert every other.
+    """
+    def __init__(self, node_id: str, zone: str, secret: str, group: str = "239.255.47.39", port: int = 47392,
+                 interface: str = "", peer_timeout: float = 30, max_skew: float = 10, recheck_holdoff: float = 10):
+        if not secret:
+            raise ValueError("Cooperative mode needs a shared secret (COOP_SECRET)")
+        self.node_id = node_id
+        self.zone = zone
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self.secret = secret.encode()
+        self.peer_timeout = peer_timeout
+        self.max_skew = max_skew
+        self.recheck_holdoff = recheck_holdoff
+        self.peers: Dict[str, Dict[str, Any]] = {}       # node -> last hello/probe payload + "seen"
+        self.last_probe: Optional[Dict[str, Any]] = None  # Newest probe result from any node
+        self.last_recheck = 0.0                           # When a recheck was last sent or heard
+        self.on_recheck = []                              # Callables fired when a peer pushes a recheck
+        self.portal_state: Dict[str, Any] = {}            # Our last login result, sent with every hello
+        self.sent = 0
+        self.received = 0
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self._last_ts: Dict[str, float] = {}              # node -> newest accepted datagram time
+
+    # --- Socket ---
+
+    def open(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)  # Several daemons on one host (tests)
+        sock.bind(("", self.port))
+        iface = socket.inet_aton(self.interface or "0.0.0.0")
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, struct.pack("4s4s", socket.inet_aton(self.group), iface))
+        if self.interface:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, iface)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)  # Never leave the subnet
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        sock.settimeout(1.0)  # Lets the receive loop notice close()
+        self._sock = sock
+        threading.Thread(target=self._receive, args=(sock,), name="coop-gossip", daemon=True).start()
+        logger.info(f"Cooperative mode: node {self.node_id} on {self.group}:{self.port}")
+
+    def close(self):
+        self._stop.set()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def send(self, kind: str, **fields):
+        if self._sock is None:
+            return
+        body = json.dumps({"v": PROTOCOL_VERSION, "type": kind, "node": self.node_id, "zone": self.zone,
+                           "ts": time.time(), **fields}, separators=(",", ":")).encode()
+        body += b"\n" + hmac.new(self.secret, body, hashlib.sha256).hexdigest().encode()
+        try:
+            self._sock.sendto(body, (self.group, self.port))
+            self.sent += 1
+        except OSError as e:
+            logger.debug(f"Gossip send failed: {e}")
+
+    def _decode(self, datagram: bytes) -> Optional[Dict[str, Any]]:
+        body, _, mac = datagram.rpartition(b"\n")
+        expected = hmac.new(self.secret, body, hashlib.sha256).hexdigest().encode()
+        if not body or not hmac.compare_digest(mac, expected):
+            return None
+        try:
+            msg = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(msg, dict) or msg.get("v") != PROTOCOL_VERSION or msg.get("zone") != self.zone:
+            return None
+        ts, node = msg.get("ts"), msg.get("node")
+        if not isinstance(ts, (int, float)) or not isinstance(node, str) or abs(time.time() - ts) > self.max_skew:
+            return None
+        with self._lock:
+            if ts <= self._last_ts.get(node, 0.0):
+                return None  # Replayed (or reordered) datagram
+            self._last_ts[node] = ts
+        return msg
+
+    def _receive(self, sock: socket.socket):
+        while not self._stop.is_set():
+            try:
+                datagram, _ = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            msg = self._decode(datagram)
+            if msg is None or msg.get("node") == self.node_id:
+                continue
+            self.received += 1
+            self._handle(msg)
+
+    def _handle(self, msg: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self.peers[msg["node"]] = dict(msg, seen=now)
+            if msg["type"] == "probe" and (self.last_probe is None or msg["ts"] >= self.last_probe["ts"]):
+                self.last_probe = msg
+        if msg["type"] == "recheck":
+            self.last_recheck = now
+            logger.info(f"Peer {msg['node']} reports a failure, re-checking now")
+            for hook in list(self.on_recheck):
+                hook()
+
+    # --- Views ---
+
+    def alive_nodes(self):
+        """This node plus every peer heard from within peer_timeout."""
+        cutoff = time.time() - self.peer_timeout
+        with self._lock:
+            for node in [n for n, p in self.peers.items() if p["seen"] < cutoff]:
+                del self.peers[node]
+            return sorted(set(self.peers) | {self.node_id})
+
+    def hello(self):
+        self.send("hello", **self.portal_state)
+
+    def recheck(self):
+        """Ask every peer to probe now, unless someone already did within recheck_holdoff."""
+        now = time.time()
+        if now - self.last_recheck <= self.recheck_holdoff:
+            return
+        self.last_recheck = now
+        self.send("recheck")
+
+    def record_own_probe(self, online: bool, latency_ms: float):
+        """Keep our own result as the newest shared one (we do not receive our own datagrams)."""
+        msg = {"type": "probe", "node": self.node_id, "ts": time.time(), "online": online, "latency_ms": latency_ms}
+        with self._lock:
+            self.last_probe = msg
+        self.send("probe", online=online, latency_ms=round(latency_ms, 2))
+
+
+class CooperativeProbe:
+    """
+    Drop-in replacement for `client.probe` that shares one probe per round across the LAN.
+
+    Each round (CHECK_INTERVAL long, aligned to wall time) one node, chosen by `elect()`,
+    runs the real probe and gossips the result. The others reuse that peer's result instead
+    of probing when it is online, at most `max_age` seconds old and agrees with their own last
+    local result. A node probes locally anyway when:
+      - it is the elected prober, or no fresh shared result exists;
+      - the shared result says offline, or our own last probe was offline (portal
+        sessions are per host, so a disagreement is always verified locally);
+      - a peer pushed a recheck, or it has not probed itself for `self_check_rounds`
+        rounds (catches this host's own session expiring while the LAN stays online).
+    A local probe that goes from online to offline pushes a recheck to the group
+    (rate-limited by CoopGroup.recheck, so one outage yields one push, not one per host).
+    """
+    def __init__(self, probe, group: CoopGroup, interval: float, self_check_rounds: int = 6,
+                 max_age: Optional[float] = None, clock=time.time):
+        self.probe = probe
+        self.group = group
+        self.interval = interval
+        self.self_check_rounds = self_check_rounds
+        self.max_age = interval if max_age is None else max_age
+        self.clock = clock
+        self.local_probes = 0
+        self.shared_hits = 0
+        self._force_local = threading.Event()
+        self._last_local = 0.0
+        self._last_online = True
+        group.on_recheck.append(self._force_local.set)
+
+    def _local(self, elected: bool) -> bool:
+        start = time.perf_counter()
+        online = self.probe()
+        self._last_local = self.clock()
+        self.local_probes += 1
+        if elected:
+            self.group.record_own_probe(online, (time.perf_counter() - start) * 1000)
+        else:
+            self.group.hello()  # Keeps us in everyone's election view
+        if self._last_online and not online:
+            self.group.recheck()
+        self._last_online = online
+        return online
+
+    def __call__(self) -> bool:
+        now = self.clock()
+        round_no, nodes = int(now // self.interval), self.group.alive_nodes()
+        elected = elect(round_no, nodes) == self.group.node_id
+        shared = self.group.last_probe
+        # This round's prober may not have reported yet; the previous round's result is still in bounds
+        provers = {elect(round_no, nodes), elect(round_no - 1, nodes)}
+
+        if self._force_local.is_set():
+            self._force_local.clear()
+            return self._local(elected)
+        if elected or now - self._last_local > self.self_check_rounds * self.interval:
+            return self._local(elected)
+        if shared is None or shared["node"] not in provers - {self.group.node_id} or now - shared["ts"] > self.max_age:
+            return self._local(elected)
+        if not shared["online"] or not self._last_online:
+            return self._local(elected)
+
+        self.shared_hits += 1
+        self.group.hello()
+        return True
+
+    def close(self):
+        if hasattr(self.probe, "close"):
+            self.probe.close()
+
+
+def enable_cooperation(client, node_id: Optional[str] = None) -> CoopGroup:
+    """Wrap `client.probe` for LAN cooperation using settings; returns the (open) group."""
+    import os
+    from app.config import settings
+
+    group = CoopGroup(
+        node_id or f"{socket.gethostname()}-{os.getpid()}", settings.NETWORK_ZONE, settings.COOP_SECRET,
+        group=settings.COOP_GROUP, port=settings.COOP_PORT, interface=settings.COOP_INTERFACE,
+        peer_timeout=3 * settings.CHECK_INTERVAL, recheck_holdoff=settings.CHECK_INTERVAL,
+    )
+    group.open()
+    client.probe = CooperativeProbe(client.probe, group, settings.CHECK_INTERVAL,
+                                    self_check_rounds=settings.COOP_SELF_CHECK_ROUNDS)
+    # A pushed recheck should not wait for the rest of the sleep
+    client.wakeable = True
+    group.on_recheck.append(client.request_check)
+    client.on_login.append(lambda success, latency_ms, error: group.portal_state.update(
+        logged_in=success, last_login=round(time.time(), 3)))
+    group.hello()
+    return group
+
+
+# --- Localhost simulation (several cooperating daemons on one machine) ---
+
+def _sim_node(index: int, url: str, interval: int, seconds: float, fail_at: float, t0: float, secret: str, results):
+    """One simulated daemon: the real keep_alive loop + cooperative probe over loopback multicast."""
+    from loguru import logger as log
+    from app.config import settings
+    from app.client import SZUNetworkClient
+    from app.utils import get_probe
+
+    log.remove()
+    settings.CHECK_INTERVAL = interval
+    settings.COOP_INTERFACE = "127.0.0.1"
+    settings.COOP_SECRET = secret
+    client = SZUNetworkClient()
+    client.probe = get_probe("socket", test_url=url)
+    client.login = lambda: False  # Only detection is simulated, never a real portal login
+    group = enable_cooperation(client, node_id=f"node-{index:02d}")
+    detected = []
+    client.on_probe.append(lambda online, latency_ms: detected.append(time.time())
+                           if not online and not detected and time.time() >= t0 + fail_at else None)
+
+    stop_event = threading.Event()
+    threading.Timer(max(0.0, t0 + seconds - time.time()), stop_event.set).start()
+    client.keep_alive(stop_event=stop_event)
+    group.close()
+    coop = client.probe
+    results.put((group.node_id, coop.local_probes, coop.shared_hits, group.sent,
+                 detected[0] - (t0 + fail_at) if detected else None))
+
+
+def simulate_lan(nodes: int = 5, seconds: float = 30, interval: int = 2, fail_at: Optional[float] = None):
+    """
+    Run `nodes` cooperating keep-alive processes against a local 204 stand-in.
+    If `fail_at` is given the stand-in turns captive at that second, which measures
+    how fast every node notices (recheck push vs. waiting for its own tick).
+    Returns (per-node rows, total probe requests seen by the stand-in).
+    """
+    import secrets
+    import multiprocessing
+    from app.bench import StandinProbeServer
+
+    server = StandinProbeServer()
+    url = server.start()
+    results = multiprocessing.Queue()
+    t0 = time.time() + 1.0  # Common start so rounds line up like NTP-synced lab PCs
+    secret = secrets.token_hex(16)
+    procs = [
+        multiprocessing.Process(target=_sim_node, name=f"coop-node-{i}",
+                                args=(i, url, interval, seconds, fail_at if fail_at is not None else seconds * 2, t0, secret, results))
+        for i in range(nodes)
+    ]
+    for proc in procs:
+        proc.start()
+    try:
+        if fail_at is not None:
+            time.sleep(max(0.0, t0 + fail_at - time.time()))
+            server.online.value = 0
+        rows = [results.get(timeout=seconds + interval + 30) for _ in procs]
+        for proc in procs:
+            proc.join()
+        total = server.requests.value
+    finally:
+        server.stop()
+    return sorted(rows), total
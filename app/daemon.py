@@ -0,0 +1,385 @@
+import os
+import hmac
+import json
+import time
+import socket
+import secrets
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.outages import OutageTracker
+from app.memwatch import MemoryWatchdog, client_reset_hook
+from app.timeseries import TimeSeriesStore
+
+# Commands understood by the control socket (one JSON object per line)
+COMMANDS = ("status", "login", "pause", "resume", "stats", "outages", "series", "memory")
+
+
+def _write_token(path) -> str:
+    """New random control token in a file only the current user can read (0600)."""
+    token = secrets.token_hex(16)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()  # O_CREAT's mode only applies to a new file
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def _read_token() -> str:
+    try:
+        return settings.DAEMON_TOKEN_PATH.read_text().strip()
+    except OSError:
+        return ""
+
+
+def _control_address():
+    """Unix domain socket where available, loopback TCP otherwise (Windows)."""
+    path = str(settings.DAEMON_SOCKET_PATH)
+    if hasattr(socket, "AF_UNIX") and len(path) < 100:
+        return socket.AF_UNIX, path
+    return socket.AF_INET, ("127.0.0.1", settings.DAEMON_PORT)
+
+
+class InstanceLock:
+    """
+    Non-blocking, process-wide single-instance lock on a lock file.
+    Released automatically by the OS if the process dies.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+
+    def acquire(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(os.getpid()))
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def release(self):
+        if self._fh is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+
+class NetworkDaemon:
+    """
+    The single keep-alive instance on this host.
+    Runs `SZUNetworkClient.keep_alive` and serves a local control socket
+    (status, login, pause, resume, stats, outages, memory, series) that front ends attach to.
+    Every request must carry the token from DAEMON_TOKEN_PATH (a user-only file), so other
+    local users cannot drive the daemon, in particular over the loopback TCP fallback.
+    With MEMORY_WATCHDOG, `memory` is a MemoryWatchdog; front ends may add their
+    own soft-reset hooks (e.g. trimming UI buffers) before `run()`.
+    """
+    def __init__(self, client=None):
+        self.client = client
+        self.lock = InstanceLock(settings.DAEMON_LOCK_PATH)
+        self.started_at = time.time()
+        self.online: Optional[bool] = None
+        self.last_probe = 0.0
+        self.probe_latency_ms = 0.0
+        self.last_login = 0.0
+        self.last_login_ok: Optional[bool] = None
+        self.outages = OutageTracker()
+        self.series = TimeSeriesStore()
+        self.memory: Optional[MemoryWatchdog] = None
+        if settings.MEMORY_WATCHDOG:
+            self.memory = MemoryWatchdog(settings.MEMORY_CHECK_INTERVAL, settings.MEMORY_BUDGET_MB)
+        self.coop = None
+        self.renewer = None
+        self._server: Optional[socket.socket] = None
+        self._token = ""
+        self._stop_event = None
+
+    def acquire(self) -> bool:
+        """Take the single-instance lock. False if another daemon already runs."""
+        return self.lock.acquire()
+
+    # --- Observers ---
+
+    def _on_probe(self, online: bool, latency_ms: float):
+        self.online = online
+        self.last_probe = time.time()
+        self.probe_latency_ms = latency_ms
+
+    def _on_login(self, success: bool, latency_ms: float, error: str):
+        self.last_login = time.time()
+        self.last_login_ok = success
+        if success:
+            self.online = True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "user": self.client.username if self.client else None,
+            "zone": settings.NETWORK_ZONE,
+            "online": self.online,
+            "paused": bool(self.client and self.client.paused.is_set()),
+            "last_probe": self.last_probe,
+            "probe_latency_ms": round(self.probe_latency_ms, 2),
+            "last_login": self.last_login,
+            "last_login_ok": self.last_login_ok,
+            "login_failures": self.client.login_failures if self.client else 0,
+            "uptime": round(time.time() - self.started_at, 1),
+            "coop_peers": len(self.coop.alive_nodes()) - 1 if self.coop else None,
+            **(self.renewer.summary() if self.renewer else {}),
+        }
+
+    # --- Control socket ---
+
+    def _handle(self, request: Dict[str, Any], conn: socket.socket) -> Optional[Dict[str, Any]]:
+        cmd = request.get("cmd")
+        if cmd == "status":
+            return {"ok": True, **self.status()}
+        if cmd == "login":
+            logger.info("Control: login requested")
+            success = self.client.login()
+            return {"ok": success, "error": self.client.last_error}
+        if cmd == "pause":
+            self.client.paused.set()
+            self.client.state.update(paused=True)
+            logger.info("Control: daemon paused")
+            return {"ok": True}
+        if cmd == "resume":
+            self.client.paused.clear()
+            self.client.state.update(paused=False)
+            logger.info("Control: daemon resumed")
+            return {"ok": True}
+        if cmd == "outages":
+            limit = int(request.get("limit", 20))
+            return {"ok": True, **self.outages.summary(), "recent": self.outages.records(limit)}
+        if cmd == "series":
+            try:
+                window = self.series.window(request.get("resolution", "minute"), int(request.get("points", 60)))
+            except ValueError as e:
+                return {"ok": False, "error": str(e)}
+            return {"ok": True, "resolution": request.get("resolution", "minute"), "series": window}
+        if cmd == "memory":
+            if self.memory is None:
+                return {"ok": False, "error": "memory watchdog disabled (MEMORY_WATCHDOG=false)"}
+            if request.get("reset"):
+                logger.info("Control: memory soft reset requested")
+                self.memory.soft_reset()
+            return {"ok": True, **self.memory.summary()}
+        if cmd == "stats":
+            interval = float(request.get("interval", 1.0))
+            while not self._stop_event.is_set():
+                conn.sendall((json.dumps({"ok": True, **self.status()}) + "\n").encode())
+                if self._stop_event.wait(interval):
+                    break
+            return None
+        return {"ok": False, "error": f"unknown command: {cmd!r} (expected one of {', '.join(COMMANDS)})"}
+
+    def _serve_connection(self, conn: socket.socket):
+        with conn:
+            try:
+                for line in conn.makefile("r", encoding="utf-8"):
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        if not hmac.compare_digest(str(request.get("token", "")), self._token):
+                            conn.sendall((json.dumps({"ok": False, "error": "unauthorized"}) + "\n").encode())
+                            return
+                        reply = self._handle(request, conn)
+                    except (ValueError, AttributeError):
+                        reply = {"ok": False, "error": "invalid request"}
+                    if reply is not None:
+                        conn.sendall((json.dumps(reply) + "\n").encode())
+            except OSError:
+                pass  # Client went away (e.g. stats stream closed)
+
+    def _serve(self, server: socket.socket):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _open_server(self):
+        family, address = _control_address()
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.unlink(address)  # Stale socket; we hold the lock so nobody else owns it
+        server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._token = _write_token(settings.DAEMON_TOKEN_PATH)
+        server.bind(address)
+        if family == socket.AF_UNIX:
+            os.chmod(address, 0o600)
+        server.listen(8)
+        server.settimeout(1.0)  # Lets the accept loop notice stop_event
+        self._server = server
+        logger.info(f"Control socket listening on {address}")
+
+    def _close_server(self):
+        if self._server is None:
+            return
+        self._server.close()
+        self._server = None
+        family, address = _control_address()
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.unlink(address)
+        try:
+            settings.DAEMON_TOKEN_PATH.unlink()
+        except OSError:
+            pass
+
+    def run(self, stop_event):
+        """
+        Serve the control socket and run the keep-alive loop until stop_event is set.
+        Call `acquire()` first.
+        """
+        if self.client is None:
+            from app.client import SZUNetworkClient
+            self.client = SZUNetworkClient()
+        self.client.on_probe.append(self._on_probe)
+        self.client.on_login.append(self._on_login)
+        self.client.on_probe.append(self.outages.on_probe)
+        self.client.on_login.append(self.outages.on_login)
+        self.series.attach(self.client)
+        self._stop_event = stop_event
+
+        history = snapshot = reloader = None
+        try:
+            if settings.HISTORY_ENABLED:
+                from app.history import HistoryStore, attach_history
+                history = HistoryStore(settings.HISTORY_DB_PATH)
+                attach_history(self.client, history)
+
+            if self.memory:
+                self.memory.add_reset_hook(client_reset_hook(self.client))
+                self.memory.start()
+
+            if settings.COOP_ENABLED and not settings.COOP_SECRET:
+                logger.warning("COOP_ENABLED is set but COOP_SECRET is empty: cooperative mode stays off.")
+            elif settings.COOP_ENABLED:
+                from app.coop import enable_cooperation
+                self.coop = enable_cooperation(self.client)
+
+            if settings.SESSION_RENEWAL:
+                from app.renewal import SessionRenewer
+                self.renewer = SessionRenewer(
+                    self.client, lead=settings.SESSION_RENEW_LEAD, quiet_bps=settings.SESSION_QUIET_BPS,
+                    info_interval=settings.SESSION_INFO_INTERVAL, max_duration=settings.SESSION_MAX_DURATION,
+                    max_attempts=settings.SESSION_MAX_RENEWALS)
+                self.renewer.attach()
+
+            if settings.SNAPSHOT_ENABLED:
+                from app.snapshot import SnapshotKeeper
+                snapshot = SnapshotKeeper(self.client, settings.SNAPSHOT_PATH, interval=settings.SNAPSHOT_INTERVAL)
+                snapshot.restore(settings.SNAPSHOT_MAX_AGE)
+                known = snapshot.last_known()
+                if known and known["online"] is not None and self.online is None:
+                    # Last-known status for `status` until the first tick reports
+                    self.online = known["online"]
+                    self.last_probe, self.last_login = known["last_probe"], known["last_login"]
+                    self.probe_latency_ms = known["probe_latency_ms"]
+                snapshot.attach()
+
+            if settings.CONFIG_WATCH:
+                from app.config_watch import ConfigReloader
+                reloader = ConfigReloader(self.client)
+                reloader.start()
+
+            # Inside the try: a failed bind must still stop the threads above and release the lock
+            self._open_server()
+            threading.Thread(target=self._serve, args=(self._server,), name="daemon-control", daemon=True).start()
+            self.client.keep_alive(stop_event=stop_event)
+        finally:
+            self._close_server()
+            if self.memory:
+                self.memory.stop()
+            if self.coop:
+                self.coop.close()
+            if reloader:
+                reloader.stop()
+            if snapshot:
+                snapshot.save()
+            if history:
+                history.close()
+            self.lock.release()
+
+
+class DaemonControl:
+    """
+    Client side of the control socket, used by the GUI and CLI front ends.
+    Replies must arrive within `timeout` seconds (default: long enough for a portal login),
+    so a hung daemon raises socket.timeout (an OSError) instead of blocking the caller.
+    """
+    def __init__(self, sock: socket.socket, token: str = "", timeout: Optional[float] = None):
+        self.sock = sock
+        self.token = token
+        self.timeout = timeout if timeout is not None else settings.REQUEST_TIMEOUT * 2 + 5
+        self._reader = sock.makefile("r", encoding="utf-8")
+
+    def _send(self, cmd: str, **kwargs):
+        self.sock.sendall((json.dumps({"cmd": cmd, "token": self.token, **kwargs}) + "\n").encode())
+
+    def request(self, cmd: str, **kwargs) -> Dict[str, Any]:
+        self.sock.settimeout(self.timeout)
+        self._send(cmd, **kwargs)
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the control connection")
+        return json.loads(line)
+
+    def stream_stats(self, interval: float = 1.0) -> Iterator[Dict[str, Any]]:
+        """Yield a status dict every `interval` seconds until the daemon goes away."""
+        self.sock.settimeout(interval * 2 + self.timeout)
+        self._send("stats", interval=interval)
+        for line in self._reader:
+            yield json.loads(line)
+
+    def close(self):
+        try:
+            self._reader.close()
+        finally:
+            self.sock.close()
+
+
+def attach(timeout: float = 1.0) -> Optional[DaemonControl]:
+    """Connect to a running daemon. Returns None if there is none."""
+    family, address = _control_address()
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        return None
+    return DaemonControl(sock, token=_read_token())
@@ -0,0 +1,202 @@
+import time
+import socket
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+# The real resolver, captured before any patching (the probe ladder also uses it directly)
+system_getaddrinfo = socket.getaddrinfo
+
+# Fake-IP resolvers (Clash, sing-box, Surge) answer every name from the benchmark range
+FAKE_IP_NETWORK = ipaddress.ip_network("198.18.0.0/15")
+
+_upstream_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dns-cache")
+
+
+class _Entry:
+    __slots__ = ("addresses", "expires", "stale_until", "negative")
+
+    def __init__(self, addresses: List[str], expires: float, stale_until: float, negative: bool = False):
+        self.addresses = addresses
+        self.expires = expires
+        self.stale_until = stale_until
+        self.negative = negative
+
+
+class ResolverCache:
+    """
+    Small resolver cache for the portal and probe hosts.
+
+    - Positive answers are kept for `ttl` seconds, failures for `negative_ttl`.
+    - Pinned hosts (settings.DNS_PINS) never touch upstream DNS.
+    - Expired answers are served immediately while a background refresh runs,
+      and kept as a fallback for `stale_ttl` seconds if upstream DNS is down.
+    - For `public_hosts` (probe endpoints) answers that are all private/reserved are
+      passed through but not cached: while a captive DNS answers with the portal, the
+      cache must not keep pointing the probe there after login. Fake-IP answers from
+      a local proxy (198.18.0.0/15) are stable and cached like any other.
+    """
+    def __init__(self, ttl: float = 300, negative_ttl: float = 30, stale_ttl: float = 7 * 86400,
+                 timeout: float = 2.0, pins: Optional[Dict[str, List[str]]] = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.pins = {h.lower(): list(ips) for h, ips in (pins or {}).items()}
+        self.hosts = set(self.pins)
+        self.public_hosts = set()
+        self._entries: Dict[str, _Entry] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def manage(self, hosts: Iterable[str], public: bool = False):
+        """Route these hostnames through the cache (IP literals are ignored)."""
+        for host in hosts:
+            if not host:
+                continue
+            try:
+                ipaddress.ip_address(host)
+                continue
+            except ValueError:
+                pass
+            self.hosts.add(host.lower())
+            if public:
+                self.public_hosts.add(host.lower())
+
+    def _upstream(self, host: str) -> List[str]:
+        future = _upstream_pool.submit(system_getaddrinfo, host, None, 0, socket.SOCK_STREAM)
+        infos = future.result(timeout=self.timeout)
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    def _cacheable(self, host: str, addresses: List[str]) -> bool:
+        if host not in self.public_hosts:
+            return True
+        try:
+            ips = [ipaddress.ip_address(a) for a in addresses]
+        except ValueError:
+            return True
+        return any(ip.is_global or ip in FAKE_IP_NETWORK for ip in ips)
+
+    def _store(self, host: str, addresses: List[str]) -> _Entry:
+        now = time.monotonic()
+        entry = _Entry(addresses, now + self.ttl, now + self.stale_ttl)
+        if not self._cacheable(host, addresses):
+            logger.debug(f"Not caching private DNS answer for {host}: {addresses}")
+            return entry
+        with self._lock:
+            self._entries[host] = entry
+        return entry
+
+    def _refresh(self, host: str):
+        try:
+            self._store(host, self._upstream(host))
+        except (OSError, FutureTimeout) as e:
+            logger.debug(f"DNS refresh for {host} failed, keeping stale entry: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(host)
+
+    def resolve(self, host: str) -> List[str]:
+        """Return IP addresses for host, raising socket.gaierror when none are known."""
+        host = host.lower()
+        if host in self.pins:
+            return self.pins[host]
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+        if entry and now < entry.expires:
+            if entry.negative:
+                raise socket.gaierror(socket.EAI_NONAME, f"{host}: cached resolution failure")
+            return entry.addresses
+
+        if entry and not entry.negative and now < entry.stale_until:
+            # Serve stale right away; refresh off the caller's thread
+            with self._lock:
+                start = host not in self._refreshing
+                self._refreshing.add(host)
+            if start:
+                threading.Thread(target=self._refresh, args=(host,), daemon=True).start()
+            return entry.addresses
+
+        try:
+            return self._store(host, self._upstream(host)).addresses
+        except (OSError, FutureTimeout) as e:
+            with self._lock:
+                self._entries[host] = _Entry([], now + self.negative_ttl, now + self.negative_ttl, negative=True)
+            raise socket.gaierror(socket.EAI_NONAME, f"{host}: {e or 'DNS timeout'}")
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """Drop-in replacement for socket.getaddrinfo; unmanaged hosts go straight upstream."""
+        if not isinstance(host, str) or host.lower() not in self.hosts:
+            return system_getaddrinfo(host, port, family, type, proto, flags)
+
+        # Only the name lookup is cached: the real resolver still builds the tuples from the
+        # cached literals, so the caller's family/type/proto/flags mean what they always do
+        results = []
+        for address in self.resolve(host):
+            try:
+                infos = system_getaddrinfo(address, port, family, type, proto, flags | socket.AI_NUMERICHOST)
+            except socket.gaierror:
+                continue  # e.g. an IPv6 literal for an AF_INET caller
+            if flags & socket.AI_CANONNAME:
+                infos = [(af, st, pr, host, sa) for af, st, pr, _, sa in infos]
+            results.extend(infos)
+        if not results:
+            raise socket.gaierror(socket.EAI_FAMILY, f"{host}: no address for requested family")
+        return results
+
+    def export(self) -> Dict[str, List[str]]:
+        """Known positive answers (e.g. for a state snapshot)."""
+        with self._lock:
+            return {h: e.addresses for h, e in self._entries.items() if not e.negative}
+
+    def seed(self, answers: Dict[str, List[str]]):
+        """
+        Preload answers (e.g. from a state snapshot) for managed hosts. They start out
+        expired: served immediately on first use while a background refresh runs.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for host, addresses in answers.items():
+                host = host.lower()
+                if host in self.hosts and addresses and host not in self._entries:
+                    self._entries[host] = _Entry(list(addresses), now, now + self.stale_ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_installed: Optional[ResolverCache] = None
+
+
+def install_resolver_cache() -> ResolverCache:
+    """
+    Create the process-wide cache from settings and route socket.getaddrinfo
+    through it for the portal and probe hosts (idempotent).
+    """
+    global _installed
+    if _installed is not None:
+        return _installed
+
+    from app.config import settings
+    from app.utils import RawHttpProbe
+
+    pins = {host: [ip.strip() for ip in ips.split(",") if ip.strip()] for host, ips in settings.DNS_PINS.items()}
+    cache = ResolverCache(ttl=settings.DNS_CACHE_TTL, pins=pins)
+    cache.manage(urlsplit(url).hostname for url in (
+        settings.GET_CHALLENGE_API, settings.SRUN_PORTAL_API, settings.USER_INFO_API, settings.DORM_PORTAL_API))
+    cache.manage([urlsplit(RawHttpProbe.DEFAULT_URL).hostname], public=True)
+    socket.getaddrinfo = cache.getaddrinfo
+    _installed = cache
+    logger.debug(f"DNS cache active for {sorted(cache.hosts)} (pinned: {sorted(cache.pins)})")
+    return cache
+
+
+def get_resolver_cache() -> Optional[ResolverCache]:
+    return _installed
@@ -0,0 +1,237 @@
+import time
+import struct
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from app.batch import Account
+from app.config import settings
+
+# Table layout (little-endian, fixed size, no pickling):
+#   header: magic(4s) version(H) slots(H) reserved(8x)               -> 16 bytes
+#   record: seq(I) username(32s) online(B) pad(3x) failures(I)
+#           latency_ms(f) last_probe(d) last_login(d)                 -> 64 bytes
+# `seq` is a per-record seqlock: odd while a writer is mid-update (or died there).
+_MAGIC = b"SZUF"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHH8x")
+_RECORD = struct.Struct("<I32sB3xIfdd")
+_SEQ = struct.Struct("<I")
+
+
+@dataclass
+class AccountStatus:
+    """Snapshot of one fleet account as read from the status table."""
+    username: str
+    online: bool
+    failures: int
+    latency_ms: float
+    last_probe: float
+    last_login: float
+
+
+class StatusTable:
+    """
+    Fixed-layout per-account status table in `multiprocessing.shared_memory`.
+    Each slot has a single writer (the worker owning that account); any process
+    can read it with struct.unpack_from, without IPC round trips.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool, lock=None):
+        self.shm = shm
+        self.owner = owner
+        self.lock = lock                                     # Creator's InstanceLock, held while the table lives
+        self._last_good: Dict[int, AccountStatus] = {}       # Per-slot fallback when a writer is stuck mid-update
+        magic, version, self.slots = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"Shared memory '{shm.name}' is not a fleet status table")
+
+    @classmethod
+    def create(cls, name: str, usernames: Sequence[str]) -> "StatusTable":
+        """
+        Create the table, owned by this process. Raises FileExistsError while another
+        supervisor holds `name` (tracked by an InstanceLock next to the daemon's).
+        """
+        from app.daemon import InstanceLock
+
+        lock = InstanceLock(settings.PROJECT_ROOT / "logs" / f"{name}.lock")
+        if not lock.acquire():
+            raise FileExistsError(f"Fleet status table '{name}' belongs to a running supervisor")
+        size = _HEADER.size + _RECORD.size * len(usernames)
+        try:
+            # Stale segment from a crashed supervisor (we hold the lock, so nobody else owns it)
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except BaseException:
+            lock.release()
+            raise
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, _VERSION, len(usernames))
+        for slot, username in enumerate(usernames):
+            _RECORD.pack_into(shm.buf, cls._offset(slot), 0, username.encode()[:32], 0, 0, 0.0, 0.0, 0.0)
+        return cls(shm, owner=True, lock=lock)
+
+    @classmethod
+    def attach(cls, name: str) -> "StatusTable":
+        shm = shared_memory.SharedMemory(name=name)
+        if multiprocessing.parent_process() is None:
+            # Readers outside the fleet (e.g. the GUI) must not unlink the segment on exit
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return cls(shm, owner=False)
+
+    @staticmethod
+    def _offset(slot: int) -> int:
+        return _HEADER.size + slot * _RECORD.size
+
+    def update(self, slot: int, online: Optional[bool] = None, latency_ms: Optional[float] = None,
+               last_probe: Optional[float] = None, last_login: Optional[float] = None,
+               failures: Optional[int] = None):
+        """Update selected fields of one slot (single writer per slot)."""
+        offset = self._offset(slot)
+        seq, name, cur_online, cur_failures, cur_latency, cur_probe, cur_login = _RECORD.unpack_from(self.shm.buf, offset)
+        seq &= ~1  # A previous writer of this slot may have died mid-update and left it odd
+        _SEQ.pack_into(self.shm.buf, offset, seq + 1)
+        _RECORD.pack_into(
+            self.shm.buf, offset, seq + 1, name,
+            int(cur_online if online is None else online),
+            cur_failures if failures is None else failures,
+            cur_latency if latency_ms is None else latency_ms,
+            cur_probe if last_probe is None else last_probe,
+            cur_login if last_login is None else last_login,
+        )
+        _SEQ.pack_into(self.shm.buf, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def read(self, slot: int, timeout: float = 0.05) -> Optional[AccountStatus]:
+        """
+        Read one slot consistently, retrying while a writer is mid-update. If the slot
+        stays mid-update for `timeout` seconds (the writer died there) returns the last
+        consistent read of the slot, or None if there never was one.
+        """
+        offset = self._offset(slot)
+        deadline = time.monotonic() + timeout
+        while True:
+            record = _RECORD.unpack_from(self.shm.buf, offset)
+            if record[0] % 2 == 0 and _SEQ.unpack_from(self.shm.buf, offset)[0] == record[0]:
+                break
+            if time.monotonic() >= deadline:
+                return self._last_good.get(slot)
+            time.sleep(0)  # Yield, so a writer thread in this process can finish its update
+        _, name, online, failures, latency, probe, login = record
+        status = AccountStatus(name.rstrip(b"\0").decode(errors="replace"), bool(online), failures, latency, probe, login)
+        self._last_good[slot] = status
+        return status
+
+    def read_all(self) -> List[AccountStatus]:
+        """Every readable slot (a slot stuck mid-update with no earlier read is left out)."""
+        return [st for st in map(self.read, range(self.slots)) if st is not None]
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        if self.lock:
+            self.lock.release()
+
+
+def _run_account(table: StatusTable, slot: int, account: Account, stop_event, history=None):
+    """Run the regular keep-alive loop for one account, publishing into its slot."""
+    from app.client import SZUNetworkClient
+    from app.history import attach_history
+
+    client = SZUNetworkClient(username=account.username, password=account.password, ip=account.ip or None)
+    if history:
+        attach_history(client, history)
+    client.on_probe.append(lambda online, latency_ms: table.update(
+        slot, online=online, latency_ms=latency_ms, last_probe=time.time()))
+    client.on_login.append(lambda success, latency_ms, error: table.update(
+        slot, online=success, last_login=time.time(), failures=client.login_failures))
+    client.keep_alive(stop_event=stop_event)
+
+
+def _worker_main(table_name: str, shard: List[tuple], stop_event):
+    """Worker process: one keep-alive thread per account in its shard."""
+    from app.log_utils import setup_logger
+
+    setup_logger()
+    table = StatusTable.attach(table_name)
+    history = None
+    if settings.HISTORY_ENABLED:
+        from app.history import HistoryStore
+        history = HistoryStore(settings.HISTORY_DB_PATH)
+
+    threads = []
+    for slot, account in shard:
+        t = threading.Thread(
+            target=_run_account, args=(table, slot, Account(*account), stop_event, history),
+            name=f"fleet-{account[0]}", daemon=True
+        )
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    if history:
+        history.close()
+    table.close()
+
+
+class FleetSupervisor:
+    """
+    Shard accounts across worker processes, each running `keep_alive` per account.
+    """
+    def __init__(self, accounts: Sequence[Account], workers: int = 2, table_name: str = "szu_net_fleet"):
+        self.accounts = list(accounts)
+        self.workers = max(1, min(workers, len(self.accounts)))
+        self.table_name = table_name
+        self.stop_event = multiprocessing.Event()
+        self.table: Optional[StatusTable] = None
+        self.processes: List[multiprocessing.Process] = []
+        # Round-robin sharding keeps shard sizes within one of each other
+        self.shards = [
+            [(slot, tuple(acc)) for slot, acc in enumerate(self.accounts) if slot % self.workers == w]
+            for w in range(self.workers)
+        ]
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        proc = multiprocessing.Process(
+            target=_worker_main, args=(self.table_name, self.shards[index], self.stop_event),
+            name=f"fleet-worker-{index}", daemon=True
+        )
+        proc.start()
+        return proc
+
+    def start(self):
+        self.table = StatusTable.create(self.table_name, [a.username for a in self.accounts])
+        self.processes = [self._spawn(i) for i in range(self.workers)]
+        logger.info(f"Fleet started: {len(self.accounts)} accounts on {self.workers} workers (table: {self.table_name})")
+
+    def check_workers(self):
+        """Restart workers that died unexpectedly."""
+        for i, proc in enumerate(self.processes):
+            if not proc.is_alive() and not self.stop_event.is_set():
+                logger.warning(f"Fleet worker {i} exited (code {proc.exitcode}), restarting")
+                self.processes[i] = self._spawn(i)
+
+    def status(self) -> List[AccountStatus]:
+        return self.table.read_all() if self.table else []
+
+    def stop(self, timeout: float = 10):
+        self.stop_event.set()
+        for proc in self.processes:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+        if self.table:
+            self.table.close()
+            self.table = None
+        logger.info("Fleet stopped.")
@@ -0,0 +1,204 @@
+import math
+import time
+import queue
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    ts REAL NOT NULL,
+    account TEXT NOT NULL,
+    online INTEGER NOT NULL,
+    latency_ms REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logins (
+    ts REAL NOT NULL,
+    account TEXT NOT NULL,
+    zone TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_probes_ts ON probes (ts);
+CREATE INDEX IF NOT EXISTS idx_probes_account_ts ON probes (account, ts);
+CREATE INDEX IF NOT EXISTS idx_logins_ts ON logins (ts);
+CREATE INDEX IF NOT EXISTS idx_logins_account_ts ON logins (account, ts);
+"""
+
+_INSERTS = {
+    "probes": "INSERT INTO probes (ts, account, online, latency_ms) VALUES (?, ?, ?, ?)",
+    "logins": "INSERT INTO logins (ts, account, zone, success, latency_ms, error) VALUES (?, ?, ?, ?, ?, ?)",
+}
+
+
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class HistoryStore:
+    """
+    Local SQLite record of probe transitions and login attempts.
+    Writes are queued and flushed in batches by a background thread (WAL mode),
+    so recording never blocks the keep-alive loop on disk I/O.
+    """
+    def __init__(self, path, batch_size: int = 50, flush_interval: float = 2.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        _connect(self.path).close()  # Create schema up front so readers never race the writer
+        self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def record_probe(self, account: str, online: bool, latency_ms: float, ts: Optional[float] = None):
+        self._queue.put(("probes", (ts or time.time(), account, int(online), latency_ms)))
+
+    def record_login(self, account: str, zone: str, success: bool, latency_ms: float, error: str = "",
+                     ts: Optional[float] = None):
+        self._queue.put(("logins", (ts or time.time(), account, zone, int(success), latency_ms, error or "")))
+
+    def _flush(self, conn: sqlite3.Connection, batch):
+        rows: Dict[str, list] = {}
+        for table, row in batch:
+            rows.setdefault(table, []).append(row)
+        try:
+            with conn:
+                for table, values in rows.items():
+                    conn.executemany(_INSERTS[table], values)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write history batch ({len(batch)} rows): {e}")
+
+    def _run(self):
+        conn = _connect(self.path)
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(conn, batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            self._flush(conn, batch)
+        conn.close()
+
+    def close(self):
+        """Flush pending rows and stop the writer."""
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+
+
+def attach_history(client, store: HistoryStore):
+    """
+    Record a client's probe transitions and login attempts into `store`.
+    Only probes that change the online state are stored.
+    """
+    from app.config import settings
+
+    state = {"online": None}
+
+    def on_probe(online: bool, latency_ms: float):
+        if online != state["online"]:
+            state["online"] = online
+            store.record_probe(client.username, online, latency_ms)
+
+    def on_login(success: bool, latency_ms: float, error: str):
+        store.record_login(client.username, settings.NETWORK_ZONE, success, latency_ms, error)
+
+    client.on_probe.append(on_probe)
+    client.on_login.append(on_login)
+
+
+# --- Queries ---
+
+@dataclass
+class HistoryStats:
+    """Aggregates over a time window, all durations in milliseconds."""
+    account: str
+    outages: int
+    mttr_ms: float
+    outage_p50_ms: float
+    outage_p90_ms: float
+    logins: int
+    login_success_rate: float
+    login_p50_ms: float
+    login_p90_ms: float
+    login_p99_ms: float
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def query_stats(path, since: float, until: Optional[float] = None, account: Optional[str] = None) -> List[HistoryStats]:
+    """
+    Compute outage counts, MTTR and latency percentiles per account.
+    An outage runs from an offline transition to the next online transition;
+    outages still open at the end of the window are not counted.
+    """
+    until = until or time.time()
+    conn = _connect(path)
+    try:
+        where, args = "ts >= ? AND ts < ?", [since, until]
+        if account:
+            where += " AND account = ?"
+            args.append(account)
+
+        outages: Dict[str, List[float]] = {}
+        down_since: Dict[str, float] = {}
+        for ts, acc, online in conn.execute(
+                f"SELECT ts, account, online FROM probes WHERE {where} ORDER BY account, ts", args):
+            outages.setdefault(acc, [])
+            if not online:
+                down_since.setdefault(acc, ts)
+            elif acc in down_since:
+                outages[acc].append((ts - down_since.pop(acc)) * 1000)
+
+        logins: Dict[str, List[float]] = {}
+        successes: Dict[str, int] = {}
+        for acc, success, latency in conn.execute(
+                f"SELECT account, success, latency_ms FROM logins WHERE {where} ORDER BY account, latency_ms", args):
+            logins.setdefault(acc, []).append(latency)
+            successes[acc] = successes.get(acc, 0) + success
+    finally:
+        conn.close()
+
+    results = []
+    for acc in sorted(set(outages) | set(logins)):
+        durations = sorted(outages.get(acc, []))
+        latencies = logins.get(acc, [])
+        results.append(HistoryStats(
+            account=acc,
+            outages=len(durations),
+            mttr_ms=sum(durations) / len(durations) if durations else 0.0,
+            outage_p50_ms=percentile(durations, 50),
+            outage_p90_ms=percentile(durations, 90),
+            logins=len(latencies),
+            login_success_rate=successes.get(acc, 0) / len(latencies) if latencies else 0.0,
+            login_p50_ms=percentile(latencies, 50),
+            login_p90_ms=percentile(latencies, 90),
+            login_p99_ms=percentile(latencies, 99),
+        ))
+    return results
@@ -0,0 +1,144 @@
+import time
+import random
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.bench import process_usage
+from app.history import percentile
+
+# Arrival patterns: when each simulated client starts its login within the window
+PATTERNS = ("herd", "staggered", "poisson")
+
+
+def arrival_offsets(count: int, pattern: str, window: float, seed: Optional[int] = None) -> List[float]:
+    """
+    Start offsets (seconds from t0) for `count` clients.
+    herd:      everyone at once (a building's switch comes back)
+    staggered: evenly spaced over the window
+    poisson:   random arrivals at an average rate of count/window
+    """
+    if pattern == "herd" or window <= 0:
+        return [0.0] * count
+    if pattern == "staggered":
+        return [i * window / count for i in range(count)]
+    if pattern == "poisson":
+        rng = random.Random(seed)
+        offsets, t = [], 0.0
+        for _ in range(count):
+            offsets.append(t)
+            t += rng.expovariate(count / window)
+        return offsets
+    raise ValueError(f"Unknown arrival pattern: {pattern!r} (expected one of {', '.join(PATTERNS)})")
+
+
+def synthetic_ips(count: int, network: str = "10.64.0.0/10") -> List[str]:
+    """Distinct host addresses from `network`, one per simulated client."""
+    hosts = ipaddress.ip_network(network).hosts()
+    return [str(next(hosts)) for _ in range(count)]
+
+
+@dataclass
+class LoadResult:
+    """Client-side view of one load run (latencies in milliseconds)."""
+    clients: int
+    pattern: str
+    zone: str
+    succeeded: int
+    failed: int
+    wall_s: float
+    logins_per_s: float
+    latency_p50_ms: float
+    latency_p90_ms: float
+    latency_p99_ms: float
+    latency_max_ms: float
+    queue_p50_ms: float                 # Scheduled arrival -> login start (client pool saturation)
+    queue_p99_ms: float
+    cpu_ms_per_login: float             # Client process + its JS runtime children; not the stand-in
+    errors: Dict[str, int] = field(default_factory=dict)
+    portal: Dict[str, Any] = field(default_factory=dict)
+
+
+def run_load(clients: int, pattern: str = "herd", window: float = 10.0, zone: str = "teaching",
+             concurrency: int = 64, password: str = "loadtest", delay_ms: float = 0,
+             seed: Optional[int] = None) -> LoadResult:
+    """
+    Log `clients` simulated SZUNetworkClient instances (own account and synthetic IP each)
+    into a local portal stand-in following an arrival pattern, and measure the result.
+    Logins run on a pool of `concurrency` threads, like a controller box would.
+    """
+    from app.config import settings
+    from app.client import SZUNetworkClient
+    from app.portal_standin import PortalStandin
+
+    standin = PortalStandin(password=password, delay_ms=delay_ms)
+    standin.start()
+    saved = {k: getattr(settings, k) for k in ("GET_CHALLENGE_API", "SRUN_PORTAL_API", "USER_INFO_API", "DORM_PORTAL_API", "NETWORK_ZONE")}
+    standin.apply_to(settings)
+    settings.NETWORK_ZONE = zone
+
+    accounts: List[SZUNetworkClient] = []
+    try:
+        accounts.extend(
+            SZUNetworkClient(username=f"load{i:05d}", password=password, ip=ip)
+            for i, ip in enumerate(synthetic_ips(clients))
+        )
+        offsets = arrival_offsets(clients, pattern, window, seed)
+        latencies: List[float] = []
+        queued: List[float] = []
+        errors: Dict[str, int] = {}
+        lock = threading.Lock()
+
+        def attempt(client, due: float):
+            start = time.perf_counter()
+            ok = client.login()
+            done = time.perf_counter()
+            with lock:
+                latencies.append((done - start) * 1000)
+                queued.append(max(0.0, start - due) * 1000)
+                if not ok:
+                    key = client.last_error or "unknown"
+                    errors[key] = errors.get(key, 0) + 1
+            return ok
+
+        logger.info(f"Load: {clients} clients, {pattern} over {window}s, {concurrency} threads -> {standin.base_url}")
+        cpu0 = process_usage(children=True)[0]
+        t0 = time.perf_counter()
+        futures = []
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as pool:
+            for client, offset in zip(accounts, offsets):
+                due = t0 + offset
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(attempt, client, due))
+            succeeded = sum(1 for f in futures if f.result())
+        wall = time.perf_counter() - t0
+        cpu = process_usage(children=True)[0] - cpu0  # Before the stand-in process is reaped
+    finally:
+        for client in accounts:
+            client.close()
+        portal = standin.stop()
+        for key, value in saved.items():
+            setattr(settings, key, value)
+
+    latencies.sort()
+    queued.sort()
+    return LoadResult(
+        clients=clients, pattern=pattern, zone=zone,
+        succeeded=succeeded, failed=clients - succeeded,
+        wall_s=wall, logins_per_s=clients / wall if wall else 0.0,
+        latency_p50_ms=percentile(latencies, 50),
+        latency_p90_ms=percentile(latencies, 90),
+        latency_p99_ms=percentile(latencies, 99),
+        latency_max_ms=latencies[-1] if latencies else 0.0,
+        queue_p50_ms=percentile(queued, 50),
+        queue_p99_ms=percentile(queued, 99),
+        cpu_ms_per_login=cpu * 1000 / clients if clients else 0.0,
+        errors=errors,
+        portal=portal,
+    )
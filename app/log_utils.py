@@ -1,4 +1,13 @@
 import sys
+import gzip
+import json
+import time
+import queue
+import shutil
+import atexit
+import datetime
+import threading
+import traceback
 from pathlib import Path
 from loguru import logger
 
@@ -11,15 +20,117 @@ class QueueSink:
         self.log_queue = log_queue
 
     def write(self, message):
-        self.log_queue.put(message)
+        try:
+            self.log_queue.put_nowait(message)
+        except queue.Full:
+            pass  # UI not draining (e.g. hidden for days); never block the logging thread
 
-def setup_logger(ui_queue=None):
+class AsyncJsonlSink:
+    """
+    Non-blocking file sink for Loguru.
+    The caller only pushes a tuple into a bounded queue; a background thread
+    serializes records as JSON lines, rotates the file daily and gzips old files.
+    When the queue is full, records are dropped (and counted) instead of blocking.
+    """
+    def __init__(self, path, max_queue=10000, retention_days=7):
+        self.path = Path(path)
+        self.retention_days = retention_days
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._day = datetime.date.today()
+        self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.stop)
+
+    def write(self, message):
+        r = message.record
+        try:
+            self._queue.put_nowait((
+                r["time"].timestamp(), r["level"].name, r["name"], r["function"],
+                r["line"], r["message"], r["exception"], r["thread"].name
+            ))
+        except queue.Full:
+            self.dropped += 1
+
+    def _serialize(self, item) -> str:
+        ts, level, name, function, line, msg, exc, thread = item
+        entry = {
+            "ts": round(ts, 6), "level": level, "logger": name,
+            "function": function, "line": line, "thread": thread, "message": msg,
+        }
+        if exc is not None and exc.type is not None:
+            entry["exception"] = "".join(traceback.format_exception(exc.type, exc.value, exc.traceback))
+        return json.dumps(entry, ensure_ascii=False)
+
+    def _rotate(self, fh, today):
+        """Close the current file, gzip it under yesterday's date and prune old archives."""
+        fh.close()
+        archive = self.path.with_name(f"{self.path.stem}.{self._day.isoformat()}{self.path.suffix}.gz")
+        try:
+            with open(self.path, "rb") as src, gzip.open(archive, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            self.path.unlink()
+        except OSError:
+            pass
+        cutoff = time.time() - self.retention_days * 86400
+        for old in self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}.gz"):
+            try:
+                if old.stat().st_mtime < cutoff:
+                    old.unlink()
+            except OSError:
+                pass
+        self._day = today
+        return open(self.path, "a", encoding="utf-8")
+
+    def _run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.path, "a", encoding="utf-8")
+        reported = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            today = datetime.date.today()
+            if today != self._day:
+                fh = self._rotate(fh, today)
+            lines = [self._serialize(item)]
+            # Drain whatever else is queued and write it in one go
+            while len(lines) < 512:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                lines.append(self._serialize(item))
+            if self.dropped != reported:
+                lines.append(json.dumps({"ts": time.time(), "level": "WARNING", "logger": __name__,
+                                         "message": f"Log queue full: {self.dropped - reported} records dropped"}))
+                reported = self.dropped
+            fh.write("\n".join(lines) + "\n")
+            fh.flush()
+        fh.close()
+
+    def stop(self):
+        """Flush queued records and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+def setup_logger(ui_queue=None, async_file=None):
     """
     Configure the logging system with a triple-stream strategy:
     1. Console: INFO (for dev/CLI)
     2. File: DEBUG (for auditing, auto-creates directory)
+       With async_file (default: settings.LOG_ASYNC) the file stream is JSONL,
+       written by a background thread and rotated into gzip archives.
     3. GUI: INFO (for user, if queue provided)
     """
+    from app.config import settings
+
+    if async_file is None:
+        async_file = settings.LOG_ASYNC
     logger.remove()
     
     # 1. Console Stream
@@ -37,14 +148,22 @@ def setup_logger(ui_queue=None):
     except Exception:
         pass # Handle permission errors gracefully if needed
     
-    logger.add(
-        str(log_path),
-        rotation="00:00",
-        retention="7 days",
-        level="DEBUG",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        encoding="utf-8"
-    )
+    if async_file:
+        # Structured JSONL, formatted off the caller's thread
+        logger.add(
+            AsyncJsonlSink(log_path.with_suffix(".jsonl"), max_queue=settings.LOG_QUEUE_SIZE),
+            level="DEBUG",
+            format="{message}"
+        )
+    else:
+        logger.add(
+            str(log_path),
+            rotation="00:00",
+            retention="7 days",
+            level="DEBUG",
+            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+            encoding="utf-8"
+        )
     
     # 3. GUI Stream (Frontend)
     if ui_queue:
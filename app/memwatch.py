@@ -0,0 +1,187 @@
+import gc
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 if unknown)."""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if os.name == "nt":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return 0
+        # macOS/BSD: only the peak is available without extra dependencies
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (OSError, ValueError, AttributeError, ImportError):
+        return 0
+
+
+class MemoryWatchdog:
+    """
+    Samples RSS and a tracemalloc snapshot every `interval` seconds.
+
+    - Each sample logs the top allocation sites that grew since the previous one.
+    - If RSS exceeds `budget_mb` (0 = no budget), the registered soft-reset hooks
+      run (drop sessions, caches, UI buffers) followed by a full GC, at most once
+      per `reset_cooldown` seconds so a budget below the baseline cannot thrash.
+    - The last `keep` samples are kept for `summary()`, whose growth rate over the
+      window is the number to watch when proving a flat long-run profile.
+    """
+    def __init__(self, interval: float = 600, budget_mb: int = 0, top: int = 10,
+                 keep: int = 288, frames: int = 1, reset_cooldown: float = 3600):
+        self.interval = interval
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.top = top
+        self.frames = frames
+        self.resets = 0
+        self.reset_cooldown = reset_cooldown
+        self._last_reset: Optional[float] = None
+        self.reset_hooks: List[Callable[[], None]] = []
+        self.samples = deque(maxlen=keep)  # (ts, rss_bytes, traced_bytes)
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_reset_hook(self, hook: Callable[[], None]):
+        self.reset_hooks.append(hook)
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+        self._thread = threading.Thread(target=self._run, name="memory-watchdog", daemon=True)
+        self._thread.start()
+        budget = f"{self.budget_bytes // (1024 * 1024)} MB" if self.budget_bytes else "none"
+        logger.info(f"Memory watchdog started (every {self.interval}s, budget: {budget})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._snapshot = None
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Memory watchdog sample failed: {e}")
+            if self._stop.wait(self.interval):
+                break
+
+    def _growth(self, snapshot: tracemalloc.Snapshot) -> List[str]:
+        if self._snapshot is None:
+            return []
+        lines = []
+        for stat in snapshot.compare_to(self._snapshot, "lineno")[:self.top]:
+            if stat.size_diff <= 0:
+                break
+            lines.append(f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks) {stat.traceback[0]}")
+        return lines
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample; soft-reset if over budget."""
+        rss = current_rss()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        traced = sum(stat.size for stat in snapshot.statistics("filename"))
+        growth = self._growth(snapshot)
+        self._snapshot = snapshot
+        self.samples.append((time.time(), rss, traced))
+
+        logger.debug(f"Memory: RSS {rss / 1048576:.1f} MB, traced {traced / 1048576:.2f} MB")
+        if growth:
+            logger.debug("Top allocation growth since last sample:\n  " + "\n  ".join(growth))
+
+        cooled_down = self._last_reset is None or time.monotonic() - self._last_reset >= self.reset_cooldown
+        if self.budget_bytes and rss > self.budget_bytes and cooled_down:
+            logger.warning(f"RSS {rss / 1048576:.1f} MB exceeds budget "
+                           f"{self.budget_bytes / 1048576:.0f} MB, running soft reset")
+            self.soft_reset()
+        return {"rss": rss, "traced": traced, "growth": growth}
+
+    def soft_reset(self):
+        """Run every reset hook (a failing hook does not stop the others), then collect garbage."""
+        for hook in list(self.reset_hooks):
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"Memory reset hook {hook!r} failed: {e}")
+        gc.collect()
+        self.resets += 1
+        self._last_reset = time.monotonic()
+        # Growth after a reset is measured against the post-reset heap
+        self._snapshot = None
+
+    def summary(self) -> Dict[str, Any]:
+        """RSS over the kept window: first/last/peak in MB and the linear growth rate in MB/hour."""
+        if not self.samples:
+            return {"samples": 0, "resets": self.resets}
+        ts = [s[0] for s in self.samples]
+        rss = [s[1] / 1048576 for s in self.samples]
+        slope = 0.0
+        if len(ts) > 1:
+            # Least-squares slope, so a single spike does not dominate
+            mean_t, mean_r = sum(ts) / len(ts), sum(rss) / len(rss)
+            var = sum((t - mean_t) ** 2 for t in ts)
+            if var:
+                slope = sum((t - mean_t) * (r - mean_r) for t, r in zip(ts, rss)) / var * 3600
+        return {
+            "samples": len(self.samples),
+            "window_s": round(ts[-1] - ts[0], 1),
+            "rss_first_mb": round(rss[0], 1),
+            "rss_last_mb": round(rss[-1], 1),
+            "rss_peak_mb": round(max(rss), 1),
+            "traced_last_mb": round(self.samples[-1][2] / 1048576, 2),
+            "growth_mb_per_hour": round(slope, 3),
+            "budget_mb": self.budget_bytes // 1048576,
+            "resets": self.resets,
+        }
+
+
+def client_reset_hook(client) -> Callable[[], None]:
+    """
+    Soft reset for a keep-alive client: fresh HTTP session and probe connection.
+    The watchdog thread only stages it; the loop thread runs it before its next check
+    (like ConfigReloader), so a probe or login in flight keeps its connection.
+    """
+    pending = threading.Event()
+
+    def apply():
+        if pending.is_set():
+            pending.clear()
+            client.reset_session()
+
+    client.before_check.append(apply)
+    return pending.set
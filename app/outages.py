@@ -0,0 +1,95 @@
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from app.history import percentile
+
+# States of the outage state machine
+ONLINE = "online"
+DETECTED = "detected"      # A probe failed, no login attempt yet
+RECOVERING = "recovering"  # At least one login attempt made, not yet confirmed online
+
+
+class OutageTracker:
+    """
+    Outage state machine fed by the client's probe/login hooks.
+
+        ONLINE --probe fails--> DETECTED --login attempt--> RECOVERING --probe ok--> ONLINE
+
+    Each finished outage is stored as one row of fixed-size `array` columns
+    (a ring buffer), so memory stays constant regardless of uptime:
+      last_ok     last successful probe before the outage (outage start, upper bound)
+      detected    first failed probe
+      first_login first login attempt
+      recovered   first successful probe afterwards (the confirming probe)
+      confirm_ms  latency of that confirming probe
+    """
+    COLUMNS = ("last_ok", "detected", "first_login", "recovered", "confirm_ms")
+
+    def __init__(self, capacity: int = 1024, clock=time.time):
+        self.capacity = capacity
+        self.clock = clock
+        self.state = ONLINE
+        self.count = 0  # Total outages recorded (may exceed capacity)
+        self._cols = {name: array("d", bytes(8 * capacity)) for name in self.COLUMNS}
+        self._last_ok = 0.0
+        self._current: Dict[str, float] = {}
+
+    def on_probe(self, online: bool, latency_ms: float):
+        now = self.clock()
+        if online:
+            if self.state != ONLINE:
+                self._close(now, latency_ms)
+            self._last_ok = now
+        elif self.state == ONLINE:
+            self.state = DETECTED
+            self._current = {"last_ok": self._last_ok or now, "detected": now, "first_login": 0.0}
+
+    def on_login(self, success: bool, latency_ms: float, error: str):
+        if self.state == DETECTED:
+            self.state = RECOVERING
+            self._current["first_login"] = self.clock() - latency_ms / 1000
+
+    def _close(self, now: float, latency_ms: float):
+        slot = self.count % self.capacity
+        row = dict(self._current, recovered=now, confirm_ms=latency_ms)
+        for name in self.COLUMNS:
+            self._cols[name][slot] = row[name]
+        self.count += 1
+        self.state = ONLINE
+        self._current = {}
+
+    def records(self, limit: Optional[int] = None) -> List[Dict[str, float]]:
+        """Stored outages, oldest first."""
+        n = min(self.count, self.capacity)
+        if limit is not None:
+            n = min(n, limit)
+        rows = []
+        for i in range(self.count - n, self.count):
+            slot = i % self.capacity
+            rows.append({name: self._cols[name][slot] for name in self.COLUMNS})
+        return rows
+
+    def summary(self) -> Dict[str, Any]:
+        """Time-to-detect / time-to-recover distributions in milliseconds."""
+        rows = self.records()
+        ttd = sorted((r["detected"] - r["last_ok"]) * 1000 for r in rows)
+        ttr = sorted((r["recovered"] - r["detected"]) * 1000 for r in rows)
+        to_login = sorted((r["first_login"] - r["detected"]) * 1000 for r in rows if r["first_login"])
+
+        def dist(values):
+            return {
+                "p50": round(percentile(values, 50), 1),
+                "p90": round(percentile(values, 90), 1),
+                "p99": round(percentile(values, 99), 1),
+                "max": round(values[-1], 1) if values else 0.0,
+            }
+
+        return {
+            "state": self.state,
+            "outages": self.count,
+            "stored": len(rows),
+            "time_to_detect_ms": dist(ttd),
+            "time_to_first_login_ms": dist(to_login),
+            "time_to_recover_ms": dist(ttr),
+        }
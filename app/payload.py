@@ -0,0 +1,56 @@
+import json
+from typing import Callable, Tuple
+
+from app.config import settings
+from encryption.srun_md5 import get_md5
+from encryption.srun_sha1 import get_sha1
+from encryption.srun_xencode import get_xencode
+
+
+def build_info_str(username: str, password: str, ip: str, ac_id: str, enc_ver: str) -> str:
+    """Construct the info JSON string required for encryption."""
+    info = {
+        "username": username,
+        "password": password,
+        "ip": ip,
+        "acid": ac_id,
+        "enc_ver": enc_ver
+    }
+    # Mimic the browser's JSON formatting (no spaces between separators)
+    return json.dumps(info, separators=(',', ':'))
+
+
+def build_chksum(token: str, username: str, hmd5: str, ac_id: str, ip: str, n: str, type_: str, info_str: str) -> str:
+    """Calculate the checksum string (SHA1 input)."""
+    chkstr = f"{token}{username}"
+    chkstr += f"{token}{hmd5}"
+    chkstr += f"{token}{ac_id}"
+    chkstr += f"{token}{ip}"
+    chkstr += f"{token}{n}"
+    chkstr += f"{token}{type_}"
+    chkstr += f"{token}{info_str}"
+    return chkstr
+
+
+def build_payload(username: str, password: str, ip: str, token: str,
+                  encode: Callable[[str], str]) -> Tuple[str, str, str]:
+    """
+    Return (encoded_info, hmd5, chksum) for a login attempt.
+
+    Nothing is cached: every login fetches a fresh challenge, so a per-challenge cache
+    never hits, and anything keyed above it would have to hold the plaintext password.
+
+    Args:
+        encode: The SRUN custom base64 encoder (JS `_encode`).
+    """
+    ac_id, enc_ver = settings.SRUN_AC_ID, settings.SRUN_ENC
+    n, type_ = settings.SRUN_N, settings.SRUN_TYPE
+    info_str = build_info_str(username, password, ip, ac_id, enc_ver)
+
+    # 1. Encode info using custom XEncode and Base64
+    encoded_info = "{SRBX1}" + encode(get_xencode(info_str, token))
+    # 2. MD5 hash of password
+    hmd5 = get_md5(password, token)
+    # 3. SHA1 checksum
+    chksum = get_sha1(build_chksum(token, username, hmd5, ac_id, ip, n, type_, encoded_info))
+    return encoded_info, hmd5, chksum
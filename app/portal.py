@@ -0,0 +1,132 @@
+import re
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional
+
+# JSONP wrapper: callback name, '(', payload, ')', optional ';'
+_JSONP_RE = re.compile(rb'^\s*[\w$.]+\s*\((.*)\)\s*;?\s*$', re.DOTALL)
+
+# Field scanners used while streaming (work on raw bytes, before decoding)
+_FIELD_RES = {
+    name: re.compile(rb'"' + name.encode() + rb'"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+)')
+    for name in ("challenge", "suc_msg", "error_msg", "error", "res", "ecode",
+                 "result", "msg", "ret_code", "online_ip", "client_ip")
+}
+
+# Dr.COM replies "already online" in several flavours
+_ALREADY_ONLINE_MARKERS = ("已经在线", "already online")
+
+
+@dataclass
+class PortalResponse:
+    """
+    Typed view of a SRUN / Dr.COM JSONP reply.
+    """
+    success: bool = False
+    error_code: str = ""
+    message: str = ""
+    server_ip: str = ""
+    challenge: str = ""
+    already_online: bool = False
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+def decode_body(body: bytes) -> str:
+    """
+    Decode a portal body. SRUN answers in UTF-8, Dr.COM sometimes in GBK.
+    """
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode("gbk", errors="replace")
+
+
+def _scan_fields(body: bytes, names: Iterable[str]) -> Dict[str, Any]:
+    """Extract top-level scalar fields from a (possibly truncated) body."""
+    found = {}
+    for name in names:
+        pattern = _FIELD_RES.get(name)
+        if pattern is None:
+            continue
+        match = pattern.search(body)
+        if match:
+            try:
+                found[name] = json.loads(decode_body(match.group(1)))
+            except ValueError:
+                found[name] = decode_body(match.group(1)).strip('"')
+    return found
+
+
+def parse_portal_body(body: bytes) -> PortalResponse:
+    """
+    Parse a portal reply straight from bytes.
+    Strips the JSONP callback wrapper and classifies the result.
+    """
+    match = _JSONP_RE.match(body)
+    payload = match.group(1) if match else body.strip()
+
+    try:
+        data = json.loads(decode_body(payload))
+        if not isinstance(data, dict):
+            data = {}
+    except ValueError:
+        # Truncated (early-terminated) or malformed body: fall back to field scanning
+        data = _scan_fields(payload, _FIELD_RES.keys())
+
+    return _classify(data)
+
+
+def _classify(data: Dict[str, Any]) -> PortalResponse:
+    """Map raw SRUN / Dr.COM fields onto a PortalResponse."""
+    result = PortalResponse(data=data)
+    result.challenge = str(data.get("challenge") or "")
+    result.server_ip = str(data.get("online_ip") or data.get("client_ip") or "")
+
+    if "result" in data:
+        # Dr.COM: {"result":1,"msg":"..."} / {"result":0,"msg":"...","ret_code":2}
+        result.message = str(data.get("msg") or "")
+        result.error_code = str(data.get("ret_code", ""))
+        lowered = result.message.lower()
+        result.already_online = (
+            result.error_code == "2"
+            or any(marker in lowered for marker in _ALREADY_ONLINE_MARKERS)
+        )
+        result.success = str(data["result"]) == "1" or result.message == "成功" or result.already_online
+    else:
+        # SRUN: {"error":"ok","res":"ok","suc_msg":"login_ok"} / {"error":"login_error","error_msg":"E2901: ..."}
+        error = str(data.get("error") or "")
+        result.message = str(data.get("suc_msg") or data.get("error_msg") or data.get("error") or "")
+        result.error_code = str(data.get("ecode") or "") if error != "ok" else ""
+        if not result.error_code and error and error != "ok":
+            result.error_code = error
+        result.already_online = data.get("suc_msg") == "ip_already_online_error"
+        result.success = bool(data.get("suc_msg")) or (error == "ok" and data.get("res", "ok") == "ok")
+
+    return result
+
+
+def read_portal_response(resp, fields: Optional[Iterable[str]] = None, chunk_size: int = 512) -> PortalResponse:
+    """
+    Read a streamed response and parse it as a portal reply.
+
+    Args:
+        resp: A streamed HTTP response exposing iter_content() and close().
+        fields: If given, stop reading as soon as all of these fields have arrived.
+        chunk_size: Bytes read per iteration.
+
+    Returns:
+        PortalResponse
+    """
+    wanted = tuple(fields or ())
+    buf = bytearray()
+    try:
+        for chunk in resp.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            buf += chunk
+            if wanted and len(_scan_fields(buf, wanted)) == len(wanted):
+                break
+    finally:
+        resp.close()
+
+    return parse_portal_body(bytes(buf))
@@ -0,0 +1,246 @@
+import json
+import time
+import secrets
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from encryption.srun_md5 import get_md5
+from encryption.srun_sha1 import get_sha1
+from app.payload import build_chksum
+
+# Same paths as the real portals, so only the scheme/host/port of the settings change
+CHALLENGE_PATH = "/cgi-bin/get_challenge"
+SRUN_PORTAL_PATH = "/cgi-bin/srun_portal"
+USER_INFO_PATH = "/cgi-bin/rad_user_info"
+DORM_PORTAL_PATH = "/eportal/portal/login"
+
+
+class _PortalState:
+    """Issued challenges, online sessions and what the portal saw (arrivals per second, concurrency)."""
+    def __init__(self, password: str, challenge_ttl: float, delay_ms: float, session_seconds: float = 0,
+                 traffic_bps: float = 0):
+        self.password = password
+        self.challenge_ttl = challenge_ttl
+        self.delay = delay_ms / 1000
+        self.session_seconds = session_seconds     # SRUN session limit (0 = unlimited)
+        self.traffic_bps = traffic_bps             # Simulated account traffic reported in sum_bytes
+        self.lock = threading.Lock()
+        self.challenges: Dict[tuple, tuple] = {}  # (username, ip) -> (token, issued)
+        self.online = set()                        # (username, ip)
+        self.sessions: Dict[tuple, float] = {}     # SRUN (username, ip) -> add_time
+        self.arrivals: Dict[int, int] = {}         # unix second -> requests
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.counts = {"challenge": 0, "login_ok": 0, "login_failed": 0, "already_online": 0,
+                       "logout": 0, "user_info": 0, "expired": 0, "other": 0}
+
+    def expire(self):
+        """Drop SRUN sessions past the limit, like the portal does (caller holds the lock)."""
+        if not self.session_seconds:
+            return
+        now = time.time()
+        for key in [k for k, added in self.sessions.items() if now - added >= self.session_seconds]:
+            del self.sessions[key]
+            self.online.discard(key)
+            self.counts["expired"] += 1
+
+    def enter(self):
+        with self.lock:
+            second = int(time.time())
+            self.arrivals[second] = self.arrivals.get(second, 0) + 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self, outcome: str):
+        with self.lock:
+            self.in_flight -= 1
+            self.counts[outcome] += 1
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        state: _PortalState = self.server.state
+        state.enter()
+        outcome = "other"
+        try:
+            if state.delay:
+                time.sleep(state.delay)  # Models portal-side processing time
+            parts = urlsplit(self.path)
+            params = {k: v[0] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+            if parts.path == CHALLENGE_PATH:
+                outcome, body = "challenge", self._challenge(state, params)
+                callback = params.get("callback", "jQuery")
+            elif parts.path == SRUN_PORTAL_PATH:
+                if params.get("action") == "logout":
+                    outcome, body = self._srun_logout(state, params)
+                else:
+                    outcome, body = self._srun_login(state, params)
+                callback = params.get("callback", "jQuery")
+            elif parts.path == USER_INFO_PATH:
+                outcome, body = self._user_info(state, params)
+                callback = params.get("callback", "jQuery")
+            elif parts.path == DORM_PORTAL_PATH:
+                outcome, body = self._dorm_login(state, params)
+                callback = params.get("callback", "dr1003")
+            else:
+                self.send_error(404)
+                return
+            payload = f"{callback}({json.dumps(body, ensure_ascii=False)})".encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/javascript; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            state.leave(outcome)
+
+    @staticmethod
+    def _challenge(state: _PortalState, params) -> Dict[str, Any]:
+        token = secrets.token_hex(32)
+        key = (params.get("username", ""), params.get("ip", ""))
+        with state.lock:
+            state.challenges[key] = (token, time.monotonic())
+        return {"challenge": token, "client_ip": key[1], "ecode": 0, "error": "ok", "res": "ok"}
+
+    @staticmethod
+    def _srun_login(state: _PortalState, params):
+        username, ip = params.get("username", ""), params.get("ip", "")
+        with state.lock:
+            token, issued = state.challenges.pop((username, ip), ("", 0.0))
+        if not token or time.monotonic() - issued > state.challenge_ttl:
+            return "login_failed", {"error": "challenge_expire_error", "ecode": "E2531", "res": "challenge_expire_error"}
+
+        hmd5 = params.get("password", "").replace("{MD5}", "")
+        if state.password and hmd5 != get_md5(state.password, token):
+            return "login_failed", {"error": "login_error", "ecode": "E2901",
+                                    "error_msg": "E2901: (Third party 1)bind_user2: ldap_bind error"}
+        chkstr = build_chksum(token, username, hmd5, params.get("ac_id", ""), ip,
+                              params.get("n", ""), params.get("type", ""), params.get("info", ""))
+        if params.get("chksum") != get_sha1(chkstr):
+            return "login_failed", {"error": "sign_error", "ecode": "E2901", "error_msg": "sign_error"}
+
+        with state.lock:
+            state.expire()
+            if (username, ip) in state.online:
+                return "already_online", {"error": "ok", "res": "ok", "suc_msg": "ip_already_online_error"}
+            state.online.add((username, ip))
+            state.sessions[(username, ip)] = time.time()
+        return "login_ok", {"error": "ok", "res": "ok", "suc_msg": "login_ok", "online_ip": ip}
+
+    @staticmethod
+    def _srun_logout(state: _PortalState, params):
+        key = (params.get("username", ""), params.get("ip", ""))
+        with state.lock:
+            if state.sessions.pop(key, None) is None:
+                return "other", {"error": "not_online_error", "res": "not_online_error", "ecode": "E2833"}
+            state.online.discard(key)
+        return "logout", {"error": "ok", "res": "ok", "suc_msg": "logout_ok", "online_ip": key[1]}
+
+    @staticmethod
+    def _user_info(state: _PortalState, params):
+        """rad_user_info: the real portal keys on the source address; here `ip` or the newest session."""
+        ip = params.get("ip")
+        now = time.time()
+        with state.lock:
+            state.expire()
+            matches = [(added, key) for key, added in state.sessions.items() if ip is None or key[1] == ip]
+        if not matches:
+            return "user_info", {"error": "not_online_error", "client_ip": ip or "", "online_ip": ip or ""}
+        added, (username, online_ip) = max(matches)
+        return "user_info", {
+            "error": "ok", "user_name": username, "online_ip": online_ip, "add_time": int(added),
+            "keepalive_time": int(now), "sum_seconds": int(now - added),
+            "remain_seconds": max(0, int(added + state.session_seconds - now)) if state.session_seconds else 0,
+            "sum_bytes": int((now - added) * state.traffic_bps),
+        }
+
+    @staticmethod
+    def _dorm_login(state: _PortalState, params):
+        username = params.get("user_account", "").split(",")[-1]
+        ip = params.get("wlan_user_ip", "")
+        if state.password and params.get("user_password") != state.password:
+            return "login_failed", {"result": 0, "msg": "账号或密码错误", "ret_code": 1}
+        with state.lock:
+            if (username, ip) in state.online:
+                return "already_online", {"result": 0, "msg": "IP: " + ip + " 已经在线！", "ret_code": 2}
+            state.online.add((username, ip))
+        return "login_ok", {"result": 1, "msg": "Portal协议认证成功！"}
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _PortalServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # A building reconnecting at once must not be refused by the backlog
+
+
+def _serve_portal(port_queue, result_queue, stop_event, password, challenge_ttl, delay_ms, session_seconds, traffic_bps):
+    server = _PortalServer(("127.0.0.1", 0), _PortalHandler)
+    server.state = _PortalState(password, challenge_ttl, delay_ms, session_seconds, traffic_bps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port_queue.put(server.server_address[1])
+    stop_event.wait()
+    server.shutdown()
+    state = server.state
+    result_queue.put({
+        **state.counts,
+        "peak_in_flight": state.peak_in_flight,
+        "peak_rps": max(state.arrivals.values(), default=0),
+        "arrivals": sorted(state.arrivals.items()),
+        "cpu_s": time.process_time(),
+    })
+
+
+class PortalStandin:
+    """
+    Local SRUN (get_challenge + srun_portal) and Dr.COM (eportal login) stand-in
+    in a separate process. SRUN logins are checked like the real portal: the
+    challenge must have been issued for that user/IP, and the password hash and
+    chksum must match (password checks are skipped when `password` is empty).
+    SRUN sessions end after `session_seconds` (0 = never); rad_user_info reports
+    remain_seconds and a sum_bytes counter growing at `traffic_bps`, and logout is supported.
+    `stop()` returns what the portal saw: outcome counts, peak requests/second,
+    peak concurrent requests and server CPU seconds.
+    """
+    def __init__(self, password: str = "", challenge_ttl: float = 60, delay_ms: float = 0,
+                 session_seconds: float = 0, traffic_bps: float = 0):
+        self.password = password
+        self.challenge_ttl = challenge_ttl
+        self.delay_ms = delay_ms
+        self.session_seconds = session_seconds
+        self.traffic_bps = traffic_bps
+        self.base_url = ""
+        self._stop = multiprocessing.Event()
+        self._results = multiprocessing.Queue()
+        self._process: Optional[multiprocessing.Process] = None
+
+    def start(self) -> str:
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve_portal,
+            args=(port_queue, self._results, self._stop, self.password, self.challenge_ttl, self.delay_ms,
+                  self.session_seconds, self.traffic_bps),
+            name="portal-standin", daemon=True
+        )
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+        return self.base_url
+
+    def apply_to(self, settings):
+        """Point the portal endpoints in `settings` at this stand-in."""
+        settings.GET_CHALLENGE_API = self.base_url + CHALLENGE_PATH
+        settings.SRUN_PORTAL_API = self.base_url + SRUN_PORTAL_PATH
+        settings.USER_INFO_API = self.base_url + USER_INFO_PATH
+        settings.DORM_PORTAL_API = self.base_url + DORM_PORTAL_PATH
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        stats = self._results.get(timeout=10)
+        self._process.join(5)
+        return stats
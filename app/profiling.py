@@ -0,0 +1,146 @@
+import io
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from loguru import logger
+
+
+class StackSampler:
+    """
+    Periodically samples one thread's stack and aggregates it in the
+    "folded" format understood by flamegraph.pl / speedscope / inferno.
+    """
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    cProfile + tracemalloc (+ optional stack sampler) around a block of work in the current thread.
+    Reports are written to `output_dir` when the profiler stops:
+      profile-<label>-<ts>-hotspots.txt     cProfile, sorted by cumulative and own time
+      profile-<label>-<ts>-allocations.txt  top allocation sites (tracemalloc)
+      profile-<label>-<ts>-stacks.folded    flamegraph-compatible stack samples (optional)
+    """
+    def __init__(self, label: str, output_dir="logs", flamegraph: bool = False, top: int = 40):
+        self.label = label
+        self.output_dir = Path(output_dir)
+        self.flamegraph = flamegraph
+        self.top = top
+        self.reports: Dict[str, Path] = {}
+        self._profile = cProfile.Profile()
+        self._sampler: Optional[StackSampler] = None
+        self._started_tracemalloc = False
+        self._start = 0.0
+
+    def start(self):
+        self._start = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._started_tracemalloc = True
+        if self.flamegraph:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        self._profile.enable()
+        logger.info(f"Profiling started ({self.label})")
+
+    def stop(self) -> Dict[str, Path]:
+        """Stop profiling (must be called from the profiled thread) and write the reports."""
+        self._profile.disable()
+        elapsed = time.perf_counter() - self._start
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        if self._sampler:
+            self._sampler.stop()
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        prefix = self.output_dir / f"profile-{self.label}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+        out = io.StringIO()
+        out.write(f"# {self.label}: {elapsed:.2f}s wall time\n\n")
+        stats = pstats.Stats(self._profile, stream=out).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(self.top)
+        stats.sort_stats("tottime").print_stats(self.top)
+        self.reports["hotspots"] = Path(f"{prefix}-hotspots.txt")
+        self.reports["hotspots"].write_text(out.getvalue(), encoding="utf-8")
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        lines = [f"# {self.label}: top {self.top} allocation sites (live at end of window)\n"]
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {stat.traceback[0]}\n")
+        lines.append("\n# Largest allocation tracebacks\n")
+        for stat in snapshot.statistics("traceback")[:5]:
+            lines.append(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            lines.extend(f"    {line}\n" for line in stat.traceback.format())
+        self.reports["allocations"] = Path(f"{prefix}-allocations.txt")
+        self.reports["allocations"].write_text("".join(lines), encoding="utf-8")
+
+        if self._sampler:
+            self.reports["stacks"] = Path(f"{prefix}-stacks.folded")
+            self.reports["stacks"].write_text(self._sampler.folded(), encoding="utf-8")
+
+        logger.info(f"Profile written: {', '.join(str(p) for p in self.reports.values())}")
+        return self.reports
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def profile_daemon_window(client, seconds: float, output_dir="logs", flamegraph: bool = False) -> Profiler:
+    """
+    Profile the keep-alive loop for a fixed window.
+    Call from the thread that will run keep_alive; profiling stops at the
+    first probe after `seconds` and the daemon keeps running unprofiled.
+    """
+    profiler = Profiler("daemon", output_dir=output_dir, flamegraph=flamegraph)
+    deadline = time.monotonic() + seconds
+
+    def on_probe(online: bool, latency_ms: float):
+        if time.monotonic() >= deadline and on_probe in client.on_probe:
+            client.on_probe.remove(on_probe)
+            profiler.stop()
+
+    client.on_probe.append(on_probe)
+    profiler.start()
+    return profiler
@@ -0,0 +1,139 @@
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+
+class SessionRenewer:
+    """
+    Re-authenticates before the SRUN portal ends the session, instead of after.
+
+    Runs as a `before_check` hook on the keep-alive thread (so it never races a login).
+    Outside the renewal window it reads rad_user_info every `info_interval` seconds.
+    Expiry comes from the portal's `remain_seconds`, or from `add_time + max_duration`
+    when the portal does not report it. Within `lead` seconds of expiry, it reads the
+    session every tick and renews (logout + login) as soon as the account's traffic,
+    taken from the `sum_bytes` delta, falls below `quiet_bps`. It renews anyway once
+    only `min_lead` seconds are left.
+
+    A renewal must move the expiry later. If the portal hands back the same session
+    end (e.g. a daily quota rather than a session limit), it backs off for
+    `info_interval`, and after `max_attempts` renewals of one session it stops
+    renewing until a new session starts; keep_alive logs in again when it ends.
+    """
+    def __init__(self, client, lead: float = 900, quiet_bps: float = 16384, info_interval: float = 300,
+                 max_duration: float = 0, min_lead: float = 60, max_attempts: int = 2, clock=time.time):
+        self.client = client
+        self.lead = lead
+        self.quiet_bps = quiet_bps
+        self.info_interval = info_interval
+        self.max_duration = max_duration
+        self.min_lead = min(min_lead, lead)
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.expires_at: Optional[float] = None
+        self.renewals = 0
+        self.failed_renewals = 0
+        self.last_renewal_ms = 0.0
+        self._next_query = 0.0
+        self._traffic: Optional[tuple] = None  # (time, sum_bytes) of the previous read
+        self._renewed_expiry: Optional[float] = None  # Expiry the last renewal was meant to push back
+        self._attempts = 0                            # Renewals tried on the current session
+        self._unverified = False                      # Renewed, new expiry not checked yet
+
+    def attach(self):
+        self.client.before_check.append(self.tick)
+
+    def _expiry(self, info: Dict[str, Any], now: float) -> Optional[float]:
+        remain = float(info.get("remain_seconds") or 0)
+        if remain > 0:
+            return now + remain
+        add_time = float(info.get("add_time") or 0)
+        if self.max_duration and add_time:
+            return add_time + self.max_duration
+        return None
+
+    def _rate(self, info: Dict[str, Any], now: float) -> Optional[float]:
+        """Bytes/s on this account since the previous read (None on the first read)."""
+        total = float(info.get("sum_bytes") or 0)
+        previous, self._traffic = self._traffic, (now, total)
+        if previous is None or now <= previous[0] or total < previous[1]:
+            return None
+        return (total - previous[1]) / (now - previous[0])
+
+    def tick(self):
+        from app.config import settings
+
+        if settings.NETWORK_ZONE != "teaching" or self.client.paused.is_set():
+            return
+        now = self.clock()
+        if now < self._next_query:
+            return
+
+        info = self.client.get_session_info()
+        if info is None:
+            self.expires_at, self._traffic = None, None
+            self._next_query = now + self.info_interval
+            return
+        rate = self._rate(info, now)
+        self.expires_at = self._expiry(info, now)
+        if self.expires_at is None:
+            self._next_query = now + self.info_interval
+            return
+
+        remaining = self.expires_at - now
+        if self._renewed_expiry is not None:
+            if self.expires_at > self._renewed_expiry + self.min_lead:
+                self._renewed_expiry, self._attempts = None, 0  # The renewal bought a new session
+            elif self._unverified:
+                self._unverified = False
+                logger.warning(f"Session renewal did not extend the session ({remaining:.0f}s left); "
+                               f"backing off for {self.info_interval:.0f}s")
+                self._next_query = now + self.info_interval
+                return
+        if remaining > self.lead:
+            # Sleep until the window opens (or the regular poll, whichever is first)
+            self._next_query = min(now + self.info_interval, self.expires_at - self.lead)
+            return
+        if self._attempts >= self.max_attempts:
+            # Renewing does not help this session; leave it to keep_alive once it ends
+            self._next_query = now + self.info_interval
+            return
+        if rate is not None and rate <= self.quiet_bps:
+            self.renew(f"{remaining:.0f}s left, traffic {rate / 1024:.1f} KiB/s")
+        elif remaining <= self.min_lead:
+            self.renew(f"{remaining:.0f}s left, no quiet moment found")
+        # Otherwise look again on the next tick
+
+    def renew(self, reason: str = "") -> bool:
+        """Log out and straight back in; the gap is one logout + one login round trip."""
+        logger.info(f"Renewing portal session before expiry ({reason})")
+        if self.expires_at is not None:
+            self._renewed_expiry = self.expires_at
+        self._attempts += 1
+        start = time.perf_counter()
+        if not self.client.logout():
+            # Logging in again would only report "already online"; retry at the next regular poll
+            self.failed_renewals += 1
+            self._next_query = self.clock() + self.info_interval
+            return False
+        success = self.client.login()
+        self.last_renewal_ms = (time.perf_counter() - start) * 1000
+        self.expires_at, self._traffic, self._next_query = None, None, 0.0
+        if success:
+            self.renewals += 1
+            self._unverified = self._renewed_expiry is not None
+            logger.success(f"Session renewed in {self.last_renewal_ms:.0f} ms")
+        else:
+            # keep_alive's probe/login path takes over from here
+            self.failed_renewals += 1
+            logger.warning(f"Session renewal failed: {self.client.last_error or 'unknown error'}")
+        return success
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session_expires_at": self.expires_at,
+            "session_renewals": self.renewals,
+            "session_renewals_failed": self.failed_renewals,
+            "last_renewal_ms": round(self.last_renewal_ms, 1),
+        }
@@ -0,0 +1,235 @@
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from app.clock import VirtualClock
+
+# Timeline event kinds (value in brackets):
+#   link_down / link_up          uplink or switch gone / back (probes and logins time out)
+#   session_expire               the portal drops our session (probe hits the captive page)
+#   portal_error [message]       logins fail with this portal error until portal_ok
+#   portal_ok
+#   latency [seconds]            round-trip time of probes and portal requests from now on
+EVENT_KINDS = ("link_down", "link_up", "session_expire", "portal_error", "portal_ok", "latency")
+
+# Virtual epoch, so timestamps in records and logs look like real ones
+SIM_EPOCH = 1_700_000_000.0
+
+
+@dataclass
+class SimEvent:
+    at: float                 # Seconds from the start of the simulation
+    kind: str
+    value: Any = None
+
+
+@dataclass
+class SimulationResult:
+    """One run of the real keep-alive loop over a timeline, in virtual time."""
+    check_interval: int
+    virtual_s: float
+    wall_s: float
+    speedup: float
+    probes: int
+    logins: int
+    login_failures: int
+    outages: int              # Ground truth: times the host actually lost connectivity
+    downtime_s: float         # Ground truth: total time without connectivity
+    availability: float
+    detected: Dict[str, Any] = field(default_factory=dict)  # OutageTracker summary (daemon's view)
+
+
+class SimulatedNetwork:
+    """
+    Ground truth of a simulation: link state, portal session, portal errors and latency.
+    `probe` and `login` stand in for the client's probe and login strategy; they
+    consume virtual time like the real calls (round trips, or the full timeout).
+    """
+    def __init__(self, clock: VirtualClock, probe_timeout: float = 3, request_timeout: float = 5,
+                 session_limit: float = 0):
+        self.clock = clock
+        self.probe_timeout = probe_timeout
+        self.request_timeout = request_timeout
+        self.session_limit = session_limit
+        self.link = True
+        self.session = False
+        self.portal_error = ""
+        self.latency = 0.02
+        self.outages = 0
+        self.downtime = 0.0
+        self._session_id = 0
+        self._down_since: Optional[float] = None
+        self._start_session()  # The host starts out logged in
+
+    def _start_session(self):
+        self.session = True
+        self._session_id += 1
+        if self.session_limit:
+            session_id = self._session_id
+            self.clock.call_later(self.session_limit, lambda: self._expire(session_id))
+
+    @property
+    def online(self) -> bool:
+        return self.link and self.session
+
+    def _track(self, was_online: bool):
+        now = self.clock.time()
+        if was_online and not self.online:
+            self.outages += 1
+            self._down_since = now
+        elif not was_online and self.online and self._down_since is not None:
+            self.downtime += now - self._down_since
+            self._down_since = None
+
+    def apply(self, event: SimEvent):
+        was_online = self.online
+        if event.kind == "link_down":
+            self.link = False
+        elif event.kind == "link_up":
+            self.link = True
+        elif event.kind == "session_expire":
+            self.session = False
+        elif event.kind == "portal_error":
+            self.portal_error = str(event.value or "E2901: (Third party 1)bind_user2: ldap_bind error")
+        elif event.kind == "portal_ok":
+            self.portal_error = ""
+        elif event.kind == "latency":
+            self.latency = float(event.value)
+        else:
+            raise ValueError(f"Unknown event kind: {event.kind!r} (expected one of {', '.join(EVENT_KINDS)})")
+        self._track(was_online)
+
+    def probe(self) -> bool:
+        if not self.link or self.latency >= self.probe_timeout:
+            self.clock.advance(self.probe_timeout)
+            return False
+        self.clock.advance(self.latency)
+        return self.session
+
+    def login(self, client) -> bool:
+        """Challenge + login round trips; sets client.last_error like the real strategies."""
+        if not self.link or 2 * self.latency >= self.request_timeout:
+            self.clock.advance(self.request_timeout)
+            client.last_error = "Network error: timed out"
+            return False
+        self.clock.advance(2 * self.latency)
+        if self.portal_error:
+            client.last_error = self.portal_error
+            return False
+        was_online = self.online
+        if not self.session:
+            self._start_session()  # A login while already online does not reset the portal's timer
+        self._track(was_online)
+        return True
+
+    def _expire(self, session_id: int):
+        if session_id == self._session_id and self.session:
+            self.apply(SimEvent(self.clock.time(), "session_expire"))
+
+    def finish(self):
+        if self._down_since is not None:
+            self.downtime += self.clock.time() - self._down_since
+            self._down_since = None
+
+
+def random_timeline(duration: float, seed: Optional[int] = None,
+                    flap_every: float = 3600, down_for: float = 120,
+                    portal_error_every: float = 0, portal_error_for: float = 300,
+                    slow_every: float = 0, slow_for: float = 600, slow_latency: float = 4.0) -> List[SimEvent]:
+    """
+    Random but reproducible timeline: link flaps, portal error episodes and slow periods,
+    each with exponential gaps (mean `*_every`) and lengths (mean `*_for`); 0 disables a kind.
+    """
+    rng = random.Random(seed)
+    events: List[SimEvent] = []
+
+    def episodes(every, length, start_kind, end_kind, value=None, end_value=None):
+        if not every:
+            return
+        t = rng.expovariate(1 / every)
+        while t < duration:
+            end = t + rng.expovariate(1 / length)
+            events.append(SimEvent(t, start_kind, value))
+            events.append(SimEvent(min(end, duration), end_kind, end_value))
+            t = end + rng.expovariate(1 / every)
+
+    episodes(flap_every, down_for, "link_down", "link_up")
+    episodes(portal_error_every, portal_error_for, "portal_error", "portal_ok")
+    episodes(slow_every, slow_for, "latency", "latency", slow_latency, 0.02)
+    return sorted(events, key=lambda e: e.at)
+
+
+def load_timeline(path) -> Dict[str, Any]:
+    """
+    Read a scripted scenario: {"duration": s, "session_limit": s, "events": [[at, kind, value?], ...]}.
+    Returns the dict with `events` as SimEvent objects.
+    """
+    with open(path, encoding="utf-8") as f:
+        scenario = json.load(f)
+    scenario["events"] = sorted((SimEvent(*row) for row in scenario.get("events", [])), key=lambda e: e.at)
+    for event in scenario["events"]:
+        if event.kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind in {path}: {event.kind!r}")
+    return scenario
+
+
+def run_simulation(events: Sequence[SimEvent], duration: float, check_interval: Optional[int] = None,
+                   session_limit: float = 0, quiet: bool = True) -> SimulationResult:
+    """
+    Drive a real SZUNetworkClient.keep_alive over `events` for `duration` virtual seconds.
+    Only the probe and login strategy are simulated; scheduling, hooks and the
+    outage tracker are the production code. Deterministic for a given timeline.
+    """
+    from app.config import settings
+    from app.client import SZUNetworkClient
+    from app.outages import OutageTracker
+    from app.singleflight import new_login_flights
+
+    clock = VirtualClock(start=SIM_EPOCH)
+    network = SimulatedNetwork(clock, request_timeout=settings.REQUEST_TIMEOUT, session_limit=session_limit)
+    for event in events:
+        clock.call_at(SIM_EPOCH + event.at, lambda event=event: network.apply(event))
+    stop_event = threading.Event()
+    clock.call_at(SIM_EPOCH + duration, stop_event.set)
+
+    saved_interval = settings.CHECK_INTERVAL
+    if check_interval:
+        settings.CHECK_INTERVAL = check_interval
+    if quiet:
+        logger.disable("app")
+    try:
+        client = SZUNetworkClient()
+        client.clock = clock
+        client.login_flights = new_login_flights(clock.perf_counter)  # Coalescing on virtual time
+        client.probe = network.probe
+        client.login_strategies = {zone: (lambda: network.login(client)) for zone in client.login_strategies}
+        tracker = OutageTracker(capacity=4096, clock=clock.time)
+        client.on_probe.append(tracker.on_probe)
+        client.on_login.append(tracker.on_login)
+        counts = {"probes": 0, "logins": 0}
+        client.on_probe.append(lambda online, latency_ms: counts.__setitem__("probes", counts["probes"] + 1))
+        client.on_login.append(lambda success, latency_ms, error: counts.__setitem__("logins", counts["logins"] + 1))
+
+        start = time.perf_counter()
+        client.keep_alive(stop_event=stop_event)
+        wall = time.perf_counter() - start
+        network.finish()
+        interval = settings.CHECK_INTERVAL
+    finally:
+        settings.CHECK_INTERVAL = saved_interval
+        if quiet:
+            logger.enable("app")
+
+    virtual = clock.time() - SIM_EPOCH
+    return SimulationResult(
+        check_interval=interval, virtual_s=virtual, wall_s=wall, speedup=virtual / wall if wall else 0.0,
+        probes=counts["probes"], logins=counts["logins"], login_failures=client.login_failures,
+        outages=network.outages, downtime_s=network.downtime,
+        availability=1 - network.downtime / virtual if virtual else 1.0,
+        detected=tracker.summary(),
+    )
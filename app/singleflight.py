@@ -0,0 +1,95 @@
+import time
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+
+# How a caller got a result it did not compute itself (see SingleFlight.do)
+JOINED = "joined"   # Waited for a run that was still in flight
+CACHED = "cached"   # Reused a run that had finished within `ttl`
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs `fn`; callers arriving while it runs wait and
+    get the same result (or exception). A successful result (no exception and
+    `cacheable(result)` true) is then kept for `ttl` seconds, so a caller right behind
+    the flight reuses it too (0 = only join in-flight calls); failures are never kept,
+    the next caller tries again. `clock` is fixed per instance: a simulation on
+    virtual time builds its own instance instead of mixing clocks in one cache.
+    """
+    def __init__(self, ttl: float = 2.0, clock: Callable[[], float] = time.monotonic,
+                 cacheable: Optional[Callable[[Any], bool]] = None):
+        self.ttl = ttl
+        self.clock = clock
+        self.cacheable = cacheable
+        self.executed = 0   # Calls that ran fn
+        self.shared = 0     # Calls answered by another caller's run (joined or cached)
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}  # key -> (finished at, result)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, Optional[str]]:
+        """Return (result, source): source is None if this caller ran `fn`, else JOINED or CACHED."""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and 0 <= self.clock() - cached[0] <= self.ttl:
+                self.shared += 1
+                return cached[1], CACHED
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                self.shared += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, JOINED
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            now = self.clock()
+            with self._lock:
+                del self._flights[key]
+                self.executed += 1
+                if flight.error is None and self.ttl and (self.cacheable is None or self.cacheable(flight.result)):
+                    self._results[key] = (now, flight.result)
+                    if len(self._results) > 64:
+                        self._results = {k: v for k, v in self._results.items() if 0 <= now - v[0] <= self.ttl}
+            flight.done.set()
+        return flight.result, None
+
+    def forget(self, key: Optional[Hashable] = None):
+        """Drop the cached result for key (or all), e.g. after a logout made it stale."""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+
+def new_login_flights(clock: Callable[[], float] = time.monotonic) -> SingleFlight:
+    """Login coalescing for SZUNetworkClient: results are (success, error, response), only successes are kept."""
+    return SingleFlight(ttl=settings.LOGIN_COALESCE_TTL, clock=clock, cacheable=lambda result: bool(result[0]))
+
+
+# Shared by every SZUNetworkClient in the process (daemon loop, control socket, GUI threads)
+login_flights = new_login_flights()
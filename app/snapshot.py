@@ -0,0 +1,154 @@
+import os
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class StateSnapshot:
+    """Compact runtime state persisted across daemon restarts."""
+    version: int = SNAPSHOT_VERSION
+    saved_at: float = 0.0
+    username: str = ""
+    zone: str = ""
+    online: Optional[bool] = None
+    last_probe: float = 0.0
+    login_failures: int = 0
+    last_error: str = ""
+    last_login: float = 0.0
+    dns: Dict[str, List[str]] = field(default_factory=dict)   # host -> addresses (portal + probe hosts)
+    probe_latency_ms: Dict[str, float] = field(default_factory=dict)  # probe URL -> EWMA latency
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.saved_at
+
+
+def load_snapshot(path) -> Optional[StateSnapshot]:
+    """Read a snapshot; None if missing, unreadable or from another format version."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("version") != SNAPSHOT_VERSION:
+            return None
+        known = StateSnapshot.__dataclass_fields__
+        return StateSnapshot(**{k: v for k, v in data.items() if k in known})
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_snapshot(path, snapshot: StateSnapshot):
+    """Atomic write (temp file + rename), so a crash never leaves a torn snapshot."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(asdict(snapshot), separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class SnapshotKeeper:
+    """
+    Keeps a StateSnapshot current from the client's hooks and writes it to disk
+    when the online state flips, or at most every `interval` seconds otherwise.
+    Writes happen on the keep-alive thread; the file is a few hundred bytes.
+    """
+    def __init__(self, client, path, interval: float = 60, alpha: float = 0.3):
+        from app.config import settings
+
+        self.client = client
+        self.path = Path(path)
+        self.interval = interval
+        self.alpha = alpha
+        self.state = StateSnapshot(username=client.username, zone=settings.NETWORK_ZONE)
+        self._last_write = 0.0
+        self._fresh = False
+
+    def restore(self, max_age: float) -> Optional[StateSnapshot]:
+        """
+        Load the previous snapshot for this account/zone and warm the client from it.
+        Only data is warmed: DNS answers and the login failure count always, the
+        last-known status and latency baseline only from a snapshot younger than
+        `max_age` (see `last_known()`); the first tick still probes as usual.
+        """
+        from app.dns_cache import get_resolver_cache
+
+        snap = load_snapshot(self.path)
+        if snap is None or snap.username != self.state.username or snap.zone != self.state.zone:
+            return None
+
+        self.state = snap
+        self.client.login_failures = snap.login_failures
+        self.client.last_error = snap.last_error
+        cache = get_resolver_cache()
+        if cache is not None and snap.dns:
+            cache.seed(snap.dns)
+
+        self._fresh = fresh = snap.age <= max_age
+        if not fresh:
+            snap.probe_latency_ms.clear()  # Measured on a network that may have changed since
+        logger.info(f"Restored state snapshot from {snap.age:.0f}s ago "
+                    f"({len(snap.dns)} DNS answers{', latency baselines' if fresh else ''})")
+        return snap
+
+    def _probe_key(self) -> str:
+        probe = getattr(self.client.probe, "probe", self.client.probe)  # Unwrap a cooperative probe
+        return getattr(probe, "test_url", "probe")
+
+    def last_known(self) -> Optional[Dict[str, Any]]:
+        """
+        Status from a fresh restored snapshot (online, last probe/login, baseline latency),
+        for front ends to show until the first tick replaces it; None otherwise.
+        """
+        if not self._fresh:
+            return None
+        return {"online": self.state.online, "last_probe": self.state.last_probe, "last_login": self.state.last_login,
+                "probe_latency_ms": self.state.probe_latency_ms.get(self._probe_key(), 0.0)}
+
+    def attach(self):
+        self.client.on_probe.append(self.on_probe)
+        self.client.on_login.append(self.on_login)
+
+    def _ewma(self, key: str, value: float):
+        previous = self.state.probe_latency_ms.get(key)
+        self.state.probe_latency_ms[key] = round(
+            value if previous is None else previous + self.alpha * (value - previous), 2)
+
+    def on_probe(self, online: bool, latency_ms: float):
+        changed = online != self.state.online
+        self.state.online = online
+        self.state.last_probe = time.time()
+        if online:
+            self._ewma(self._probe_key(), latency_ms)
+        self.maybe_save(force=changed)
+
+    def on_login(self, success: bool, latency_ms: float, error: str):
+        self.state.last_login = time.time()
+        self.state.login_failures = self.client.login_failures
+        self.state.last_error = error
+        if success:
+            self.state.online = True
+        self.maybe_save(force=True)
+
+    def maybe_save(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_write < self.interval:
+            return
+        self.save()
+
+    def save(self):
+        from app.dns_cache import get_resolver_cache
+
+        self.state.saved_at = time.time()
+        cache = get_resolver_cache()
+        if cache is not None:
+            self.state.dns = cache.export()
+        try:
+            save_snapshot(self.path, self.state)
+            self._last_write = self.state.saved_at
+        except OSError as e:
+            logger.warning(f"Failed to write state snapshot: {e}")
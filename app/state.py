@@ -0,0 +1,73 @@
+import threading
+from dataclasses import dataclass, fields, replace
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class ClientState:
+    """What a front end shows about the keep-alive client; replaced whole on every transition."""
+    running: bool = False           # keep_alive loop active
+    paused: bool = False            # Suspended via the daemon control socket
+    online: Optional[bool] = None   # Result of the last probe (None = not probed yet)
+    last_probe: float = 0.0         # Time of the last probe (changes every tick: the heartbeat)
+    last_login: float = 0.0
+    login_ok: Optional[bool] = None
+    last_error: str = ""
+
+
+FIELDS = frozenset(f.name for f in fields(ClientState))
+
+
+class StateStore:
+    """
+    Holds the current ClientState and publishes transitions to subscribers.
+
+    `update()` only publishes when a value actually differs, so subscribers (GUI, tray)
+    never hear about no-op updates. Subscribers are called on the updating thread with
+    (new state, names of the changed fields); UI code must marshal to its own thread.
+    """
+    def __init__(self, state: Optional[ClientState] = None):
+        self._state = state or ClientState()
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Callable[[ClientState, Set[str]], None], Optional[frozenset]]] = []
+        self.published = 0
+
+    @property
+    def state(self) -> ClientState:
+        return self._state
+
+    def update(self, **changes) -> Set[str]:
+        """Apply `changes`; returns the fields that really changed (empty = nothing published)."""
+        unknown = changes.keys() - FIELDS
+        if unknown:
+            raise AttributeError(f"Unknown state field(s): {', '.join(sorted(unknown))}")
+        with self._lock:
+            old = self._state
+            changed = {k for k, v in changes.items() if getattr(old, k) != v}
+            if not changed:
+                return changed
+            self._state = new = replace(old, **{k: changes[k] for k in changed})
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for callback, wanted in subscribers:
+            if wanted is None or wanted & changed:
+                try:
+                    callback(new, changed)
+                except Exception as e:
+                    logger.debug(f"State subscriber {callback!r} failed: {e}")
+        return changed
+
+    def subscribe(self, callback: Callable[[ClientState, Set[str]], None],
+                  fields: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Call `callback` on transitions (only those touching `fields`, if given); returns an unsubscribe function."""
+        entry = (callback, frozenset(fields) if fields is not None else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
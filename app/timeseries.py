@@ -0,0 +1,126 @@
+import time
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+# Resolution name -> (seconds per bucket, buckets kept): 5 minutes, 24 hours, 30 days
+RESOLUTIONS = {"second": (1, 300), "minute": (60, 1440), "hour": (3600, 720)}
+# Probe/login latency in ms (successful attempts only) and failure ratio (0..1 per bucket)
+METRICS = ("probe_ms", "probe_fail", "login_ms", "login_fail")
+
+_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+class RingSeries:
+    """
+    One metric at one resolution: `slots` consolidated buckets of `step` seconds.
+    Each bucket keeps count/sum/max in fixed-size `array` columns and is recycled
+    when its slot comes round again (RRD style), so memory never grows.
+    """
+    def __init__(self, step: int, slots: int):
+        self.step = step
+        self.slots = slots
+        self._bucket = array("q", [-1]) * slots   # Absolute bucket number held by each slot
+        self._count = array("I", bytes(4 * slots))
+        self._sum = array("d", bytes(8 * slots))
+        self._max = array("d", bytes(8 * slots))
+
+    def add(self, ts: float, value: float):
+        bucket = int(ts // self.step)
+        slot = bucket % self.slots
+        if self._bucket[slot] != bucket:
+            self._bucket[slot] = bucket
+            self._count[slot] = 0
+            self._sum[slot] = 0.0
+            self._max[slot] = value
+        self._count[slot] += 1
+        self._sum[slot] += value
+        if value > self._max[slot]:
+            self._max[slot] = value
+
+    def window(self, now: float, points: int) -> Dict[str, List]:
+        """The last `points` buckets up to `now`, oldest first; empty buckets are None."""
+        points = min(points, self.slots)
+        last = int(now // self.step)
+        mean, peak, count = [], [], []
+        for bucket in range(last - points + 1, last + 1):
+            slot = bucket % self.slots
+            if self._bucket[slot] == bucket and self._count[slot]:
+                n = self._count[slot]
+                mean.append(round(self._sum[slot] / n, 3))
+                peak.append(round(self._max[slot], 3))
+                count.append(n)
+            else:
+                mean.append(None)
+                peak.append(None)
+                count.append(0)
+        return {"start": (last - points + 1) * self.step, "step": self.step,
+                "mean": mean, "max": peak, "count": count}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self._bucket, self._count, self._sum, self._max))
+
+
+class TimeSeriesStore:
+    """
+    In-memory probe/login time series fed by the client's hooks.
+    Every sample is consolidated into all resolutions at once (per second, minute
+    and hour), so the coarse series need no background downsampling job and the
+    total footprint is fixed at construction.
+    """
+    def __init__(self, resolutions: Optional[Dict[str, tuple]] = None, clock=time.time):
+        self.clock = clock
+        self.resolutions = dict(resolutions or RESOLUTIONS)
+        self._series = {
+            metric: {name: RingSeries(step, slots) for name, (step, slots) in self.resolutions.items()}
+            for metric in METRICS
+        }
+        self._lock = threading.Lock()
+
+    def add(self, metric: str, value: float, ts: Optional[float] = None):
+        ts = self.clock() if ts is None else ts
+        with self._lock:
+            for ring in self._series[metric].values():
+                ring.add(ts, value)
+
+    def on_probe(self, online: bool, latency_ms: float):
+        now = self.clock()
+        if online:
+            self.add("probe_ms", latency_ms, now)
+        self.add("probe_fail", 0.0 if online else 1.0, now)
+
+    def on_login(self, success: bool, latency_ms: float, error: str):
+        now = self.clock()
+        if success:
+            self.add("login_ms", latency_ms, now)
+        self.add("login_fail", 0.0 if success else 1.0, now)
+
+    def attach(self, client):
+        client.on_probe.append(self.on_probe)
+        client.on_login.append(self.on_login)
+
+    def window(self, resolution: str = "minute", points: int = 60) -> Dict[str, Any]:
+        """JSON-ready view of every metric at one resolution (the daemon's `series` command)."""
+        if resolution not in self.resolutions:
+            raise ValueError(f"Unknown resolution: {resolution!r} (expected one of {', '.join(self.resolutions)})")
+        now = self.clock()
+        with self._lock:
+            return {metric: rings[resolution].window(now, points) for metric, rings in self._series.items()}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for rings in self._series.values() for ring in rings.values())
+
+
+def sparkline(values: List[Optional[float]], lo: Optional[float] = None, hi: Optional[float] = None) -> str:
+    """Unicode block sparkline; None (no data) renders as a space."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return " " * len(values)
+    lo = min(present) if lo is None else lo
+    hi = max(present) if hi is None else hi
+    span = (hi - lo) or 1.0
+    top = len(_BLOCKS) - 1
+    return "".join(" " if v is None else _BLOCKS[max(0, min(top, int((v - lo) / span * top + 0.5)))]
+                   for v in values)
@@ -0,0 +1,230 @@
+import ssl
+import threading
+import http.client
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin, urlsplit
+
+BACKENDS = ("stdlib", "requests")
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+
+class TransportError(OSError):
+    """Network/protocol failure from a transport (requests' RequestException is an OSError too)."""
+
+
+class HTTPStatusError(TransportError):
+    """Raised by `raise_for_status()` for 4xx/5xx replies."""
+
+
+class StdlibResponse:
+    """
+    Streamed reply from `StdlibTransport`, exposing the part of `requests.Response`
+    the portal code uses: status_code, headers, raise_for_status(), iter_content(), close().
+    Closing a fully read reply returns its connection to the pool; closing one that was
+    abandoned half way (early-terminated JSONP read) discards the connection.
+    """
+    def __init__(self, transport: "StdlibTransport", key: Tuple[str, str, int], conn, resp: http.client.HTTPResponse, url: str):
+        self._transport = transport
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status_code = resp.status
+        self.reason = resp.reason
+        self.headers = {k.lower(): v for k, v in resp.getheaders()}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            self.close()
+            raise HTTPStatusError(f"{self.status_code} {self.reason} for url: {self.url}")
+
+    def iter_content(self, chunk_size: int = 512):
+        try:
+            while True:
+                chunk = self._resp.read1(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        except (http.client.HTTPException, ValueError) as e:
+            raise TransportError(f"Malformed response from {self.url}: {e!r}") from e
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self.iter_content(8192))
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._resp.length == 0:
+            self._resp.read()  # HEAD / 204: nothing to read, but marks the reply complete
+        reusable = self._resp.isclosed() and not self._resp.will_close
+        self._resp.close()
+        self._transport._release(self._key, conn, reusable)
+
+
+class StdlibTransport:
+    """
+    HTTP transport on `http.client` alone: one small pool of persistent connections per
+    (scheme, host, port), per-request timeouts and never any proxy (http.client ignores
+    HTTP(S)_PROXY, which is what the intranet portal needs anyway).
+    Idempotent GET/HEAD requests are retried once, on a fresh connection, when a pooled
+    connection turns out to have been closed by the server while idle. Like requests,
+    GET follows redirects (up to `max_redirects`) and HEAD only with allow_redirects.
+    """
+    def __init__(self, user_agent: str = "", max_idle: int = 2, max_redirects: int = 10):
+        self.headers = {"User-Agent": user_agent or "szu-net", "Accept-Encoding": "identity",
+                        "Connection": "keep-alive"}
+        self.max_idle = max_idle
+        self.max_redirects = max_redirects
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._ssl: Optional[ssl.SSLContext] = None
+
+    def _connection(self, key: Tuple[str, str, int], timeout: float, fresh: bool = False):
+        conn = None
+        if not fresh:
+            with self._lock:
+                pool = self._idle.get(key)
+                conn = pool.pop() if pool else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        scheme, host, port = key
+        if scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _release(self, key, conn, reusable: bool):
+        if reusable:
+            with self._lock:
+                pool = self._idle.setdefault(key, [])
+                if len(pool) < self.max_idle:
+                    pool.append(conn)
+                    return
+        conn.close()
+
+    def request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                timeout: float = 5) -> StdlibResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise TransportError(f"Unsupported URL scheme: {url}")
+        key = (parts.scheme, parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80))
+        path = parts.path or "/"
+        query = "&".join(q for q in (parts.query, urlencode(params or {})) if q)
+        if query:
+            path += "?" + query
+        headers = dict(self.headers, Host=parts.netloc)
+
+        retried = False
+        while True:
+            conn, reused = self._connection(key, timeout, fresh=retried)
+            try:
+                conn.request(method, path, headers=headers)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if reused:
+                    retried = True
+                    continue  # Stale keep-alive connection: retry once on a fresh one
+                raise TransportError(f"Connection to {key[1]}:{key[2]} failed: {e!r}") from e
+            except http.client.HTTPException as e:
+                conn.close()
+                raise TransportError(f"Bad response from {key[1]}:{key[2]}: {e!r}") from e
+            except OSError:
+                conn.close()
+                raise
+            return StdlibResponse(self, key, conn, resp, url)
+
+    def _follow(self, method: str, resp: StdlibResponse, timeout: float) -> StdlibResponse:
+        """Follow Location headers from `resp` (the query string is only sent on the first hop)."""
+        for _ in range(self.max_redirects):
+            location = resp.headers.get("location")
+            if resp.status_code not in _REDIRECTS or not location:
+                return resp
+            resp.close()
+            resp = self.request(method, urljoin(resp.url, location), timeout=timeout)
+        resp.close()
+        raise TransportError(f"Exceeded {self.max_redirects} redirects, last at {resp.url}")
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 5,
+            stream: bool = True, allow_redirects: bool = True) -> StdlibResponse:
+        resp = self.request("GET", url, params=params, timeout=timeout)
+        return self._follow("GET", resp, timeout) if allow_redirects else resp
+
+    def head(self, url: str, timeout: float = 5, allow_redirects: bool = False) -> StdlibResponse:
+        resp = self.request("HEAD", url, timeout=timeout)
+        if allow_redirects:
+            resp = self._follow("HEAD", resp, timeout)
+        resp.close()
+        return resp
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+
+class RequestsTransport:
+    """Same interface on a `requests.Session` (optional dependency, imported on first use)."""
+    def __init__(self, user_agent: str = ""):
+        import requests
+
+        self.session = requests.Session()
+        # Bypass system proxies (e.g. Clash) to ensure direct intranet access
+        self.session.trust_env = False
+        self.session.proxies = {}
+        if user_agent:
+            self.session.headers.update({"User-Agent": user_agent})
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 5, stream: bool = True,
+            allow_redirects: bool = True):
+        return self.session.get(url, params=params, timeout=timeout, stream=stream, allow_redirects=allow_redirects)
+
+    def head(self, url: str, timeout: float = 5, allow_redirects: bool = False):
+        return self.session.head(url, timeout=timeout, allow_redirects=allow_redirects)
+
+    def close(self):
+        self.session.close()
+
+
+def new_transport(backend: Optional[str] = None, user_agent: Optional[str] = None):
+    """
+    Create a transport for `backend` ('stdlib' / 'requests'; default HTTP_BACKEND),
+    wrapped in a cassette recorder when RECORD_CASSETTE is set.
+    """
+    from app.config import settings
+
+    backend = backend or settings.HTTP_BACKEND
+    user_agent = settings.USER_AGENT if user_agent is None else user_agent
+    if backend == "requests":
+        transport = RequestsTransport(user_agent)
+    elif backend == "stdlib":
+        transport = StdlibTransport(user_agent)
+    else:
+        raise ValueError(f"Unknown HTTP backend: {backend!r} (expected one of {', '.join(BACKENDS)})")
+    if settings.RECORD_CASSETTE:
+        from app.cassette import RecordingTransport, get_recorder
+        return RecordingTransport(transport, get_recorder())
+    return transport
+
+
+_shared: Dict[str, Any] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_transport(backend: Optional[str] = None):
+    """Process-wide transport per backend for connectivity probes (connections kept warm between checks)."""
+    from app.config import settings
+
+    backend = backend or settings.HTTP_BACKEND
+    with _shared_lock:
+        if backend not in _shared:
+            _shared[backend] = new_transport(backend, user_agent="")
+        return _shared[backend]
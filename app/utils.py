@@ -1,7 +1,18 @@
+import os
+import time
+import functools
+import errno
+import select
 import socket
-import requests
+import ipaddress
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 from loguru import logger
 
+from app.dns_cache import FAKE_IP_NETWORK, system_getaddrinfo
+
 def get_local_ip(target_host="8.8.8.8", target_port=80) -> str:
     """
     Get the local IP address used to connect to the outside world.
@@ -30,16 +41,57 @@ def get_local_ip(target_host="8.8.8.8", target_port=80) -> str:
         # Fallback for localhost if offline (though login will fail anyway)
         return "127.0.0.1"
 
-def is_internet_connected(test_url: str = "http://connect.rom.miui.com/generate_204", timeout: int = 3) -> bool:
+def getaddrinfo_within(timeout: float, host, port, family=0, type_=socket.SOCK_STREAM, resolver=None):
+    """
+    getaddrinfo bounded by `timeout` (socket.timeout when it runs late).
+    getaddrinfo cannot be cancelled, so each call gets its own daemon thread: a lookup
+    stuck on a dead resolver finishes (or hangs) on its own without delaying later ones.
+    """
+    if timeout <= 0:
+        raise socket.timeout("name resolution timed out")
+    resolver = resolver or socket.getaddrinfo
+    done = threading.Event()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["infos"] = resolver(host, port, family, type_)
+        except Exception as e:
+            outcome["error"] = e
+        done.set()
+
+    threading.Thread(target=run, name="probe-dns", daemon=True).start()
+    if not done.wait(timeout):
+        raise socket.timeout("name resolution timed out")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["infos"]
+
+
+def parse_status_code(header: bytes) -> int:
+    """Status code of a raw `HTTP/1.x NNN ...` header block; 0 if the status line is malformed."""
+    if not header.startswith(b"HTTP/1.") or len(header) < 12:
+        return 0
+    try:
+        return int(header[9:12])
+    except ValueError:
+        return 0  # e.g. "HTTP/1.1 OK" from a captive gateway
+
+
+def is_internet_connected(test_url: str = "http://connect.rom.miui.com/generate_204", timeout: int = 3,
+                          transport=None) -> bool:
     """
     检查互联网连接状态 (Captive Portal Detection)
     :param test_url: 用于测试的网站 (默认使用 MIUI 的 204 检测接口)
     :param timeout: 超时时间 (秒)
+    :param transport: HTTP transport (默认使用 HTTP_BACKEND 对应的共享实例，连接复用)
     :return: True (通) / False (断/被劫持)
     """
+    from app.transport import shared_transport
+
     try:
         # allow_redirects=False: 禁止跟随重定向，防止被跳转到登录页
-        resp = requests.head(test_url, timeout=timeout, allow_redirects=False)
+        resp = (transport or shared_transport()).head(test_url, timeout=timeout, allow_redirects=False)
         
         # 只有当状态码为 204 (MIUI) 或 200 (普通网站且无重定向) 时才认为网络正常
         if resp.status_code == 204:
@@ -52,3 +104,277 @@ def is_internet_connected(test_url: str = "http://connect.rom.miui.com/generate_
     except Exception as e:
         logger.debug(f"Network check exception: {e}")
         return False
+
+class RawHttpProbe:
+    """
+    Minimal-overhead replacement for `is_internet_connected`.
+    Sends a hand-written HTTP/1.1 HEAD over a non-blocking socket, reads only the
+    status line and headers, and keeps the connection open for the next check.
+    Calling the instance returns True (通) / False (断/被劫持), like `is_internet_connected`.
+    """
+    DEFAULT_URL = "http://connect.rom.miui.com/generate_204"
+
+    def __init__(self, test_url: str = DEFAULT_URL, timeout: float = 3):
+        parts = urlsplit(test_url)
+        if parts.scheme != "http":
+            raise ValueError(f"RawHttpProbe only supports plain http URLs: {test_url}")
+        self.test_url = test_url
+        self.timeout = timeout
+        self.address = (parts.hostname, parts.port or 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        self._request = (
+            f"HEAD {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "User-Agent: szu-net-probe\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("ascii")
+        self._buf = bytearray(1024)
+        self._sock = None
+        self._addrinfo = None  # Last successful resolution, reused when DNS is slow or down
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    @property
+    def connected(self) -> bool:
+        """True while a kept-alive connection from the last check is still held."""
+        return self._sock is not None
+
+    def adopt(self, sock: socket.socket):
+        """Use an already connected socket (e.g. the ladder's TCP stage) for the next HEAD."""
+        self.close()
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+
+    def _wait(self, sock, deadline, write=False):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout("probe timed out")
+        rlist, wlist = ([], [sock]) if write else ([sock], [])
+        if not any(select.select(rlist, wlist, [], remaining)[:2]):
+            raise socket.timeout("probe timed out")
+
+    def _connect(self, deadline):
+        host, port = self.address
+        try:
+            # Through the process DNS cache, but never past the probe's deadline
+            self._addrinfo = getaddrinfo_within(deadline - time.monotonic(), host, port)[0]
+        except OSError:
+            if self._addrinfo is None:
+                raise
+        family, type_, proto, _, sockaddr = self._addrinfo
+        sock = socket.socket(family, type_, proto)
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        err = sock.connect_ex(sockaddr)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, "WSAEWOULDBLOCK", -1)):
+            sock.close()
+            raise OSError(err, os.strerror(err))
+        try:
+            self._wait(sock, deadline, write=True)
+            err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                raise OSError(err, os.strerror(err))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _exchange(self, sock, deadline) -> bytes:
+        """Send the HEAD request and return the raw header block."""
+        sock.sendall(self._request)  # Tiny request: fits in the send buffer of a fresh socket
+        view = memoryview(self._buf)
+        size = 0
+        while True:
+            self._wait(sock, deadline)
+            n = sock.recv_into(view[size:])
+            if n == 0:
+                raise ConnectionError("connection closed by peer")
+            size += n
+            end = self._buf.find(b"\r\n\r\n", 0, size)
+            if end != -1:
+                return bytes(self._buf[:end])
+            if size == len(self._buf):
+                raise ValueError("response headers too large")
+
+    def __call__(self) -> bool:
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(2):
+            reused = self._sock is not None
+            try:
+                if self._sock is None:
+                    self._sock = self._connect(deadline)
+                header = self._exchange(self._sock, deadline)
+                break
+            except (OSError, ValueError) as e:
+                self.close()
+                # A kept-alive connection may have been closed by the server: retry once on a fresh one
+                if reused and attempt == 0 and not isinstance(e, socket.timeout):
+                    continue
+                logger.debug(f"Network check exception: {e}")
+                return False
+
+        status = parse_status_code(header)
+        # Only keep clean 204 connections; anything else (redirects, portal pages) may carry a body
+        if status != 204 or b"connection: close" in header.lower():
+            self.close()
+
+        if status == 204:
+            return True
+        if status == 200 and self.test_url != self.DEFAULT_URL:
+            return True
+        logger.debug(f"Network check failed. Status: {status}, URL: {self.test_url}")
+        return False
+
+
+@dataclass
+class ProbeResult:
+    """
+    Outcome of one probe ladder run.
+    state: 'online', 'no_route', 'dns_failed', 'dns_hijacked', 'unreachable' or 'captive'
+    stage: the stage that decided ('link', 'dns', 'tcp' or 'http')
+    latencies: per-stage latency in milliseconds (only stages that ran)
+    """
+    online: bool
+    state: str
+    stage: str
+    latencies: Dict[str, float] = field(default_factory=dict)
+
+
+class ProbeLadder:
+    """
+    Cheap-first connectivity check: link -> DNS -> TCP -> HTTP.
+    Each stage has its own tight timeout and only escalates when the result is
+    still ambiguous, so offline states are classified in milliseconds.
+    While the HTTP stage still holds the kept-alive connection from the last
+    online check, the ladder goes straight to the HEAD on it; the cheap stages
+    only run to classify a failure or to set up a fresh connection, whose TCP
+    stage socket is then handed to the HEAD instead of being thrown away.
+    Calling the instance returns True/False like `is_internet_connected`;
+    the full classification is kept in `last_result`.
+    """
+    def __init__(self, test_url: str = RawHttpProbe.DEFAULT_URL, link_target=("8.8.8.8", 80),
+                 dns_timeout: float = 0.5, tcp_timeout: float = 0.5, http_probe=None,
+                 allow_private: bool = False):
+        parts = urlsplit(test_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.link_target = link_target
+        self.dns_timeout = dns_timeout
+        self.tcp_timeout = tcp_timeout
+        self.http_probe = http_probe or RawHttpProbe(test_url)
+        # Probe target on a private/loopback network (intranet endpoint, local stand-in):
+        # loopback routes and private DNS answers are then expected, not failures
+        self.allow_private = allow_private
+        self.last_result: Optional[ProbeResult] = None
+
+    def close(self):
+        self.http_probe.close()
+
+    def _link(self) -> bool:
+        """Stage 1: is there an interface with a route to the outside at all?"""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(self.link_target)  # No packet is sent; fails fast without a route
+                return self.allow_private or not s.getsockname()[0].startswith("127.")
+        except OSError:
+            return False
+
+    def _resolve(self) -> List[str]:
+        """Stage 2: resolve the probe host (bounded by dns_timeout)."""
+        # Ask the real resolver, not the local cache: the point is to see what DNS answers now.
+        # One thread per lookup, so a resolver stuck on an earlier tick never delays this one
+        infos = getaddrinfo_within(self.dns_timeout, self.host, self.port, resolver=system_getaddrinfo)
+        return [info[4][0] for info in infos]
+
+    @staticmethod
+    def _looks_hijacked(addresses: List[str]) -> bool:
+        """A public probe host resolving only to private/reserved addresses hints at a captive DNS."""
+        try:
+            ips = [ipaddress.ip_address(a) for a in addresses]
+        except ValueError:
+            return False
+        return all(not ip.is_global and ip not in FAKE_IP_NETWORK for ip in ips)
+
+    def _tcp(self, address: str) -> Optional[socket.socket]:
+        """Stage 3: open a TCP connection to the probe host (None if it fails)."""
+        try:
+            return socket.create_connection((address, self.port), timeout=self.tcp_timeout)
+        except OSError:
+            return None
+
+    def run(self) -> ProbeResult:
+        latencies = {}
+
+        def timed(stage, fn, *args):
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                latencies[stage] = (time.perf_counter() - start) * 1000
+
+        # Steady state: the last check left a live connection, one HEAD on it settles the tick
+        if getattr(self.http_probe, "connected", False):
+            if timed("http", self.http_probe):
+                return ProbeResult(True, "online", "http", latencies)
+            latencies.clear()  # Lost it: classify from the bottom of the ladder
+
+        if not timed("link", self._link):
+            return ProbeResult(False, "no_route", "link", latencies)
+
+        try:
+            addresses = timed("dns", self._resolve)
+        except OSError:
+            return ProbeResult(False, "dns_failed", "dns", latencies)
+        if not addresses:
+            return ProbeResult(False, "dns_failed", "dns", latencies)
+        # Only a hint: private answers also come from split-horizon and proxy setups, so HTTP decides
+        suspicious = not self.allow_private and self._looks_hijacked(addresses)
+
+        sock = timed("tcp", self._tcp, addresses[0])
+        if sock is None:
+            return ProbeResult(False, "dns_hijacked" if suspicious else "unreachable",
+                               "dns" if suspicious else "tcp", latencies)
+        if hasattr(self.http_probe, "adopt"):
+            self.http_probe.adopt(sock)
+        else:
+            sock.close()
+
+        # TCP alone is ambiguous: captive gateways often accept connections and intercept HTTP
+        online = timed("http", self.http_probe)
+        if online:
+            return ProbeResult(True, "online", "http", latencies)
+        return ProbeResult(False, "dns_hijacked" if suspicious else "captive", "http", latencies)
+
+    def __call__(self) -> bool:
+        result = self.run()
+        self.last_result = result
+        stages = ", ".join(f"{k}={v:.1f}ms" for k, v in result.latencies.items())
+        logger.debug(f"Probe ladder: {result.state} (decided at {result.stage}; {stages})")
+        return result.online
+
+
+def get_probe(backend: str = "http", test_url: Optional[str] = None):
+    """
+    Return a zero-argument connectivity check for keep_alive (`test_url` overrides the 204 endpoint).
+    'http':     `is_internet_connected` on the HTTP_BACKEND transport
+    'requests': `is_internet_connected` on the requests transport (full requests/urllib3 stack)
+    'socket':   `RawHttpProbe` (hand-written HEAD on a reused socket)
+    'ladder':   `ProbeLadder` (link -> DNS -> TCP -> HTTP, cheap stages first)
+    """
+    url = test_url or RawHttpProbe.DEFAULT_URL
+    if backend == "socket":
+        return RawHttpProbe(url)
+    if backend == "ladder":
+        return ProbeLadder(url)
+    if backend == "requests":
+        from app.transport import shared_transport
+        return functools.partial(is_internet_connected, url, transport=shared_transport("requests"))
+    if test_url:
+        return functools.partial(is_internet_connected, test_url)
+    return is_internet_connected
@@ -1,9 +1,11 @@
 import threading
+import functools
 import queue
 import pystray
 import pathlib
 import ctypes
 import time
+import tkinter as tk
 from PIL import Image, ImageDraw, ImageTk
 from dotenv import set_key
 from loguru import logger
@@ -13,9 +15,58 @@ from ttkbootstrap.widgets.scrolled import ScrolledText
 
 from app.config import settings
 from app.client import SZUNetworkClient
+from app.daemon import NetworkDaemon, attach
+from app.profiling import profile_daemon_window
+from app.state import StateStore
 from app.log_utils import setup_logger
 from app.startup_utils import get_startup_status, toggle_startup
 
+# Lines kept in the log console; older lines are dropped so a tray app can run for weeks
+MAX_LOG_LINES = 2000
+# Minutes of probe latency shown in the header sparkline
+SPARKLINE_POINTS = 60
+ASSETS_DIR = pathlib.Path(__file__).parent / "assets"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_icon_image(name: str, state: str) -> Image.Image:
+    """Decode an icon from assets/ (or draw the fallback) once per process."""
+    icon_path = ASSETS_DIR / name
+    if icon_path.exists():
+        try:
+            with Image.open(icon_path) as image:
+                return image.copy()  # Fully decoded; the file is not held open
+        except Exception as e:
+            logger.warning(f"Failed to load icon from {icon_path}: {e}")
+
+    # Fallback: Generate 64x64 high-quality icons programmatically
+    width, height = 64, 64
+
+    if state == "online":
+        # Solid Cyan Filled Square
+        image = Image.new('RGB', (width, height), (0, 255, 255))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle(
+            (width // 4, height // 4, width * 3 // 4, height * 3 // 4),
+            fill=(255, 255, 255)
+        )
+        return image
+    else:
+        # Hollow Gray Outline with Transparency (RGBA)
+        # Create a fully transparent background
+        image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        # Draw gray outline
+        outline_color = (128, 128, 128, 255)
+        draw.rectangle(
+            (width // 4, height // 4, width * 3 // 4, height * 3 // 4),
+            outline=outline_color,
+            width=4,
+            fill=None # Transparent center
+        )
+        return image
+
+
 class SZUNetworkGUI(ttk.Window):
     """
     Main GUI Class for SZU Network Guardian.
@@ -34,8 +85,14 @@ class SZUNetworkGUI(ttk.Window):
         self.geometry("1000x1000") # Slightly taller for better spacing
         self.resizable(True, True)
         
-        # Initialize thread-safe log queue
-        self.log_queue = queue.Queue()
+        # Client state shown in the header and tray; only real transitions reach the widgets
+        self.client_state = StateStore()
+        self._configured = {}      # widget -> options last applied by _configure
+        self._shown_online = False # Connection status currently drawn (label + tray icon start offline)
+        self._spark_data = None    # Series currently drawn in the sparkline
+
+        # Initialize thread-safe log queue (bounded: a stalled UI must not grow memory)
+        self.log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
         self.setup_logging()
 
         # Load Icons for dynamic switching
@@ -62,6 +119,9 @@ class SZUNetworkGUI(ttk.Window):
         
         # Load initial config
         self.load_config()
+
+        # Redraw status/heartbeat on client state transitions (published by the keep-alive loop)
+        self.client_state.subscribe(self._on_state, fields=("running", "online", "last_probe"))
         
         # Singleton flag for settings window
         self._settings_window = None
@@ -69,6 +129,14 @@ class SZUNetworkGUI(ttk.Window):
         # Start Log Polling Loop
         self.update_log_console()
 
+        # Fleet status table (shared memory), attached lazily if a supervisor is running
+        self._fleet_table = None
+        self.update_fleet_status()
+
+        # Outage timing and latency series from the daemon (hosted here or attached to)
+        self._stats_stop = threading.Event()
+        threading.Thread(target=self.poll_daemon_stats, name="gui-daemon-stats", daemon=True).start()
+
         # Enforce Visibility on Startup (User Request)
         # Only show the window if START_MINIMIZED is False to prevent "flashing"
         if not settings.START_MINIMIZED:
@@ -89,27 +157,166 @@ class SZUNetworkGUI(ttk.Window):
         """
         Poll the log queue and update the UI in the main thread.
         """
+        lines = []
         while not self.log_queue.empty():
             msg = self.log_queue.get()
-            
-            # Stricter check to prevent accidental interception of standard logs
             if msg.strip().endswith("SYS_HEARTBEAT_SIGNAL"):
-                # Heartbeat Logic
-                current_time = time.strftime("%H:%M:%S")
-                self.lbl_heartbeat.configure(text=f"Last Heartbeat: {current_time}", bootstyle="success")
-                self.after(500, lambda: self.lbl_heartbeat.configure(bootstyle="secondary"))
-            else:
-                # Standard Log Logic
-                # Ensure message ends with newline for proper stacking
-                formatted_msg = msg if msg.endswith('\n') else msg + '\n'
-                self.log_text.text.configure(state="normal")
-                self.log_text.text.insert(END, formatted_msg)
-                self.log_text.text.see(END)
-                self.log_text.text.configure(state="disabled")
+                continue  # Shown by the heartbeat label (state subscription), not in the console
+            # Ensure message ends with newline for proper stacking
+            lines.append(msg if msg.endswith('\n') else msg + '\n')
+        if lines:
+            # One insert per poll, however many lines arrived; nothing to do when idle
+            self.log_text.text.configure(state="normal")
+            self.log_text.text.insert(END, "".join(lines))
+            self.log_text.text.see(END)
+            self.log_text.text.configure(state="disabled")
+            self.trim_log_view(MAX_LOG_LINES)
         
         # Schedule next check in 100ms
         self.after(100, self.update_log_console)
 
+    def trim_log_view(self, keep_lines):
+        """Keep only the last `keep_lines` lines in the log console (main thread only)."""
+        lines = int(self.log_text.text.index("end-1c").split(".")[0])
+        if lines > keep_lines:
+            self.log_text.text.configure(state="normal")
+            self.log_text.text.delete("1.0", f"{lines - keep_lines + 1}.0")
+            self.log_text.text.configure(state="disabled")
+
+    def _soft_reset_ui(self):
+        """Memory watchdog reset hook (runs on the watchdog thread): drop queued and old log lines."""
+        try:
+            while True:
+                self.log_queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.after(0, lambda: self.trim_log_view(MAX_LOG_LINES // 10))
+
+    def update_fleet_status(self):
+        """
+        Read the fleet status table straight from shared memory (no IPC, no pickling).
+        """
+        try:
+            if self._fleet_table is None:
+                from app.fleet import StatusTable
+                self._fleet_table = StatusTable.attach(settings.FLEET_TABLE_NAME)
+            statuses = self._fleet_table.read_all()
+            online = sum(1 for st in statuses if st.online)
+            self._configure(
+                self.lbl_fleet,
+                text=f"Fleet: {online}/{len(statuses)} online",
+                bootstyle="success" if online == len(statuses) else "warning"
+            )
+        except (FileNotFoundError, ValueError):
+            # No supervisor running (or it went away)
+            if self._fleet_table is not None:
+                self._fleet_table.close()
+                self._fleet_table = None
+            self._configure(self.lbl_fleet, text="")
+
+        self.after(2000, self.update_fleet_status)
+
+    def poll_daemon_stats(self):
+        """
+        Fetch outage timing and the latency series from the daemon every 5 s (background thread).
+        Connecting and the requests block, so they never run on the Tk thread; results are
+        handed over with after().
+        """
+        control = None
+        while not self._stats_stop.is_set():
+            outages = series = None
+            try:
+                if control is None:
+                    control = attach(timeout=0.2)
+                if control is not None:
+                    outages = control.request("outages", limit=0)
+                    series = control.request("series", resolution="minute", points=SPARKLINE_POINTS)["series"]
+            except (OSError, ValueError, KeyError):
+                if control is not None:
+                    control.close()
+                    control = None
+            try:
+                self.after(0, self.render_daemon_stats, outages, series)
+            except RuntimeError:
+                break  # Window destroyed
+            self._stats_stop.wait(5)
+        if control is not None:
+            control.close()
+
+    def render_daemon_stats(self, outages, series):
+        """Draw what poll_daemon_stats fetched (main thread only; None = no daemon reachable)."""
+        text = ""
+        try:
+            if outages is not None:
+                ttr, ttd = outages["time_to_recover_ms"], outages["time_to_detect_ms"]
+                text = f"Outages: {outages['outages']}"
+                if outages["outages"]:
+                    text += f" | TTD p50 {ttd['p50'] / 1000:.1f}s | TTR p50 {ttr['p50'] / 1000:.1f}s p90 {ttr['p90'] / 1000:.1f}s"
+        except (KeyError, TypeError):
+            text = ""
+        self._configure(self.lbl_outages, text=text)
+        try:
+            self.draw_sparkline(series["probe_ms"]["mean"], series["probe_fail"]["mean"])
+        except (KeyError, TypeError):
+            self.draw_sparkline([], [])
+
+    def draw_sparkline(self, latencies, failures):
+        """Latency as a line, failed-probe ratio as red bars from the bottom (main thread only)."""
+        data = (tuple(latencies), tuple(failures))
+        if data == self._spark_data:
+            return  # Same buckets as the last poll: keep the drawing
+        self._spark_data = data
+        canvas = self.spark_canvas
+        canvas.delete("all")
+        width, height = int(canvas["width"]), int(canvas["height"])
+        present = [v for v in latencies if v is not None]
+        if not latencies or not (present or any(failures)):
+            self._configure(self.lbl_spark, text="")
+            return
+        step = width / max(1, len(latencies) - 1)
+        top = max(present, default=1.0) or 1.0
+        for i, ratio in enumerate(failures):
+            if ratio:
+                x = i * step
+                canvas.create_line(x, height, x, height - max(2, ratio * (height - 2)), fill=self.style.colors.danger)
+        points = []
+        for i, value in enumerate(latencies + [None]):
+            if value is not None:
+                points += [i * step, height - 2 - value / top * (height - 4)]
+            elif points:
+                if len(points) == 2:
+                    points += [points[0] + 1, points[1]]  # Lone sample: draw a dot
+                canvas.create_line(*points, fill=self.style.colors.info, width=1)
+                points = []
+        self._configure(self.lbl_spark, text=f"{present[-1]:.0f} ms" if present else "offline")
+
+    def _on_heartbeat(self, when=None):
+        """Flash the heartbeat indicator (main thread only)."""
+        current_time = time.strftime("%H:%M:%S", time.localtime(when))
+        self._configure(self.lbl_heartbeat, text=f"Last Heartbeat: {current_time}", bootstyle="success")
+        self.after(500, lambda: self._configure(self.lbl_heartbeat, bootstyle="secondary"))
+
+    def _configure(self, widget, **options):
+        """widget.configure() with only the options that differ from what was last applied."""
+        applied = self._configured.setdefault(str(widget), {})
+        changes = {k: v for k, v in options.items() if applied.get(k) != v}
+        if changes:
+            widget.configure(**changes)
+            applied.update(changes)
+
+    def _on_state(self, state, changed):
+        """StateStore subscriber (keep-alive or follower thread): hand the transition to the Tk thread."""
+        self.after(0, self.render_state, changed)
+
+    def render_state(self, changed):
+        """Apply a client state transition to the header and tray (main thread only)."""
+        state = self.client_state.state
+        if changed & {"running", "online"}:
+            # Optimistic until the first probe of a newly started loop, as before
+            self.update_connection_status(state.running and state.online is not False)
+        if "last_probe" in changed and state.online:
+            self._on_heartbeat(state.last_probe)
+
     def setup_header(self):
         """Header with Title and Status Indicator."""
         header_frame = ttk.Frame(self.main_container)
@@ -153,7 +360,41 @@ class SZUNetworkGUI(ttk.Window):
         )
         self.lbl_heartbeat.pack(side=RIGHT, padx=(0, 10))
 
+        # Link quality: probe latency over the last hour (red bars = failed probes)
+        self.lbl_spark = ttk.Label(
+            header_frame,
+            text="",
+            bootstyle="secondary",
+            font=("Consolas", 9)
+        )
+        self.lbl_spark.pack(side=RIGHT, padx=(0, 10))
+        self.spark_canvas = tk.Canvas(
+            header_frame, width=120, height=20, highlightthickness=0, bg=self.style.colors.bg
+        )
+        self.spark_canvas.pack(side=RIGHT, padx=(0, 4))
+
+        # Fleet Indicator (only filled in when a fleet supervisor is running)
+        self.lbl_fleet = ttk.Label(
+            header_frame,
+            text="",
+            bootstyle="secondary",
+            font=("Consolas", 9)
+        )
+        self.lbl_fleet.pack(side=RIGHT, padx=(0, 10))
+
+        # Outage Indicator (time-to-recover distribution from the daemon)
+        self.lbl_outages = ttk.Label(
+            header_frame,
+            text="",
+            bootstyle="secondary",
+            font=("Consolas", 9)
+        )
+        self.lbl_outages.pack(side=RIGHT, padx=(0, 10))
+
     def update_connection_status(self, connected=False):
+        if connected == self._shown_online:
+            return  # Label and tray icon already show this (pystray redraws on every assignment)
+        self._shown_online = connected
         if connected:
             self.status_var.set("Online")
             self.status_label.configure(bootstyle="success.inverse") # Green background
@@ -290,7 +531,7 @@ class SZUNetworkGUI(ttk.Window):
 
         self._settings_window = ttk.Toplevel(self)
         self._settings_window.title("Advanced Settings")
-        self._settings_window.geometry("400x450")
+        self._settings_window.geometry("400x530")
         self._settings_window.resizable(False, False)
         self._settings_window.grab_set() # Modal
 
@@ -321,18 +562,26 @@ class SZUNetworkGUI(ttk.Window):
         start_min_var = ttk.BooleanVar(value=settings.START_MINIMIZED)
         ttk.Checkbutton(container, text="Start Minimized to Tray (开机后自动隐藏到托盘)", variable=start_min_var).pack(anchor=W, pady=(0, 20))
 
+        # 5. Profiling Window
+        ttk.Label(container, text="Profile Daemon (s, 0 = off) - 性能分析时长").pack(anchor=W)
+        profile_spin = ttk.Spinbox(container, from_=0, to=3600, bootstyle="info")
+        profile_spin.set(settings.PROFILE_SECONDS)
+        profile_spin.pack(fill=X, pady=(5, 15))
+
         def save_advanced_settings():
             try:
                 new_interval = int(interval_spin.get())
                 new_timeout = int(timeout_spin.get())
                 new_retries = int(retries_spin.get())
                 new_start_min = start_min_var.get()
+                new_profile = int(profile_spin.get())
 
                 # Update in-memory settings immediately (Requirement)
                 settings.CHECK_INTERVAL = new_interval
                 settings.REQUEST_TIMEOUT = new_timeout
                 settings.MAX_RETRIES = new_retries
                 settings.START_MINIMIZED = new_start_min
+                settings.PROFILE_SECONDS = new_profile
 
                 # Persist to .env
                 env_path = settings.PROJECT_ROOT / ".env"
@@ -340,6 +589,7 @@ class SZUNetworkGUI(ttk.Window):
                 set_key(env_path, "REQUEST_TIMEOUT", str(new_timeout))
                 set_key(env_path, "MAX_RETRIES", str(new_retries))
                 set_key(env_path, "START_MINIMIZED", str(new_start_min))
+                set_key(env_path, "PROFILE_SECONDS", str(new_profile))
 
                 logger.success("Advanced settings updated and saved.")
                 self._settings_window.destroy()
@@ -379,24 +629,54 @@ class SZUNetworkGUI(ttk.Window):
         self.stop_event = threading.Event()
         self.daemon_thread = threading.Thread(target=self.run_daemon_loop, daemon=True)
         self.daemon_thread.start()
-        self.update_connection_status(True)
+        self.client_state.update(running=True, online=None)
 
     def stop_daemon(self):
         if hasattr(self, 'stop_event'):
             self.stop_event.set()
             logger.info("Stopping daemon... (Waiting for current cycle)")
-        self.update_connection_status(False)
+        self.client_state.update(running=False)
 
     def run_daemon_loop(self):
         try:
+            # Single instance: attach to a daemon started by another front end if there is one
+            control = attach()
+            if control:
+                self.follow_daemon(control)
+                return
+
             client = SZUNetworkClient()
-            client.keep_alive(stop_event=self.stop_event)
+            client.state = self.client_state  # The loop publishes straight into the GUI's store
+            daemon = NetworkDaemon(client)
+            if daemon.memory:
+                daemon.memory.add_reset_hook(self._soft_reset_ui)
+            if not daemon.acquire():
+                raise RuntimeError("Another daemon holds the instance lock but is not answering.")
+            if settings.PROFILE_SECONDS:
+                # Must start in this thread: cProfile only sees the thread that enables it
+                profile_daemon_window(client, settings.PROFILE_SECONDS, output_dir=settings.PROJECT_ROOT / "logs")
+            daemon.run(stop_event=self.stop_event)
         except Exception as e:
             logger.exception(f"Daemon error: {e}")
             # Reset UI on crash
             self.after(0, lambda: self.toggle_btn.configure(text="START DAEMON", bootstyle="success-toolbutton"))
             self.after(0, lambda: self.toggle_btn.state(["!selected"]))
-            self.after(0, lambda: self.update_connection_status(False))
+            self.client_state.update(running=False)
+
+    def follow_daemon(self, control):
+        """Mirror an external daemon's status over its control socket (background thread)."""
+        status = control.request("status")
+        logger.info(f"Attached to running daemon (PID {status['pid']}) instead of starting a second loop.")
+        try:
+            for status in control.stream_stats(interval=1.0):
+                if self.stop_event.is_set():
+                    break
+                # Polled every second, but the store only publishes (and the GUI only redraws) on change
+                self.client_state.update(online=bool(status["online"]), last_probe=status["last_probe"],
+                                  paused=bool(status.get("paused")))
+        finally:
+            control.close()
+            logger.info("Detached from daemon.")
 
     def setup_log_console(self):
         """Log Console Area."""
@@ -422,7 +702,7 @@ class SZUNetworkGUI(ttk.Window):
 
     def load_icon(self, name=None, state="online"):
         """
-        Load an icon from assets or generate a high-quality fallback.
+        Load an icon from assets or generate a high-quality fallback (decoded once, then cached).
         Args:
             name (str, optional): Specific filename to load.
             state (str): 'online' or 'offline' for state-based loading.
@@ -431,41 +711,7 @@ class SZUNetworkGUI(ttk.Window):
         # Determine target filename if not specified
         if name is None:
             name = "tray_on.png" if state == "online" else "tray_off.png"
-            
-        icon_path = pathlib.Path(__file__).parent / "assets" / name
-        
-        if icon_path.exists():
-            try:
-                return Image.open(icon_path)
-            except Exception as e:
-                logger.warning(f"Failed to load icon from {icon_path}: {e}")
-        
-        # Fallback: Generate 64x64 high-quality icons programmatically
-        width, height = 64, 64
-        
-        if state == "online":
-            # Solid Cyan Filled Square
-            image = Image.new('RGB', (width, height), (0, 255, 255))
-            draw = ImageDraw.Draw(image)
-            draw.rectangle(
-                (width // 4, height // 4, width * 3 // 4, height * 3 // 4),
-                fill=(255, 255, 255)
-            )
-            return image
-        else:
-            # Hollow Gray Outline with Transparency (RGBA)
-            # Create a fully transparent background
-            image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(image)
-            # Draw gray outline
-            outline_color = (128, 128, 128, 255)
-            draw.rectangle(
-                (width // 4, height // 4, width * 3 // 4, height * 3 // 4),
-                outline=outline_color,
-                width=4,
-                fill=None # Transparent center
-            )
-            return image
+        return _load_icon_image(name, state)
 
     def on_close_request(self):
         """Minimize to Tray on Close."""
@@ -491,6 +737,7 @@ class SZUNetworkGUI(ttk.Window):
 
     def _quit_app_safe(self):
         self.stop_daemon()
+        self._stats_stop.set()
         if self.tray_icon:
             self.tray_icon.stop()
         self.quit()
@@ -1,4 +1,5 @@
 # cli.py
+import argparse
 import time
 import sys
 from rich.console import Console, Group
@@ -11,6 +12,7 @@ from rich import print as rprint
 # 引入原来的主程序逻辑
 from main import run_daemon
 from app.config import settings
+from app.log_utils import setup_logger
 
 console = Console()
 
@@ -81,7 +83,496 @@ def start_up_animation():
         time.sleep(0.3); progress.advance(task2)
         time.sleep(0.3); progress.advance(task2)
 
+def cmd_verify(args) -> int:
+    """批量校验账号: python cli.py verify accounts.csv"""
+    from app.batch import load_accounts, verify_accounts, write_report
+
+    setup_logger()
+    accounts = load_accounts(args.csv)
+    if not accounts:
+        rprint(f"[yellow]No accounts found in {args.csv}[/yellow]")
+        return 1
+
+    with Progress(
+        SpinnerColumn("dots", style="bold magenta"),
+        TextColumn("[progress.description]{task.description}"),
+        console=console,
+        transient=True,
+    ) as progress:
+        task = progress.add_task(f"[cyan]Verifying {len(accounts)} accounts...", total=len(accounts))
+        results = verify_accounts(accounts, max_workers=args.workers, on_result=lambda r: progress.advance(task))
+
+    table = Table(title="Credential Verification Report")
+    table.add_column("Username", style="cyan")
+    table.add_column("Result", justify="center")
+    table.add_column("Latency (ms)", justify="right")
+    table.add_column("Error", style="dim")
+    for r in results:
+        status = "[green]OK[/green]" if r.success else "[red]FAIL[/red]"
+        table.add_row(r.username, status, f"{r.latency_ms:.0f}", r.error)
+    console.print(table)
+
+    if args.output:
+        write_report(results, args.output)
+        rprint(f"[dim]Report written to {args.output}[/dim]")
+
+    return 0 if all(r.success for r in results) else 2
+
+def render_fleet_table(statuses) -> Table:
+    """共享内存状态表 -> Rich 表格"""
+    online = sum(1 for st in statuses if st.online)
+    table = Table(title=f"Fleet Status ({online}/{len(statuses)} online)")
+    table.add_column("Username", style="cyan")
+    table.add_column("Status", justify="center")
+    table.add_column("Probe (ms)", justify="right")
+    table.add_column("Last Login", justify="right")
+    table.add_column("Failures", justify="right")
+    for st in statuses:
+        status = "[green]ONLINE[/green]" if st.online else "[red]OFFLINE[/red]"
+        last_login = time.strftime("%H:%M:%S", time.localtime(st.last_login)) if st.last_login else "--:--:--"
+        table.add_row(st.username, status, f"{st.latency_ms:.0f}", last_login, str(st.failures))
+    return table
+
+def cmd_fleet(args) -> int:
+    """多进程舰队模式: python cli.py fleet accounts.csv --workers 4"""
+    from app.batch import load_accounts
+    from app.fleet import FleetSupervisor
+
+    setup_logger()
+    accounts = load_accounts(args.csv)
+    if not accounts:
+        rprint(f"[yellow]No accounts found in {args.csv}[/yellow]")
+        return 1
+
+    supervisor = FleetSupervisor(accounts, workers=args.workers, table_name=settings.FLEET_TABLE_NAME)
+    try:
+        supervisor.start()
+    except FileExistsError as e:
+        rprint(f"[red]{e}[/red] (set FLEET_TABLE_NAME to run a second fleet)")
+        return 1
+    try:
+        with Live(render_fleet_table(supervisor.status()), console=console, refresh_per_second=1) as live:
+            while True:
+                time.sleep(1)
+                supervisor.check_workers()
+                live.update(render_fleet_table(supervisor.status()))
+    except KeyboardInterrupt:
+        rprint("\n[bold red]![/bold red] [red]Stopping fleet...[/red]")
+    finally:
+        supervisor.stop()
+    return 0
+
+def cmd_stats(args) -> int:
+    """历史统计: python cli.py stats --days 30"""
+    from app.history import query_stats
+
+    if not settings.HISTORY_DB_PATH.exists():
+        rprint(f"[yellow]No history recorded yet ({settings.HISTORY_DB_PATH})[/yellow]")
+        return 1
+
+    since = time.time() - args.days * 86400
+    results = query_stats(settings.HISTORY_DB_PATH, since=since, account=args.account)
+
+    table = Table(title=f"Outage & Login Statistics (last {args.days:g} days)")
+    table.add_column("Account", style="cyan")
+    table.add_column("Outages", justify="right")
+    table.add_column("MTTR (ms)", justify="right")
+    table.add_column("Outage p50/p90 (ms)", justify="right")
+    table.add_column("Logins", justify="right")
+    table.add_column("Success", justify="right")
+    table.add_column("Login p50/p90/p99 (ms)", justify="right")
+    for r in results:
+        table.add_row(
+            r.account, str(r.outages), f"{r.mttr_ms:.0f}",
+            f"{r.outage_p50_ms:.0f} / {r.outage_p90_ms:.0f}",
+            str(r.logins), f"{r.login_success_rate:.0%}",
+            f"{r.login_p50_ms:.0f} / {r.login_p90_ms:.0f} / {r.login_p99_ms:.0f}",
+        )
+    console.print(table)
+    return 0
+
+def cmd_outages(args) -> int:
+    """断网时间线: python cli.py outages (需要守护进程正在运行)"""
+    from app.daemon import attach
+
+    control = attach()
+    if not control:
+        rprint("[yellow]No running daemon found. Start it with `python main.py --loop` or the GUI.[/yellow]")
+        return 1
+    try:
+        reply = control.request("outages", limit=args.limit)
+    finally:
+        control.close()
+
+    dist = Table(title=f"Outage Timing ({reply['outages']} outages, state: {reply['state']})")
+    dist.add_column("Metric", style="cyan")
+    for col in ("p50", "p90", "p99", "max"):
+        dist.add_column(f"{col} (ms)", justify="right")
+    for key, label in (("time_to_detect_ms", "Time to detect"),
+                       ("time_to_first_login_ms", "Time to first login"),
+                       ("time_to_recover_ms", "Time to recover")):
+        d = reply[key]
+        dist.add_row(label, *(f"{d[col]:.0f}" for col in ("p50", "p90", "p99", "max")))
+    console.print(dist)
+
+    timeline = Table(title="Recent Outages")
+    timeline.add_column("Detected", style="cyan")
+    timeline.add_column("First Login", justify="right")
+    timeline.add_column("Recovered", justify="right")
+    timeline.add_column("Down (s)", justify="right")
+    fmt = lambda ts: time.strftime("%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+    for r in reply["recent"]:
+        timeline.add_row(fmt(r["detected"]), fmt(r["first_login"]), fmt(r["recovered"]),
+                         f"{r['recovered'] - r['last_ok']:.1f}")
+    console.print(timeline)
+    return 0
+
+def cmd_status(args) -> int:
+    """守护进程状态: python cli.py status [--history minute] (需要守护进程正在运行)"""
+    from app.daemon import attach
+    from app.timeseries import sparkline
+
+    control = attach()
+    if not control:
+        rprint("[yellow]No running daemon found. Start it with `python main.py --loop` or the GUI.[/yellow]")
+        return 1
+    try:
+        status = control.request("status")
+        reply = control.request("series", resolution=args.history, points=args.points) if args.history else None
+    finally:
+        control.close()
+
+    online = {True: "[green]ONLINE[/green]", False: "[red]OFFLINE[/red]"}.get(status["online"], "[dim]UNKNOWN[/dim]")
+    fmt = lambda ts: time.strftime("%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+    table = Table(title=f"Daemon PID {status['pid']} ({status['user']}, {status['zone']} zone)")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    table.add_row("State", online + (" [yellow](paused)[/yellow]" if status["paused"] else ""))
+    table.add_row("Last probe", f"{fmt(status['last_probe'])} ({status['probe_latency_ms']:.0f} ms)")
+    table.add_row("Last login", f"{fmt(status['last_login'])} ({'ok' if status['last_login_ok'] else '-' if status['last_login_ok'] is None else 'failed'})")
+    table.add_row("Login failures", str(status["login_failures"]))
+    if status.get("session_expires_at"):
+        table.add_row("Session ends", f"{fmt(status['session_expires_at'])} "
+                                      f"({status['session_renewals']} renewed, last {status['last_renewal_ms']:.0f} ms)")
+    table.add_row("Uptime (s)", f"{status['uptime']:.0f}")
+    console.print(table)
+    if reply is None:
+        return 0
+    if not reply.get("ok"):
+        rprint(f"[yellow]{reply.get('error')}[/yellow]")
+        return 1
+
+    series = reply["series"]
+    step = series["probe_ms"]["step"]
+    width = max(10, console.width - 50)  # Narrow terminals keep the newest buckets
+    history = Table(title=f"Last {args.points} x {step}s ({args.history})")
+    history.add_column("Series", style="cyan")
+    history.add_column("Trend (oldest → newest)", no_wrap=True)
+    history.add_column("Mean", justify="right")
+    history.add_column("Max", justify="right")
+    for key, label, unit, scale in (("probe_ms", "Probe latency", "ms", 1), ("probe_fail", "Probe failures", "%", 100),
+                                    ("login_ms", "Login latency", "ms", 1), ("login_fail", "Login failures", "%", 100)):
+        s = series[key]
+        present = [v * scale for v in s["mean"] if v is not None]
+        peaks = [v * scale for v in s["max"] if v is not None]
+        lo_hi = (0, 1) if unit == "%" else (None, None)
+        history.add_row(label, sparkline(s["mean"][-width:], *lo_hi),
+                        f"{sum(present) / len(present):.1f} {unit}" if present else "-",
+                        f"{max(peaks):.1f} {unit}" if peaks else "-")
+    console.print(history)
+    return 0
+
+def cmd_memory(args) -> int:
+    """内存曲线: python cli.py memory [--reset] (需要守护进程开启 MEMORY_WATCHDOG)"""
+    from app.daemon import attach
+
+    control = attach()
+    if not control:
+        rprint("[yellow]No running daemon found. Start it with `python main.py --loop` or the GUI.[/yellow]")
+        return 1
+    try:
+        reply = control.request("memory", reset=args.reset)
+    finally:
+        control.close()
+    if not reply.get("ok"):
+        rprint(f"[yellow]{reply.get('error')}[/yellow]")
+        return 1
+
+    table = Table(title=f"Daemon Memory ({reply['samples']} samples, {reply.get('resets', 0)} soft resets)")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    for key, label in (("window_s", "Window (s)"), ("rss_first_mb", "RSS first (MB)"),
+                       ("rss_last_mb", "RSS last (MB)"), ("rss_peak_mb", "RSS peak (MB)"),
+                       ("traced_last_mb", "Python heap (MB)"), ("growth_mb_per_hour", "Growth (MB/h)"),
+                       ("budget_mb", "Budget (MB, 0 = none)")):
+        if key in reply:
+            table.add_row(label, str(reply[key]))
+    console.print(table)
+    return 0
+
+def cmd_idle_bench(args) -> int:
+    """空闲开销基准: python cli.py idle-bench --seconds 60 --intervals 10,30,60"""
+    from app.bench import run_idle_benchmark
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    intervals = [int(i) for i in args.intervals.split(",") if i.strip()]
+    rprint(f"[dim]Measuring {len(backends) * len(intervals)} configurations x {args.seconds:.0f}s "
+           f"against a local 204 stand-in (GUI poll: {args.gui_poll} ms)...[/dim]")
+
+    table = Table(title="Idle Cost per Hour (online, keep-alive only)")
+    table.add_column("Backend", style="cyan")
+    table.add_column("Interval (s)", justify="right")
+    table.add_column("Online/Probes", justify="right")
+    table.add_column("CPU s/h", justify="right")
+    table.add_column("Wakeups/h", justify="right")
+    table.add_column("Preempted/h", justify="right")
+    table.add_column("Bytes sent/h", justify="right")
+    table.add_column("Peak RSS (MB)", justify="right")
+    fmt = lambda v: "-" if v is None else f"{v:,.0f}"
+
+    def add_row(r):
+        table.add_row(r.backend, str(r.interval), f"{r.online}/{r.probes}", f"{r.cpu_s_per_hour:.2f}",
+                      fmt(r.voluntary_csw_per_hour), fmt(r.involuntary_csw_per_hour),
+                      fmt(r.bytes_sent_per_hour), f"{r.peak_rss_mb:.1f}")
+        rprint(f"[dim]  {r.backend} @ {r.interval}s done[/dim]")
+
+    run_idle_benchmark(backends, intervals, seconds=args.seconds, gui_poll_ms=args.gui_poll, on_result=add_row)
+    console.print(table)
+    return 0
+
+def cmd_transport_bench(args) -> int:
+    """HTTP 后端开销: python cli.py transport-bench --runs 5"""
+    from app.bench import run_transport_benchmark
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    rprint(f"[dim]Measuring {', '.join(backends)} in {args.runs} fresh interpreters each...[/dim]")
+    table = Table(title="HTTP Transport Footprint (medians)")
+    table.add_column("Backend", style="cyan")
+    table.add_column("Import (ms)", justify="right")
+    table.add_column("Modules", justify="right")
+    table.add_column("Import RSS (MB)", justify="right")
+    table.add_column(f"RSS after {args.requests} req (MB)", justify="right")
+    table.add_column("Request (ms)", justify="right")
+    run_transport_benchmark(backends, runs=args.runs, requests=args.requests, on_result=lambda r: table.add_row(
+        r.backend, f"{r.import_ms:.1f}", str(r.modules), f"{r.import_rss_mb:.2f}",
+        f"{r.warm_rss_mb:.2f}", f"{r.request_ms:.2f}"))
+    console.print(table)
+    return 0
+
+def cmd_simulate(args) -> int:
+    """虚拟时钟模拟: python cli.py simulate --days 7 --intervals 5,10,30"""
+    from app.simulation import load_timeline, random_timeline, run_simulation
+
+    if args.scenario:
+        scenario = load_timeline(args.scenario)
+        events, duration = scenario["events"], float(scenario.get("duration", args.days * 86400))
+        session_limit = float(scenario.get("session_limit", args.session_limit))
+    else:
+        duration, session_limit = args.days * 86400, args.session_limit
+        events = random_timeline(duration, seed=args.seed, flap_every=args.flap_every, down_for=args.down_for,
+                                 portal_error_every=args.portal_errors_every, slow_every=args.slow_every)
+    intervals = [int(i) for i in args.intervals.split(",") if i.strip()]
+    rprint(f"[dim]{len(events)} timeline events over {duration / 86400:.1f} virtual days...[/dim]")
+
+    table = Table(title="Keep-Alive Simulation (virtual time)")
+    table.add_column("Interval (s)", justify="right", style="cyan")
+    table.add_column("Probes", justify="right")
+    table.add_column("Logins (failed)", justify="right")
+    table.add_column("Outages", justify="right")
+    table.add_column("Downtime (s)", justify="right")
+    table.add_column("Availability", justify="right")
+    table.add_column("TTD p50/p90 (s)", justify="right")
+    table.add_column("TTR p50/p90 (s)", justify="right")
+    table.add_column("Wall (s)", justify="right")
+    for interval in intervals:
+        r = run_simulation(events, duration, check_interval=interval, session_limit=session_limit)
+        ttd, ttr = r.detected["time_to_detect_ms"], r.detected["time_to_recover_ms"]
+        table.add_row(str(interval), f"{r.probes:,}", f"{r.logins:,} ({r.login_failures:,})", str(r.outages),
+                      f"{r.downtime_s:,.0f}", f"{r.availability:.4%}",
+                      f"{ttd['p50'] / 1000:.1f} / {ttd['p90'] / 1000:.1f}",
+                      f"{ttr['p50'] / 1000:.1f} / {ttr['p90'] / 1000:.1f}", f"{r.wall_s:.1f}")
+    console.print(table)
+    return 0
+
+def cmd_replay(args) -> int:
+    """回放录制的流量: python cli.py replay logs/campus.jsonl.gz --speed 0"""
+    from app.cassette import replay_cassette
+    from app.profiling import Profiler
+
+    if args.profile:
+        with Profiler("replay", flamegraph=args.flamegraph) as profiler:
+            r = replay_cassette(args.cassette, speed=args.speed, check_interval=args.interval)
+    else:
+        profiler, r = None, replay_cassette(args.cassette, speed=args.speed, check_interval=args.interval)
+
+    pace = "virtual time" if not args.speed else f"{args.speed:g}x real time"
+    table = Table(title=f"Cassette Replay ({pace})")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    table.add_row("Exchanges served / recorded", f"{r.served} / {r.exchanges}")
+    table.add_row("Requests without recording", str(r.missing))
+    table.add_row("Probes / logins (failed)", f"{r.probes} / {r.logins} ({r.login_failures})")
+    table.add_row("Probe p50 (ms)", f"{r.probe_ms_p50:.0f}")
+    table.add_row("Login p50 / max (ms)", f"{r.login_ms_p50:.0f} / {r.login_ms_max:.0f}")
+    table.add_row("Recorded / replayed span (s)", f"{r.recorded_s:,.1f} / {r.replayed_s:,.1f}")
+    table.add_row("Wall time (s)", f"{r.wall_s:.2f} ({r.speedup:,.0f}x)")
+    console.print(table)
+    if profiler:
+        for name, path in profiler.reports.items():
+            rprint(f"[dim]{name}: {path}[/dim]")
+    if r.missing:
+        rprint("[yellow]The client asked for requests the cassette does not contain; the replay diverged "
+               "(different zone, CHECK_INTERVAL or code path than the recording).[/yellow]")
+    return 0
+
+def cmd_loadgen(args) -> int:
+    """负载测试: python cli.py loadgen --clients 2000 --pattern herd"""
+    from loguru import logger
+    from app.loadgen import run_load
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    with Progress(
+        SpinnerColumn("dots", style="bold magenta"),
+        TextColumn("[progress.description]{task.description}"),
+        console=console,
+        transient=True,
+    ) as progress:
+        progress.add_task(f"[cyan]{args.clients} clients, {args.pattern} arrivals over {args.window:.0f}s...", total=None)
+        r = run_load(args.clients, pattern=args.pattern, window=args.window, zone=args.zone,
+                     concurrency=args.concurrency, delay_ms=args.portal_delay, seed=args.seed)
+
+    table = Table(title=f"Load Test: {r.clients} clients, {r.pattern}, {r.zone} zone")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    table.add_row("Succeeded / failed", f"{r.succeeded} / {r.failed}")
+    table.add_row("Wall time (s)", f"{r.wall_s:.2f}")
+    table.add_row("Throughput (logins/s)", f"{r.logins_per_s:.1f}")
+    table.add_row("Login p50 / p90 / p99 / max (ms)",
+                  f"{r.latency_p50_ms:.0f} / {r.latency_p90_ms:.0f} / {r.latency_p99_ms:.0f} / {r.latency_max_ms:.0f}")
+    table.add_row("Queued p50 / p99 (ms)", f"{r.queue_p50_ms:.0f} / {r.queue_p99_ms:.0f}")
+    table.add_row("Client CPU per login (ms)", f"{r.cpu_ms_per_login:.1f}")
+    table.add_row("Portal: peak req/s, peak concurrent", f"{r.portal['peak_rps']}, {r.portal['peak_in_flight']}")
+    table.add_row("Portal: CPU (s)", f"{r.portal['cpu_s']:.2f}")
+    console.print(table)
+    for error, count in sorted(r.errors.items(), key=lambda e: -e[1])[:10]:
+        rprint(f"[red]{count:6d}[/red] {error}")
+    return 0 if not r.failed else 2
+
+def cmd_coop_sim(args) -> int:
+    """局域网协作模拟: python cli.py coop-sim --nodes 6 --seconds 60 --fail-at 30"""
+    from app.coop import simulate_lan
+
+    rprint(f"[dim]Running {args.nodes} cooperating daemons on loopback for {args.seconds:.0f}s "
+           f"(interval {args.interval}s)...[/dim]")
+    rows, total = simulate_lan(args.nodes, args.seconds, args.interval, args.fail_at)
+
+    table = Table(title=f"LAN Cooperation: {total} probe requests vs ~{args.nodes * args.seconds / args.interval:.0f} without")
+    table.add_column("Node", style="cyan")
+    table.add_column("Local probes", justify="right")
+    table.add_column("Shared results used", justify="right")
+    table.add_column("Datagrams sent", justify="right")
+    table.add_column("Outage noticed after (s)", justify="right")
+    for node, local, shared, sent, detect in rows:
+        table.add_row(node, str(local), str(shared), str(sent), "-" if detect is None else f"{detect:.2f}")
+    console.print(table)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="SZU Network Guardian CLI")
+    sub = parser.add_subparsers(dest="command")
+
+    verify = sub.add_parser("verify", help="Verify a CSV of accounts (username,password[,ip]) concurrently")
+    verify.add_argument("csv", help="CSV file with username,password[,ip] rows")
+    verify.add_argument("--workers", type=int, default=8, help="Maximum concurrent logins")
+    verify.add_argument("--output", "-o", help="Write the result table to this CSV file")
+
+    fleet = sub.add_parser("fleet", help="Keep many accounts online across worker processes")
+    fleet.add_argument("csv", help="CSV file with username,password[,ip] rows")
+    fleet.add_argument("--workers", type=int, default=settings.FLEET_WORKERS, help="Number of worker processes")
+
+    stats = sub.add_parser("stats", help="Outage counts, MTTR and latency percentiles from the local history")
+    stats.add_argument("--days", type=float, default=30, help="Time window in days")
+    stats.add_argument("--account", help="Only this account")
+
+    outages = sub.add_parser("outages", help="Time-to-detect / time-to-recover from the running daemon")
+    outages.add_argument("--limit", type=int, default=20, help="Number of recent outages to list")
+
+    status = sub.add_parser("status", help="State of the running daemon, optionally with latency/failure history")
+    status.add_argument("--history", nargs="?", const="minute", choices=("second", "minute", "hour"),
+                        help="Add sparklines at this resolution (default: minute)")
+    status.add_argument("--points", type=int, default=60, help="Buckets shown with --history")
+
+    memory = sub.add_parser("memory", help="RSS trend and soft resets from the daemon's memory watchdog")
+    memory.add_argument("--reset", action="store_true", help="Trigger a soft reset (sessions, caches, buffers) first")
+
+    idle = sub.add_parser("idle-bench", help="CPU, wakeups, bytes and RSS per idle hour for polling configurations")
+    idle.add_argument("--seconds", type=float, default=60, help="Wall time measured per configuration")
+    idle.add_argument("--intervals", default="10,30,60", help="Comma-separated CHECK_INTERVAL values")
+    idle.add_argument("--backends", default="http,requests,socket,ladder", help="Comma-separated probe backends")
+    idle.add_argument("--gui-poll", type=int, default=100, help="Emulated GUI log poll period in ms (0 = headless)")
+
+    transport = sub.add_parser("transport-bench", help="Import time and RSS of the stdlib vs requests HTTP backends")
+    transport.add_argument("--backends", default="stdlib,requests", help="Comma-separated HTTP backends")
+    transport.add_argument("--runs", type=int, default=5, help="Fresh interpreters per backend")
+    transport.add_argument("--requests", type=int, default=50, help="Portal round trips per run")
+
+    sim = sub.add_parser("simulate", help="Run the real keep-alive loop over a scripted/random outage timeline in virtual time")
+    sim.add_argument("--days", type=float, default=7, help="Virtual duration (random timelines)")
+    sim.add_argument("--intervals", default=str(settings.CHECK_INTERVAL), help="Comma-separated CHECK_INTERVAL values to compare")
+    sim.add_argument("--scenario", help="JSON timeline: {duration, session_limit, events: [[at, kind, value], ...]}")
+    sim.add_argument("--seed", type=int, default=1, help="Random timeline seed")
+    sim.add_argument("--flap-every", type=float, default=3600, help="Mean seconds between link drops (0 = none)")
+    sim.add_argument("--down-for", type=float, default=120, help="Mean link drop length in seconds")
+    sim.add_argument("--portal-errors-every", type=float, default=0, help="Mean seconds between portal error episodes")
+    sim.add_argument("--slow-every", type=float, default=0, help="Mean seconds between slow-response periods")
+    sim.add_argument("--session-limit", type=float, default=0, help="Portal session limit in seconds (0 = none)")
+
+    replay = sub.add_parser("replay", help="Replay a recorded cassette (RECORD_CASSETTE) through the real client and keep-alive loop")
+    replay.add_argument("cassette", help="Cassette file (.jsonl or .jsonl.gz)")
+    replay.add_argument("--speed", type=float, default=0, help="Real-time speed factor (1 = original pace, 0 = virtual time)")
+    replay.add_argument("--interval", type=int, help="Override the recorded CHECK_INTERVAL")
+    replay.add_argument("--profile", action="store_true", help="cProfile/tracemalloc the replay (reports in logs/)")
+    replay.add_argument("--flamegraph", action="store_true", help="With --profile: also write folded stack samples")
+
+    load = sub.add_parser("loadgen", help="Many simulated clients against a local SRUN/Dr.COM portal stand-in")
+    load.add_argument("--clients", type=int, default=1000, help="Number of simulated accounts (one synthetic IP each)")
+    load.add_argument("--pattern", choices=("herd", "staggered", "poisson"), default="herd", help="Arrival pattern")
+    load.add_argument("--window", type=float, default=10, help="Arrival window in seconds (staggered/poisson)")
+    load.add_argument("--zone", choices=("teaching", "dorm"), default=settings.NETWORK_ZONE, help="Portal flavour")
+    load.add_argument("--concurrency", type=int, default=64, help="Client threads on this box")
+    load.add_argument("--portal-delay", type=float, default=0, help="Stand-in processing time per request (ms)")
+    load.add_argument("--seed", type=int, help="Random seed for poisson arrivals")
+    load.add_argument("--log-level", default="WARNING", help="Client log level during the run")
+
+    coop = sub.add_parser("coop-sim", help="Several LAN-cooperating daemons on localhost against a 204 stand-in")
+    coop.add_argument("--nodes", type=int, default=6, help="Number of simulated daemons")
+    coop.add_argument("--seconds", type=float, default=60, help="Run time")
+    coop.add_argument("--interval", type=int, default=2, help="CHECK_INTERVAL for the simulation")
+    coop.add_argument("--fail-at", type=float, help="Make the stand-in captive after this many seconds")
+    return parser
+
+# 子命令 -> 处理函数 (不带子命令时进入 Dashboard)
+COMMANDS = {
+    "verify": cmd_verify,
+    "fleet": cmd_fleet,
+    "stats": cmd_stats,
+    "outages": cmd_outages,
+    "status": cmd_status,
+    "memory": cmd_memory,
+    "idle-bench": cmd_idle_bench,
+    "transport-bench": cmd_transport_bench,
+    "simulate": cmd_simulate,
+    "replay": cmd_replay,
+    "loadgen": cmd_loadgen,
+    "coop-sim": cmd_coop_sim,
+}
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        args = build_parser().parse_args()
+        sys.exit(COMMANDS[args.command](args))
+
     console.clear() # 清屏
     print_banner()
     start_up_animation()
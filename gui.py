@@ -8,6 +8,7 @@ import pystray
 from loguru import logger
 
 from app.client import SZUNetworkClient
+from app.daemon import NetworkDaemon, attach
 from main import configure_logging
 
 # Global control event
@@ -44,9 +45,19 @@ def show_window(hwnd):
 def run_daemon(stop_evt):
     """Run the network client in a background thread."""
     try:
-        client = SZUNetworkClient()
-        # Use the keep_alive method which respects the stop_event
-        client.keep_alive(stop_event=stop_evt)
+        # Another front end already runs the daemon: don't start a second loop
+        control = attach()
+        if control:
+            logger.info("Daemon already running; this tray only controls visibility.")
+            control.close()
+            return
+
+        daemon = NetworkDaemon(SZUNetworkClient())
+        if not daemon.acquire():
+            logger.error("Another daemon holds the instance lock but is not answering.")
+            return
+        # The daemon runs keep_alive, which respects the stop_event
+        daemon.run(stop_event=stop_evt)
     except Exception as e:
         logger.exception(f"Daemon thread crashed: {e}")
 
@@ -5,7 +5,9 @@ import threading
 from loguru import logger
 from app.client import SZUNetworkClient
 from app.config import settings
+from app.daemon import NetworkDaemon, attach
 from app.log_utils import setup_logger
+from app.profiling import Profiler, profile_daemon_window
 
 # Global event for graceful shutdown
 stop_event = threading.Event()
@@ -16,10 +18,31 @@ def signal_handler(signum, frame):
     logger.info(f"Received signal {signame} ({signum}), stopping daemon...")
     stop_event.set()
 
+def follow_daemon(control):
+    """Attach to an already-running daemon and report its status instead of starting a second loop."""
+    status = control.request("status")
+    logger.info(f"Attached to running daemon (PID {status['pid']}, user {status['user']}). Press Ctrl+C to detach.")
+    last_online = None
+    try:
+        for status in control.stream_stats(interval=1.0):
+            if stop_event.is_set():
+                break
+            if status["online"] != last_online:
+                last_online = status["online"]
+                state = "online" if last_online else ("offline" if last_online is not None else "unknown")
+                logger.info(f"Daemon reports network {state} (probe {status['probe_latency_ms']} ms)")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Lost connection to daemon: {e}")
+    finally:
+        control.close()
+
 def run_daemon(force_loop=False):
     parser = argparse.ArgumentParser(description="SZU Teaching Area Network Auto-Login")
     parser.add_argument("--loop", action="store_true", help="Run in daemon mode (keep-alive)")
     parser.add_argument("--interval", type=int, help="Override check interval in seconds", default=settings.RETRY_INTERVAL)
+    parser.add_argument("--profile", type=int, metavar="N", default=0,
+                        help="Profile N login cycles (or, with --loop, the first N seconds of the daemon); reports go to logs/")
+    parser.add_argument("--flamegraph", action="store_true", help="With --profile: also write a folded stack dump for flamegraphs")
     args = parser.parse_args()
 
     setup_logger()
@@ -33,13 +56,42 @@ def run_daemon(force_loop=False):
     signal.signal(signal.SIGTERM, signal_handler)
 
     try:
+        # Single instance: if a daemon already runs on this host, talk to it instead
+        control = attach()
+        if control and (args.loop or force_loop):
+            follow_daemon(control)
+            return
+        if control:
+            logger.info("Daemon already running; asking it to log in.")
+            reply = control.request("login")
+            control.close()
+            sys.exit(0 if reply.get("ok") else 1)
+
         client = SZUNetworkClient()
         
         if args.loop or force_loop:
+            daemon = NetworkDaemon(client)
+            if not daemon.acquire():
+                logger.critical("Another daemon holds the instance lock but is not answering on its control socket.")
+                sys.exit(1)
             logger.info("Starting daemon... Press Ctrl+C to stop.")
-            client.keep_alive(stop_event=stop_event)
+            if args.profile:
+                profile_daemon_window(client, args.profile, output_dir=settings.PROJECT_ROOT / "logs", flamegraph=args.flamegraph)
+            daemon.run(stop_event=stop_event)
         else:
-            success = client.login()
+            history = None
+            if settings.HISTORY_ENABLED:
+                from app.history import HistoryStore, attach_history
+                history = HistoryStore(settings.HISTORY_DB_PATH)
+                attach_history(client, history)
+            if args.profile:
+                with Profiler("login", output_dir=settings.PROJECT_ROOT / "logs", flamegraph=args.flamegraph):
+                    results = [client.login(coalesce=False) for _ in range(args.profile)]
+                success = all(results)
+            else:
+                success = client.login()
+            if history:
+                history.close()
             sys.exit(0 if success else 1)
             
     except Exception as e:
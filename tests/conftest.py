@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# app.config builds Settings at import time and requires credentials
+os.environ.setdefault("SRUN_USERNAME", "2020000000")
+os.environ.setdefault("SRUN_PASSWORD", "test-password")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
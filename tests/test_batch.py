@@ -0,0 +1,82 @@
+import csv
+import threading
+import time
+
+import pytest
+
+from app import batch
+from app.batch import Account, VerificationResult, load_accounts, verify_accounts, write_report
+
+
+def test_load_accounts_skips_header_comments_and_blank_rows(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text("\ufeffusername,password\n# staff\n\nalice, pw1 \nbob,pw2,172.30.1.9\n", encoding="utf-8")
+    assert load_accounts(path) == [Account("alice", "pw1", ""), Account("bob", "pw2", "172.30.1.9")]
+
+
+def test_load_accounts_rejects_rows_without_a_password(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text("alice,pw1\nbob\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="bob"):
+        load_accounts(path)
+
+
+class FakeClient:
+    """Stands in for SZUNetworkClient: a slow login whose outcome depends on the username."""
+    lock = threading.Lock()
+    running = peak = closed = 0
+
+    def __init__(self, username, password, ip=None):
+        if username == "crash":
+            raise RuntimeError("portal unreachable")
+        self.username, self.password = username, password
+        self.last_error = ""
+
+    def login(self):
+        cls = FakeClient
+        with cls.lock:
+            cls.running += 1
+            cls.peak = max(cls.peak, cls.running)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.running -= 1
+        if self.password != "right":
+            self.last_error = "E2531: password error"
+            return False
+        return True
+
+    def close(self):
+        with FakeClient.lock:
+            FakeClient.closed += 1
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    FakeClient.running = FakeClient.peak = FakeClient.closed = 0
+    monkeypatch.setattr(batch, "SZUNetworkClient", FakeClient)
+    return FakeClient
+
+
+def test_verify_accounts_caps_concurrency_and_keeps_input_order(fake_client):
+    accounts = [Account(f"user{i}", "right") for i in range(12)]
+    seen = []
+    results = verify_accounts(accounts, max_workers=3, on_result=seen.append)
+    assert [r.username for r in results] == [a.username for a in accounts] == [r.username for r in seen]
+    assert all(r.success for r in results)
+    assert 1 < fake_client.peak <= 3
+    assert fake_client.closed == 12  # Every per-account client releases its connections
+
+
+def test_verify_accounts_reports_errors_per_account(fake_client):
+    results = verify_accounts([("good", "right"), ("bad", "wrong"), ("crash", "right")], max_workers=2)
+    assert [(r.username, r.success, r.error) for r in results] == [
+        ("good", True, ""), ("bad", False, "E2531: password error"), ("crash", False, "portal unreachable")]
+    assert fake_client.closed == 2  # The client that failed to build has nothing to close
+
+
+def test_write_report(tmp_path):
+    path = tmp_path / "out" / "report.csv"
+    write_report([VerificationResult("alice", True, 12.345), VerificationResult("bob", False, 3.0, "E2531")], path)
+    with open(path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["username", "success", "latency_ms", "error"],
+                                       ["alice", "1", "12.3", ""], ["bob", "0", "3.0", "E2531"]]
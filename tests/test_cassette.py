@@ -0,0 +1,63 @@
+import pytest
+
+from app.cassette import CassetteRecorder, CassetteResponse, ReplayTransport, load_cassette
+from app.config import settings
+from app.transport import TransportError
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    rec = CassetteRecorder(tmp_path / "campus.jsonl.gz")
+    yield rec
+    rec.close()
+
+
+def reply(body: bytes, status=200):
+    return CassetteResponse("http://portal/cgi-bin/rad_user_info", status, "OK",
+                            {"content-type": "text/javascript", "set-cookie": "x"}, body)
+
+
+def test_credentials_and_personal_reply_fields_are_redacted(recorder):
+    body = (b'jQuery1({"access_token":"abc123token","real_name":"\\u5f20\\u4e09","client_ip":"10.1.2.3",'
+            b'"online_ip":"10.1.2.3","user_name":"' + settings.SRUN_USERNAME.encode() + b'","res":"ok","sum_bytes":42})')
+    recorder.record(1.0, 0.02, "GET", "http://portal/cgi-bin/srun_portal",
+                    {"action": "login", "username": settings.SRUN_USERNAME, "password": "{MD5}x", "ip": "10.1.2.3"},
+                    response=reply(body))
+    recorder.close()
+
+    header, entries = load_cassette(recorder.path)
+    assert header["zone"] == settings.NETWORK_ZONE
+    (entry,) = entries
+    assert entry["params"] == {"action": "login", "username": "<redacted>", "password": "<redacted>", "ip": "<redacted>"}
+    for leaked in ("abc123token", "\\u5f20", "10.1.2.3", settings.SRUN_USERNAME, "set-cookie"):
+        assert leaked not in str(entry)
+    assert '"res":"ok"' in entry["body"] and '"sum_bytes":42' in entry["body"]
+    assert '"real_name":"<redacted>"' in entry["body"]
+
+
+def test_dorm_account_and_ip_are_redacted(recorder):
+    recorder.record(1.0, 0.01, "GET", "http://dorm/eportal/portal/login",
+                    {"user_account": ",0,20201234", "user_password": "pw", "wlan_user_ip": "172.30.1.9"},
+                    response=reply(b'dr1003({"result":1,"msg":"20201234 ok","v46ip":"172.30.1.9"})'))
+    recorder.close()
+    (entry,) = load_cassette(recorder.path)[1]
+    assert "20201234" not in entry["body"] and "172.30.1.9" not in entry["body"]
+
+
+def test_replay_serves_recorded_exchanges_in_order(recorder):
+    recorder.record(1.0, 0.0, "HEAD", "http://probe/generate_204", None, response=reply(b"", status=204))
+    recorder.record(2.0, 0.0, "GET", "http://portal/cgi-bin/srun_portal", {"action": "logout"},
+                    response=reply(b'cb({"error":"ok"})'))
+    recorder.record(3.0, 0.0, "GET", "http://portal/cgi-bin/srun_portal", {"action": "login"},
+                    error=OSError("timed out"))
+    recorder.close()
+
+    transport = ReplayTransport(load_cassette(recorder.path)[1])
+    assert transport.head("http://elsewhere/generate_204").status_code == 204
+    with pytest.raises(TransportError):
+        transport.get("http://portal/cgi-bin/srun_portal", params={"action": "login"})
+    assert transport.get("http://portal/cgi-bin/srun_portal", params={"action": "logout"}).content == b'cb({"error":"ok"})'
+    assert transport.finished.is_set()
+    with pytest.raises(TransportError):
+        transport.head("http://probe/generate_204")
+    assert transport.missing == 1
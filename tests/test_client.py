@@ -0,0 +1,31 @@
+from loguru import logger
+
+from app.client import SZUNetworkClient
+
+
+def test_online_tick_emits_heartbeat_and_publishes_state():
+    lines = []
+    sink = logger.add(lambda msg: lines.append(msg.record["message"]), level="INFO")
+    try:
+        client = SZUNetworkClient()
+        client.probe = lambda: True
+        client._check_and_login()
+    finally:
+        logger.remove(sink)
+    assert "SYS_HEARTBEAT_SIGNAL" in lines
+    assert client.state.state.online is True and client.state.state.last_probe > 0
+
+
+def test_offline_tick_logs_in_without_heartbeat():
+    lines = []
+    sink = logger.add(lambda msg: lines.append(msg.record["message"]), level="INFO")
+    try:
+        client = SZUNetworkClient()
+        client.probe = lambda: False
+        logins = []
+        client.login = lambda: logins.append(1) or True
+        client._check_and_login()
+    finally:
+        logger.remove(sink)
+    assert logins == [1]
+    assert "SYS_HEARTBEAT_SIGNAL" not in lines
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app import config_watch
+from app.config import Settings, settings
+from app.config_watch import ConfigReloader, ConfigWatcher
+
+
+class FakeClient:
+    def __init__(self):
+        self.before_check = []
+        self.wakeable = False
+        self.wake = threading.Event()
+        self.resets = 0
+        self.uses_settings_credentials = True
+
+    def request_check(self):
+        self.wake.set()
+
+    def reset_session(self):
+        self.resets += 1
+
+    def tick(self):
+        for hook in self.before_check:
+            hook()
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    """A temporary .env and a reloader baseline taken from it; touched settings are restored afterwards."""
+    for key in ("CHECK_INTERVAL", "USER_AGENT", "DAEMON_PORT"):
+        monkeypatch.setattr(settings, key, getattr(settings, key))
+    monkeypatch.setattr(config_watch, "_inotify", lambda: None)  # Exercise the portable polling backend
+    path = tmp_path / ".env"
+    path.write_text("CHECK_INTERVAL=30\n", encoding="utf-8")
+    return path
+
+
+def make_reloader(path):
+    client = FakeClient()
+    reloader = ConfigReloader(client, path)
+    reloader.watcher.poll_interval = 0.05
+    reloader._applied = Settings(_env_file=str(path)).model_dump()
+    return client, reloader
+
+
+def rewrite(path, text):
+    before = path.stat().st_mtime_ns
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(before + 10**9, before + 10**9))  # Coarse mtime filesystems
+
+
+def test_changes_are_staged_and_applied_at_the_loop_boundary(env_file):
+    client, reloader = make_reloader(env_file)
+    reloader._stage(Settings(_env_file=str(env_file)))
+    assert not client.wake.is_set()  # Nothing changed, nothing staged
+
+    rewrite(env_file, "CHECK_INTERVAL=45\n")
+    reloader._stage(Settings(_env_file=str(env_file)))
+    assert reloader._pending == {"CHECK_INTERVAL": 45}
+    assert client.wake.is_set() and settings.CHECK_INTERVAL != 45  # Woken, not applied yet
+
+    reloader.start()
+    try:
+        client.tick()
+    finally:
+        reloader.stop()
+    assert settings.CHECK_INTERVAL == 45 and reloader._pending == {}
+    assert client.wakeable
+
+
+def test_polling_watcher_picks_up_an_edit(env_file):
+    client, reloader = make_reloader(env_file)
+    assert reloader.watcher.backend == "polling"
+    reloader.start()
+    try:
+        time.sleep(0.2)  # Let the watcher take its baseline mtime first
+        rewrite(env_file, "CHECK_INTERVAL=30\nUSER_AGENT=test-agent/1.0\n")
+        assert client.wake.wait(5)
+        client.tick()
+    finally:
+        reloader.stop()
+    assert settings.USER_AGENT == "test-agent/1.0"
+    assert client.resets == 1  # Session-affecting field: fresh HTTP session
+
+
+def test_restart_only_keys_are_not_applied(env_file):
+    client, reloader = make_reloader(env_file)
+    port = settings.DAEMON_PORT
+    rewrite(env_file, f"CHECK_INTERVAL=20\nDAEMON_PORT={port + 1}\n")
+    reloader._stage(Settings(_env_file=str(env_file)))
+    reloader.apply_pending()
+    assert settings.DAEMON_PORT == port
+    assert settings.CHECK_INTERVAL == 20  # The live key in the same edit still applies
+
+
+def test_invalid_file_is_ignored(env_file):
+    seen = []
+    rewrite(env_file, "CHECK_INTERVAL=0\n")
+    ConfigWatcher(env_file, seen.append)._load()
+    assert seen == []
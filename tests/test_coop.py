@@ -0,0 +1,144 @@
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+from app.coop import CoopGroup, CooperativeProbe, elect
+
+
+def make_group(node="a", secret="s3cret"):
+    group = CoopGroup(node, "teaching", secret)
+    group.sent_messages = []
+    group.send = lambda kind, **fields: group.sent_messages.append(kind)
+    return group
+
+
+def signed(secret: bytes, msg: dict) -> bytes:
+    body = json.dumps(msg).encode()
+    return body + b"\n" + hmac.new(secret, body, hashlib.sha256).hexdigest().encode()
+
+
+def test_group_refuses_to_run_without_a_secret():
+    with pytest.raises(ValueError):
+        CoopGroup("a", "teaching", "")
+
+
+def test_unsigned_and_forged_datagrams_are_dropped():
+    group = CoopGroup("a", "teaching", "s3cret")
+    msg = {"v": 1, "type": "probe", "node": "b", "zone": "teaching", "ts": time.time(), "online": True}
+    assert group._decode(json.dumps(msg).encode()) is None
+    assert group._decode(signed(b"guess", msg)) is None
+    assert group._decode(signed(b"s3cret", dict(msg, zone="dorm"))) is None
+    assert group._decode(signed(b"s3cret", msg)) == msg
+
+
+def find_round_for(prober, rounds=2):
+    """A wall-clock time whose round and the `rounds - 1` before it all elect `prober` (interval 10)."""
+    return next(r * 10 + 5.0 for r in range(rounds, 1000)
+                if all(elect(r - i, ["a", "b"]) == prober for i in range(rounds)))
+
+
+def test_datagrams_outside_the_time_window_or_replayed_are_dropped():
+    group = CoopGroup("a", "teaching", "s3cret", max_skew=5)
+    now = time.time()
+    msg = {"v": 1, "type": "probe", "node": "b", "zone": "teaching", "online": True}
+    assert group._decode(signed(b"s3cret", dict(msg, ts=now - 60))) is None
+    assert group._decode(signed(b"s3cret", dict(msg, ts=now + 60))) is None
+    fresh = signed(b"s3cret", dict(msg, ts=now))
+    assert group._decode(fresh) is not None
+    assert group._decode(fresh) is None  # Same datagram captured and sent again
+
+
+def test_fresh_online_result_from_the_elected_peer_replaces_the_local_probe():
+    now = find_round_for("b")
+    group = make_group("a")
+    group.peers["b"] = {"seen": 1e12}
+    calls = []
+    coop = CooperativeProbe(lambda: calls.append(1) or True, group, interval=10, clock=lambda: now)
+    assert coop() is True  # First call always probes locally
+    group.last_probe = {"type": "probe", "node": "b", "ts": now - 3, "online": True}
+    assert coop() is True
+    assert (coop.local_probes, coop.shared_hits) == (1, 1)
+
+
+def test_stale_foreign_or_offline_results_fall_back_to_a_local_probe():
+    now = find_round_for("b")
+    group = make_group("a")
+    group.peers["b"] = {"seen": 1e12}
+    coop = CooperativeProbe(lambda: True, group, interval=10, clock=lambda: now)
+    coop()
+    for shared in ({"node": "b", "ts": now - 25, "online": True},    # Too old
+                   {"node": "c", "ts": now, "online": True},         # Not the elected prober
+                   {"node": "b", "ts": now, "online": False}):       # Peer sees an outage: verify ourselves
+        group.last_probe = dict(shared, type="probe")
+        coop()
+    assert (coop.local_probes, coop.shared_hits) == (4, 0)
+
+
+def test_disagreement_with_our_own_last_result_probes_locally():
+    now = find_round_for("b")
+    group = make_group("a")
+    group.peers["b"] = {"seen": 1e12}
+    results = iter([False, True])
+    coop = CooperativeProbe(lambda: next(results), group, interval=10, clock=lambda: now)
+    assert coop() is False  # Our own session expired
+    group.last_probe = {"type": "probe", "node": "b", "ts": now, "online": True}
+    assert coop() is True   # The peer's "online" is verified locally, not trusted
+    assert coop.local_probes == 2
+
+
+def test_self_check_rounds_bound_the_time_without_a_local_probe():
+    clock = [find_round_for("b", rounds=3) - 10]
+    group = make_group("a")
+    group.peers["b"] = {"seen": 1e12}
+    coop = CooperativeProbe(lambda: True, group, interval=10, self_check_rounds=1, clock=lambda: clock[0])
+    coop()
+    clock[0] += 4
+    group.last_probe = {"type": "probe", "node": "b", "ts": clock[0], "online": True}
+    coop()  # Shared
+    clock[0] += 7
+    group.last_probe = {"type": "probe", "node": "b", "ts": clock[0], "online": True}
+    coop()  # Over one round since our own probe
+    assert (coop.local_probes, coop.shared_hits) == (2, 1)
+
+
+def test_peer_recheck_forces_a_local_probe():
+    now = find_round_for("b")
+    group = make_group("a")
+    group.peers["b"] = {"seen": 1e12}
+    coop = CooperativeProbe(lambda: True, group, interval=10, clock=lambda: now)
+    coop()
+    group.last_probe = {"type": "probe", "node": "b", "ts": now, "online": True}
+    group._handle({"type": "recheck", "node": "b", "ts": time.time()})
+    coop()
+    assert coop.local_probes == 2
+
+
+def test_failure_pushes_one_recheck_per_outage():
+    group = make_group()
+    results = iter([True, False, False, True, False])
+    coop = CooperativeProbe(lambda: next(results), group, interval=10, clock=lambda: 0.0)
+    for _ in range(3):
+        coop()
+    assert group.sent_messages.count("recheck") == 1
+    group.last_recheck = 0.0  # Holdoff over
+    coop(), coop()
+    assert group.sent_messages.count("recheck") == 2
+
+
+def test_recheck_is_suppressed_when_a_peer_just_sent_one():
+    group = make_group()
+    group._handle({"type": "recheck", "node": "b", "ts": time.time()})
+    group.recheck()
+    assert "recheck" not in group.sent_messages
+
+
+def test_only_the_elected_node_gossips_its_result():
+    group = make_group("a")
+    group.peers["b"] = {"seen": 1e12}
+    coop = CooperativeProbe(lambda: True, group, interval=10, clock=lambda: 5.0)
+    coop()
+    expected = "probe" if elect(0, ["a", "b"]) == "a" else "hello"
+    assert group.sent_messages == [expected]
@@ -0,0 +1,99 @@
+import json
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.daemon import DaemonControl, NetworkDaemon, _control_address, attach
+
+
+class FakeClient:
+    """Just enough of SZUNetworkClient for NetworkDaemon.run()."""
+    def __init__(self):
+        self.username = "u"
+        self.on_probe, self.on_login, self.before_check = [], [], []
+        self.login_failures = 0
+        self.last_error = ""
+        self.paused = threading.Event()
+
+    def keep_alive(self, stop_event=None):
+        stop_event.wait()
+
+
+@pytest.fixture
+def daemon_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROJECT_ROOT", tmp_path)
+    for name in ("HISTORY_ENABLED", "MEMORY_WATCHDOG", "COOP_ENABLED", "SESSION_RENEWAL",
+                 "SNAPSHOT_ENABLED", "CONFIG_WATCH"):
+        monkeypatch.setattr(settings, name, False)
+    return tmp_path
+
+
+def _start(daemon):
+    stop = threading.Event()
+    assert daemon.acquire()
+    thread = threading.Thread(target=daemon.run, args=(stop,), daemon=True)
+    thread.start()
+    for _ in range(100):
+        if settings.DAEMON_TOKEN_PATH.exists() and daemon._server is not None:
+            break
+        time.sleep(0.02)
+    return stop, thread
+
+
+def test_requests_need_the_token(daemon_env):
+    stop, thread = _start(NetworkDaemon(FakeClient()))
+    try:
+        assert stat.S_IMODE(settings.DAEMON_TOKEN_PATH.stat().st_mode) == 0o600
+        control = attach()
+        assert control.request("status")["ok"]
+        control.close()
+
+        family, address = _control_address()
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2)
+            sock.connect(address)
+            sock.sendall(b'{"cmd": "pause", "token": "guess"}\n')
+            reply = json.loads(sock.makefile("r").readline())
+        assert reply == {"ok": False, "error": "unauthorized"}
+    finally:
+        stop.set()
+        thread.join(5)
+    assert not settings.DAEMON_TOKEN_PATH.exists()
+
+
+def test_failed_bind_releases_the_lock(daemon_env, monkeypatch):
+    daemon = NetworkDaemon(FakeClient())
+    assert daemon.acquire()
+    monkeypatch.setattr(daemon, "_open_server", lambda: (_ for _ in ()).throw(OSError("address in use")))
+    with pytest.raises(OSError):
+        daemon.run(threading.Event())
+    other = NetworkDaemon(FakeClient())
+    assert other.acquire()
+    other.lock.release()
+
+
+def test_request_times_out_on_a_silent_daemon():
+    left, right = socket.socketpair()
+    try:
+        control = DaemonControl(left, timeout=0.2)
+        with pytest.raises(OSError):
+            control.request("status")
+    finally:
+        right.close()
+        left.close()
+
+
+def test_series_command_is_advertised_and_served(daemon_env):
+    from app.daemon import COMMANDS
+
+    assert "series" in COMMANDS
+    daemon = NetworkDaemon(FakeClient())
+    daemon.series.on_probe(True, 8.0)
+    reply = daemon._handle({"cmd": "series", "resolution": "second", "points": 5}, None)
+    assert reply["ok"] and reply["series"]["probe_ms"]["mean"][-1] == 8.0
+    assert not daemon._handle({"cmd": "series", "resolution": "week"}, None)["ok"]
+    assert "series" in daemon._handle({"cmd": "nope"}, None)["error"]
@@ -0,0 +1,107 @@
+import socket
+
+import pytest
+
+from app import dns_cache
+from app.dns_cache import ResolverCache
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake upstream DNS: host -> addresses (or an exception); numeric hosts use the real resolver."""
+    answers = {}
+    calls = []
+    real = dns_cache.system_getaddrinfo  # socket.getaddrinfo may already be the installed cache
+
+    def fake(host, port, family=0, type=0, proto=0, flags=0):
+        if flags & socket.AI_NUMERICHOST:
+            return real(host, port, family, type, proto, flags)
+        calls.append(host)
+        answer = answers[host]
+        if isinstance(answer, Exception):
+            raise answer
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (a, 0)) for a in answer]
+    monkeypatch.setattr(dns_cache, "system_getaddrinfo", fake)
+    fake.real = real
+    fake.answers = answers
+    fake.calls = calls
+    return fake
+
+
+def test_positive_answers_are_cached(upstream):
+    upstream.answers["portal.example"] = ["1.2.3.4"]
+    cache = ResolverCache()
+    cache.manage(["portal.example"])
+    assert cache.resolve("portal.example") == ["1.2.3.4"]
+    assert cache.resolve("PORTAL.example") == ["1.2.3.4"]
+    assert upstream.calls == ["portal.example"]
+
+
+def test_pins_never_touch_upstream(upstream):
+    cache = ResolverCache(pins={"Portal.Example": ["10.0.0.5"]})
+    assert cache.resolve("portal.example") == ["10.0.0.5"]
+    assert upstream.calls == []
+
+
+def test_failures_are_negative_cached(upstream):
+    upstream.answers["portal.example"] = socket.gaierror("down")
+    cache = ResolverCache()
+    cache.manage(["portal.example"])
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.resolve("portal.example")
+    assert upstream.calls == ["portal.example"]
+
+
+def test_fake_ip_answers_for_public_hosts_resolve_and_cache(upstream):
+    upstream.answers["probe.example"] = ["198.18.0.42"]  # Clash fake-IP mode
+    cache = ResolverCache()
+    cache.manage(["probe.example"], public=True)
+    assert cache.resolve("probe.example") == ["198.18.0.42"]
+    assert cache.resolve("probe.example") == ["198.18.0.42"]
+    assert upstream.calls == ["probe.example"]
+
+
+def test_private_answers_for_public_hosts_pass_through_uncached(upstream):
+    upstream.answers["probe.example"] = ["10.1.1.1"]  # Captive DNS pointing at the portal
+    cache = ResolverCache()
+    cache.manage(["probe.example"], public=True)
+    assert cache.resolve("probe.example") == ["10.1.1.1"]
+    upstream.answers["probe.example"] = ["93.184.216.34"]  # Logged in: the real answer
+    assert cache.resolve("probe.example") == ["93.184.216.34"]
+    assert upstream.calls == ["probe.example", "probe.example"]
+
+
+def test_getaddrinfo_honours_type_proto_and_flags(upstream):
+    upstream.answers["portal.example"] = ["127.0.0.1"]
+    cache = ResolverCache()
+    cache.manage(["portal.example"])
+
+    udp = cache.getaddrinfo("portal.example", 53, socket.AF_INET, socket.SOCK_DGRAM)
+    assert {(info[1], info[2]) for info in udp} == {(socket.SOCK_DGRAM, socket.IPPROTO_UDP)}
+    assert udp[0][4] == ("127.0.0.1", 53)
+
+    assert cache.getaddrinfo("portal.example", 80, 0, 0) == upstream.real("127.0.0.1", 80, 0, 0)
+
+    named = cache.getaddrinfo("portal.example", 80, 0, socket.SOCK_STREAM, 0, socket.AI_CANONNAME)
+    assert named[0][3] == "portal.example"
+
+    with pytest.raises(socket.gaierror):
+        cache.getaddrinfo("portal.example", 80, socket.AF_INET6)
+    assert upstream.calls == ["portal.example"]
+
+
+def test_unmanaged_hosts_go_straight_upstream(upstream):
+    upstream.answers["other.example"] = ["5.6.7.8"]
+    cache = ResolverCache()
+    assert cache.getaddrinfo("other.example", 80)[0][4][0] == "5.6.7.8"
+    assert cache.export() == {}
+
+
+def test_seeded_answers_are_served_while_refreshing(upstream):
+    upstream.answers["portal.example"] = socket.gaierror("down")
+    cache = ResolverCache()
+    cache.manage(["portal.example"])
+    cache.seed({"portal.example": ["1.2.3.4"], "unmanaged.example": ["9.9.9.9"]})
+    assert cache.resolve("portal.example") == ["1.2.3.4"]
+    assert cache.export() == {"portal.example": ["1.2.3.4"]}
@@ -0,0 +1,80 @@
+import os
+import threading
+from multiprocessing import shared_memory
+
+import pytest
+
+from app.fleet import _SEQ, StatusTable
+
+
+@pytest.fixture
+def table():
+    t = StatusTable.create(f"szu_net_test_{os.getpid()}", ["alice", "bob"])
+    yield t
+    t.close()
+
+
+def test_create_attach_update(table):
+    reader = StatusTable.attach(table.shm.name)
+    try:
+        table.update(1, online=True, latency_ms=12.5, failures=3)
+        table.update(1, last_login=42.0)
+        alice, bob = reader.read_all()
+        assert alice.username == "alice" and not alice.online
+        assert (bob.username, bob.online, bob.failures, bob.latency_ms, bob.last_login) == ("bob", True, 3, 12.5, 42.0)
+    finally:
+        reader.close()
+    assert table.read(1).online  # A reader closing never unlinks the segment
+
+
+def test_reader_never_sees_a_torn_record(table):
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i = i % 100000 + 1  # Stays exact in the float32 latency field
+            table.update(0, online=bool(i % 2), failures=i, latency_ms=float(i), last_probe=float(i), last_login=float(i))
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(20000):
+            st = table.read(0)
+            assert st.failures == st.latency_ms == st.last_probe == st.last_login
+            assert st.online == bool(st.failures % 2)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_attach_rejects_foreign_or_missing_segments():
+    with pytest.raises(FileNotFoundError):
+        StatusTable.attach(f"szu_net_missing_{os.getpid()}")
+    other = shared_memory.SharedMemory(name=f"szu_net_other_{os.getpid()}", create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            StatusTable(other, owner=False)
+    finally:
+        other.close()
+        other.unlink()
+
+
+def test_second_create_fails_while_the_owner_is_alive(table):
+    with pytest.raises(FileExistsError):
+        StatusTable.create(table.shm.name, ["mallory"])
+    assert table.read(0).username == "alice"  # The live table was not unlinked
+
+
+def test_writer_dying_mid_update_does_not_hang_readers(table):
+    table.update(0, failures=7)
+    assert table.read(0).failures == 7
+    _SEQ.pack_into(table.shm.buf, table._offset(0), 5)  # Odd seq left behind by a killed writer
+    assert table.read(0, timeout=0.01).failures == 7  # Last consistent read, not a spin
+    reader = StatusTable.attach(table.shm.name)
+    try:
+        assert reader.read(0, timeout=0.01) is None   # Never read this slot before
+        assert [st.username for st in reader.read_all()] == ["bob"]
+        table.update(0, failures=8)  # The restarted writer realigns seq to even
+        assert reader.read(0).failures == 8
+    finally:
+        reader.close()
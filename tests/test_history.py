@@ -0,0 +1,64 @@
+import pytest
+
+from app.history import HistoryStore, percentile, query_stats
+
+
+@pytest.fixture
+def db(tmp_path):
+    return tmp_path / "history.db"
+
+
+def seed(path, probes=(), logins=()):
+    store = HistoryStore(path)
+    for ts, account, online in probes:
+        store.record_probe(account, online, 5.0, ts=ts)
+    for ts, account, success, latency_ms in logins:
+        store.record_login(account, "teaching", success, latency_ms, "" if success else "E2531", ts=ts)
+    store.close()
+
+
+def test_empty_history_yields_no_rows(db):
+    seed(db)
+    assert query_stats(db, since=0, until=1e10) == []
+
+
+def test_mttr_and_outage_percentiles(db):
+    # Outages of 10 s, 20 s and 60 s, then one still open at the end of the window
+    seed(db, probes=[(100, "alice", True), (200, "alice", False), (210, "alice", True),
+                     (300, "alice", False), (320, "alice", True), (400, "alice", False),
+                     (401, "alice", False), (460, "alice", True), (500, "alice", False)])
+    [stats] = query_stats(db, since=0, until=1000)
+    assert stats.outages == 3  # The open one is not counted
+    assert stats.mttr_ms == pytest.approx(30000)
+    assert (stats.outage_p50_ms, stats.outage_p90_ms) == (20000, 60000)
+
+
+def test_open_outage_only(db):
+    seed(db, probes=[(100, "alice", True), (200, "alice", False)])
+    [stats] = query_stats(db, since=0, until=1000)
+    assert (stats.outages, stats.mttr_ms, stats.outage_p50_ms) == (0, 0.0, 0.0)
+
+
+def test_login_failure_rate_and_nearest_rank_percentiles(db):
+    latencies = [float(ms) for ms in range(10, 110, 10)]  # 10 .. 100 ms
+    seed(db, logins=[(100 + i, "bob", i % 4 != 0, ms) for i, ms in enumerate(latencies)])
+    [stats] = query_stats(db, since=0, until=1000)
+    assert stats.logins == 10
+    assert 1 - stats.login_success_rate == pytest.approx(0.3)  # Attempts 0, 4 and 8 failed
+    assert (stats.login_p50_ms, stats.login_p90_ms, stats.login_p99_ms) == (50.0, 90.0, 100.0)
+
+
+def test_window_and_account_filters(db):
+    seed(db, probes=[(100, "alice", False), (110, "alice", True), (5000, "alice", False), (5010, "alice", True)],
+         logins=[(105, "alice", True, 20.0), (105, "bob", False, 30.0)])
+    [alice] = query_stats(db, since=0, until=1000, account="alice")
+    assert (alice.account, alice.outages, alice.logins) == ("alice", 1, 1)
+    assert [s.account for s in query_stats(db, since=0, until=1000)] == ["alice", "bob"]
+    assert query_stats(db, since=0, until=1000, account="bob")[0].login_success_rate == 0.0
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 50) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 51) == 3.0
+    assert percentile([7.0], 99) == 7.0
@@ -0,0 +1,27 @@
+from app.memwatch import MemoryWatchdog, client_reset_hook
+
+
+class FakeClient:
+    def __init__(self):
+        self.before_check = []
+        self.resets = 0
+
+    def reset_session(self):
+        self.resets += 1
+
+    def tick(self):
+        for hook in self.before_check:
+            hook()
+
+
+def test_soft_reset_is_staged_for_the_loop_thread():
+    client = FakeClient()
+    watchdog = MemoryWatchdog(budget_mb=1)
+    watchdog.add_reset_hook(client_reset_hook(client))
+    watchdog.soft_reset()
+    watchdog.soft_reset()
+    assert client.resets == 0  # Nothing torn down under a running probe
+    client.tick()
+    assert client.resets == 1  # Runs once at the loop boundary
+    client.tick()
+    assert client.resets == 1
@@ -0,0 +1,29 @@
+from app.config import settings
+from app.payload import build_chksum, build_info_str, build_payload
+from encryption.srun_md5 import get_md5
+from encryption.srun_sha1 import get_sha1
+
+
+def _encode(s):
+    return s.encode("latin-1").hex()
+
+
+def test_info_str_is_compact_json():
+    info = build_info_str("u", "p", "10.0.0.1", "12", "srun_bx1")
+    assert info == '{"username":"u","password":"p","ip":"10.0.0.1","acid":"12","enc_ver":"srun_bx1"}'
+
+
+def test_payload_matches_portal_checksum():
+    encoded_info, hmd5, chksum = build_payload("u", "p", "10.0.0.1", "tok", encode=_encode)
+    assert encoded_info.startswith("{SRBX1}")
+    assert hmd5 == get_md5("p", "tok")
+    expected = build_chksum("tok", "u", hmd5, settings.SRUN_AC_ID, "10.0.0.1",
+                            settings.SRUN_N, settings.SRUN_TYPE, encoded_info)
+    assert chksum == get_sha1(expected)
+
+
+def test_payload_depends_on_challenge_and_password():
+    first = build_payload("u", "p", "10.0.0.1", "tok", encode=_encode)
+    assert build_payload("u", "p", "10.0.0.1", "tok", encode=_encode) == first
+    assert build_payload("u", "p", "10.0.0.1", "other", encode=_encode) != first
+    assert build_payload("u", "q", "10.0.0.1", "tok", encode=_encode)[1] != first[1]
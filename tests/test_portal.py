@@ -0,0 +1,64 @@
+import pytest
+
+from app.portal import parse_portal_body, read_portal_response
+
+
+class StreamedResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.chunks_read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=512):
+        for i in range(0, len(self.body), chunk_size):
+            self.chunks_read += 1
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+def test_srun_login_ok():
+    result = parse_portal_body(b'jQuery1124_1({"error":"ok","res":"ok","suc_msg":"login_ok","online_ip":"10.0.0.2"});')
+    assert result.success and not result.already_online
+    assert result.server_ip == "10.0.0.2"
+
+
+def test_srun_login_error_code():
+    result = parse_portal_body(b'cb({"error":"login_error","error_msg":"E2901: (Third party 1)bind_user2: ldap_bind error"})')
+    assert not result.success
+    assert result.error_code == "login_error"
+    assert result.message.startswith("E2901")
+
+
+def test_srun_already_online():
+    result = parse_portal_body(b'cb({"error":"ok","res":"ok","suc_msg":"ip_already_online_error"})')
+    assert result.success and result.already_online
+
+
+@pytest.mark.parametrize("body, success, already", [
+    ('dr1003({"result":1,"msg":"认证成功"})'.encode("gbk"), True, False),
+    ('dr1003({"result":0,"msg":"","ret_code":2})'.encode(), True, True),
+    ('dr1003({"result":0,"msg":"密码错误","ret_code":1})'.encode("gbk"), False, False),
+])
+def test_drcom_replies(body, success, already):
+    result = parse_portal_body(body)
+    assert (result.success, result.already_online) == (success, already)
+
+
+def test_truncated_body_falls_back_to_field_scanning():
+    result = parse_portal_body(b'cb({"challenge":"abc123","client_ip":"10.0.0.2","ecode":0,"err')
+    assert result.challenge == "abc123"
+
+
+def test_garbage_is_a_failure_not_an_exception():
+    result = parse_portal_body(b"<html>portal</html>")
+    assert not result.success and result.data == {}
+
+
+def test_streaming_stops_once_wanted_fields_arrived():
+    body = b'cb({"challenge":"abc123",' + b'"padding":"' + b"x" * 4096 + b'"})'
+    resp = StreamedResponse(body)
+    result = read_portal_response(resp, fields=("challenge",), chunk_size=64)
+    assert result.challenge == "abc123"
+    assert resp.chunks_read == 1 and resp.closed
@@ -0,0 +1,182 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from app import utils
+from app.utils import ProbeLadder, RawHttpProbe, getaddrinfo_within, parse_status_code
+
+
+class CannedServer:
+    """Answers every request on a connection with the same raw bytes."""
+    def __init__(self, reply: bytes):
+        self.reply = reply
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.accepted = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(4096)
+                except OSError:
+                    return
+                if not data:
+                    return
+                conn.sendall(self.reply)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # Wakes the blocked accept() so the port really closes
+        except OSError:
+            pass
+        self.sock.close()
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def make(reply):
+        servers.append(CannedServer(reply))
+        return servers[-1]
+    yield make
+    for s in servers:
+        s.close()
+
+
+def test_parse_status_code():
+    assert parse_status_code(b"HTTP/1.1 204 No Content") == 204
+    assert parse_status_code(b"HTTP/1.1 OK") == 0
+    assert parse_status_code(b"HTTP/1.1 2x4 Odd") == 0
+    assert parse_status_code(b"garbage") == 0
+
+
+def test_raw_probe_online_and_captive(server):
+    ok = server(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+    probe = RawHttpProbe(f"http://127.0.0.1:{ok.port}/generate_204", timeout=1)
+    assert probe() is True
+    assert probe() is True  # Reused connection
+
+    broken = server(b"HTTP/1.1 OK\r\n\r\n")
+    assert RawHttpProbe(f"http://127.0.0.1:{broken.port}/generate_204", timeout=1)() is False
+
+
+def test_slow_resolver_is_bounded_by_the_deadline(server, monkeypatch):
+    ok = server(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+    real = socket.getaddrinfo
+
+    def slow(*args, **kwargs):
+        time.sleep(2)
+        return real(*args, **kwargs)
+    monkeypatch.setattr(socket, "getaddrinfo", slow)
+    probe = RawHttpProbe(f"http://localhost:{ok.port}/generate_204", timeout=0.3)
+    start = time.monotonic()
+    assert probe() is False
+    assert time.monotonic() - start < 1
+
+
+def test_last_address_is_reused_when_dns_stalls(server, monkeypatch):
+    ok = server(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+    probe = RawHttpProbe(f"http://localhost:{ok.port}/generate_204", timeout=0.5)
+    assert probe() is True
+    probe.close()
+
+    def dead(*args, **kwargs):
+        raise socket.gaierror("resolver down")
+    monkeypatch.setattr(socket, "getaddrinfo", dead)
+    assert probe() is True
+
+
+def test_getaddrinfo_within_does_not_queue_behind_stuck_lookups():
+    def stuck(*args):
+        time.sleep(5)
+
+    for _ in range(3):
+        with pytest.raises(socket.timeout):
+            getaddrinfo_within(0.05, "example.invalid", 80, resolver=stuck)
+    infos = getaddrinfo_within(0.5, "127.0.0.1", 80, resolver=utils.system_getaddrinfo)
+    assert infos[0][4][0] == "127.0.0.1"
+
+
+def ladder_for(port, **kwargs):
+    return ProbeLadder(f"http://127.0.0.1:{port}/generate_204", link_target=("127.0.0.1", 80),
+                       allow_private=True, **kwargs)
+
+
+def test_ladder_reuses_the_tcp_stage_connection_and_skips_stages_when_warm(server, monkeypatch):
+    ok = server(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+    lookups = []
+    real = utils.system_getaddrinfo
+    monkeypatch.setattr(utils, "system_getaddrinfo", lambda *a: lookups.append(a) or real(*a))
+    ladder = ladder_for(ok.port)
+
+    assert ladder() is True
+    assert set(ladder.last_result.latencies) == {"link", "dns", "tcp", "http"}
+    assert ok.accepted == 1  # The HEAD went over the TCP stage's connection
+
+    assert ladder() is True
+    assert set(ladder.last_result.latencies) == {"http"}
+    assert len(lookups) == 1 and ok.accepted == 1
+
+
+def test_ladder_reclassifies_when_the_warm_connection_fails(server):
+    ok = server(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+    ladder = ladder_for(ok.port)
+    assert ladder() is True
+    ok.close()
+    ladder.http_probe.close()
+    ladder.http_probe._sock = socket.socket()  # Dead connection left over from the last tick
+    assert ladder() is False
+    assert ladder.last_result.state == "unreachable"
+    assert set(ladder.last_result.latencies) == {"link", "dns", "tcp"}
+
+
+def test_ladder_dns_timeout_does_not_queue_behind_stuck_lookups(monkeypatch):
+    monkeypatch.setattr(utils, "system_getaddrinfo", lambda *a: time.sleep(5))
+    ladder = ladder_for(9, dns_timeout=0.05)
+    start = time.monotonic()
+    for _ in range(4):
+        assert ladder() is False
+        assert ladder.last_result.state == "dns_failed"
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.parametrize("addresses, hijacked", [
+    (["10.0.0.1"], True),
+    (["192.168.1.1", "172.16.0.1"], True),
+    (["198.18.0.7"], False),        # Clash / sing-box fake-IP range
+    (["198.19.255.1"], False),
+    (["10.0.0.1", "1.1.1.1"], False),
+])
+def test_looks_hijacked_ignores_fake_ip_answers(addresses, hijacked):
+    assert ProbeLadder._looks_hijacked(addresses) is hijacked
+
+
+def test_private_dns_answer_is_only_a_hint(server, monkeypatch):
+    ok = server(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+    ladder = ProbeLadder(f"http://probe.example:{ok.port}/generate_204", link_target=("127.0.0.1", 80))
+    monkeypatch.setattr(ladder, "_link", lambda: True)
+    monkeypatch.setattr(utils, "system_getaddrinfo",
+                        lambda *a: [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", ok.port))])
+    assert ladder() is True  # Split-horizon / proxy answer, but HTTP says we are online
+
+    captive = server(b"HTTP/1.1 302 Found\r\nLocation: http://portal/\r\n\r\n")
+    ladder = ProbeLadder(f"http://probe.example:{captive.port}/generate_204", link_target=("127.0.0.1", 80))
+    monkeypatch.setattr(ladder, "_link", lambda: True)
+    monkeypatch.setattr(utils, "system_getaddrinfo",
+                        lambda *a: [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", captive.port))])
+    assert ladder() is False
+    assert ladder.last_result.state == "dns_hijacked"
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from app.config import settings
+from app.renewal import SessionRenewer
+
+
+class FakePortal:
+    """A client whose portal session ends at `expires`; a renewal starts a new one unless quota-bound."""
+    def __init__(self, now, session=3600, quota_end=None):
+        self.now = now
+        self.session = session
+        self.quota_end = quota_end    # Hard end (daily quota): renewals cannot move it
+        self.expires = now[0] + 1000
+        self.sum_bytes = 0
+        self.paused = threading.Event()
+        self.before_check = []
+        self.last_error = ""
+        self.logouts = self.logins = 0
+
+    def get_session_info(self):
+        return {"remain_seconds": max(0, self.expires - self.now[0]), "sum_bytes": self.sum_bytes}
+
+    def logout(self):
+        self.logouts += 1
+        return True
+
+    def login(self):
+        self.logins += 1
+        end = self.now[0] + self.session
+        self.expires = min(end, self.quota_end) if self.quota_end else end
+        return True
+
+
+@pytest.fixture(autouse=True)
+def teaching_zone(monkeypatch):
+    monkeypatch.setattr(settings, "NETWORK_ZONE", "teaching")
+
+
+def run(renewer, now, seconds, step=10):
+    for _ in range(int(seconds // step)):
+        renewer.tick()
+        now[0] += step
+
+
+def test_renews_in_a_quiet_moment_and_the_new_expiry_is_accepted():
+    now = [100000.0]
+    portal = FakePortal(now)
+    renewer = SessionRenewer(portal, lead=900, info_interval=300, clock=lambda: now[0])
+    run(renewer, now, 1000)
+    assert portal.logins == 1 and renewer.renewals == 1
+    assert renewer._attempts == 0  # Verified: the session really was extended
+
+
+def test_quota_bound_session_does_not_renew_in_a_loop():
+    now = [100000.0]
+    portal = FakePortal(now, quota_end=now[0] + 1000)  # Portal keeps the same end time
+    renewer = SessionRenewer(portal, lead=900, info_interval=300, max_attempts=2, clock=lambda: now[0])
+    run(renewer, now, 1000)
+    assert portal.logins == 2  # Capped per session, not once per tick
+    assert renewer.renewals == 2
+
+
+def test_backs_off_after_a_renewal_that_did_not_extend_the_session():
+    now = [100000.0]
+    portal = FakePortal(now, quota_end=now[0] + 1000)
+    renewer = SessionRenewer(portal, lead=1200, info_interval=300, max_attempts=5, clock=lambda: now[0])
+    renewer.tick()  # First read: no traffic rate yet
+    now[0] += 10
+    renewer.tick()
+    assert portal.logins == 1
+    now[0] += 10
+    renewer.tick()  # Notices the expiry did not move
+    assert renewer._next_query == now[0] + 300
+    now[0] += 10
+    renewer.tick()
+    assert portal.logins == 1
+
+
+def test_waits_for_the_window_and_skips_when_busy():
+    now = [100000.0]
+    portal = FakePortal(now)
+    portal.expires = now[0] + 5000
+    renewer = SessionRenewer(portal, lead=900, quiet_bps=1000, info_interval=300, clock=lambda: now[0])
+    renewer.tick()
+    assert renewer._next_query == now[0] + 300 and portal.logouts == 0
+
+    for _ in range(10):
+        now[0] = max(now[0] + 10, portal.expires - 800)
+        portal.sum_bytes = int(now[0] * 100000)  # 100 kB/s: busy
+        renewer.tick()
+    assert portal.logouts == 0
+
+
+def test_renewal_is_off_by_default():
+    assert type(settings).model_fields["SESSION_RENEWAL"].default is False
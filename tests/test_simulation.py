@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from app.clock import VirtualClock
+from app.simulation import SimEvent, SimulatedNetwork, run_simulation
+
+
+def drive(events, duration, interval=10):
+    """Run the real keep_alive on a VirtualClock; returns (probe times, login times) from the start."""
+    from app.config import settings
+    from app.client import SZUNetworkClient
+    from app.singleflight import new_login_flights
+
+    clock = VirtualClock()
+    network = SimulatedNetwork(clock, request_timeout=5)
+    for event in events:
+        clock.call_at(event.at, lambda event=event: network.apply(event))
+    stop_event = threading.Event()
+    clock.call_at(duration, stop_event.set)
+
+    saved, settings.CHECK_INTERVAL = settings.CHECK_INTERVAL, interval
+    try:
+        client = SZUNetworkClient()
+        client.clock = clock
+        client.login_flights = new_login_flights(clock.perf_counter)
+        client.probe = network.probe
+        client.login_strategies = {zone: (lambda: network.login(client)) for zone in client.login_strategies}
+        probes, logins = [], []
+        client.on_probe.append(lambda online, latency_ms: probes.append((round(clock.time(), 2), online)))
+        client.on_login.append(lambda success, latency_ms, error: logins.append((round(clock.time(), 2), success)))
+        client.keep_alive(stop_event=stop_event)
+    finally:
+        settings.CHECK_INTERVAL = saved
+    network.finish()
+    return probes, logins, network
+
+
+def test_session_expiry_is_fixed_at_the_next_tick():
+    probes, logins, network = drive([SimEvent(25, "session_expire")], duration=50)
+    # Each probe is a 20 ms round trip, the login two more; then CHECK_INTERVAL of sleep
+    assert probes == [(0.02, True), (10.04, True), (20.06, True), (30.08, False), (40.14, True)]
+    assert logins == [(30.12, True)]
+    assert network.downtime == pytest.approx(5.12)
+
+
+def test_link_outage_retries_every_tick_until_the_link_returns():
+    probes, logins, network = drive([SimEvent(5, "link_down"), SimEvent(29, "session_expire"),
+                                     SimEvent(30, "link_up")], duration=60)
+    # A down tick pays the 3 s probe timeout and the 5 s login timeout, then sleeps a full interval
+    assert probes == [(0.02, True), (13.02, False), (31.02, False), (41.08, True), (51.1, True)]
+    assert logins == [(18.02, False), (31.06, True)]
+    assert network.outages == 1
+
+
+def test_run_simulation_matches_the_ground_truth():
+    result = run_simulation([SimEvent(25, "session_expire")], duration=50, check_interval=10)
+    assert (result.probes, result.logins, result.login_failures, result.outages) == (5, 1, 0, 1)
+    assert result.downtime_s == pytest.approx(5.12)
+    assert result.virtual_s == pytest.approx(50, abs=0.2)
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from app.singleflight import CACHED, JOINED, SingleFlight, new_login_flights
+
+
+def test_concurrent_callers_share_one_run():
+    flights = SingleFlight(ttl=0)
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return "ok"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("k", slow))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(results, key=lambda r: r[1] or "") == [("ok", None)] + [("ok", JOINED)] * 4
+    assert flights.do("k", lambda: "again") == ("again", None)  # ttl 0: nothing kept
+
+
+def test_results_expire_on_the_instance_clock():
+    now = [0.0]
+    flights = SingleFlight(ttl=2, clock=lambda: now[0])
+    assert flights.do("k", lambda: 1) == (1, None)
+    now[0] = 1.5
+    assert flights.do("k", lambda: 2) == (1, CACHED)
+    now[0] = 3.6
+    assert flights.do("k", lambda: 3) == (3, None)
+
+
+def test_only_successes_are_cached():
+    flights = SingleFlight(ttl=60, cacheable=bool)
+    assert flights.do("k", lambda: False) == (False, None)
+    assert flights.do("k", lambda: True) == (True, None)
+    assert flights.do("k", lambda: False) == (True, CACHED)
+
+    def boom():
+        raise OSError("portal down")
+    with pytest.raises(OSError):
+        flights.do("other", boom)
+    assert flights.do("other", lambda: True) == (True, None)
+
+
+def test_login_flights_keep_successful_logins_only():
+    flights = new_login_flights(clock=lambda: 0.0)
+    failed = (False, "E2901", None)
+    assert flights.do("k", lambda: failed) == (failed, None)
+    assert flights.do("k", lambda: (True, "", None)) == ((True, "", None), None)
+    flights.forget("k")
+    assert flights.do("k", lambda: failed) == (failed, None)
+
+
+def test_client_detects_its_ip_once_per_tick(monkeypatch):
+    from app import client as client_module
+
+    lookups = []
+    monkeypatch.setattr(client_module, "get_local_ip", lambda: lookups.append(1) or "10.0.0.2")
+    c = client_module.SZUNetworkClient()
+    c.login_flights = SingleFlight(ttl=0)
+    c._login_once = lambda: (False, "", None)
+    c.login()
+    c.login()
+    assert c._login_key()[-1] == "10.0.0.2"
+    assert len(lookups) == 1
+    c._tick_ip = None  # What keep_alive does at the start of every tick
+    c.login()
+    assert len(lookups) == 2
+
+
+def test_profile_logins_bypass_the_flight():
+    from app.client import SZUNetworkClient
+
+    c = SZUNetworkClient()
+    c.login_flights = SingleFlight(ttl=60, cacheable=lambda result: bool(result[0]))
+    runs = []
+    c._login_once = lambda: runs.append(1) or (True, "", None)
+    c.login()
+    c.login()
+    assert len(runs) == 1  # Second call reused the cached success
+    c.login(coalesce=False)
+    c.login(coalesce=False)
+    assert len(runs) == 3
@@ -0,0 +1,74 @@
+import time
+
+from app.client import SZUNetworkClient
+from app.snapshot import SnapshotKeeper, StateSnapshot, load_snapshot, save_snapshot
+
+
+def make_client(probe_results):
+    client = SZUNetworkClient()
+    results = iter(probe_results)
+    client.probe = lambda: next(results)
+    client.logins = 0
+
+    def login():
+        client.logins += 1
+        return True
+    client.login = login
+    return client
+
+
+def write(path, client, age, **fields):
+    from app.config import settings
+    save_snapshot(path, StateSnapshot(saved_at=time.time() - age, username=client.username,
+                                      zone=settings.NETWORK_ZONE, **fields))
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "state.json"
+    save_snapshot(path, StateSnapshot(saved_at=1.0, username="u", dns={"h": ["1.2.3.4"]}))
+    assert load_snapshot(path).dns == {"h": ["1.2.3.4"]}
+    path.write_text('{"version": 99}')
+    assert load_snapshot(path) is None
+
+
+def test_fresh_online_snapshot_still_probes_on_the_first_tick(tmp_path):
+    path = tmp_path / "state.json"
+    client = make_client([False])
+    write(path, client, age=5, online=True, probe_latency_ms={"probe": 12.0})
+
+    keeper = SnapshotKeeper(client, path)
+    restored = keeper.restore(max_age=120)
+    assert restored.probe_latency_ms == {"probe": 12.0}
+    assert keeper.last_known()["online"] is True
+
+    client._check_and_login()  # The session expired while we were down: probe, then log in
+    assert client.state.state.online is False
+    assert client.logins == 1
+
+
+def test_old_snapshot_drops_latency_baselines(tmp_path):
+    path = tmp_path / "state.json"
+    client = make_client([])
+    write(path, client, age=3600, online=True, login_failures=2, probe_latency_ms={"probe": 12.0})
+    keeper = SnapshotKeeper(client, path)
+    restored = keeper.restore(max_age=120)
+    assert restored.probe_latency_ms == {}
+    assert keeper.last_known() is None
+    assert client.login_failures == 2
+
+
+def test_snapshot_for_another_account_is_ignored(tmp_path):
+    path = tmp_path / "state.json"
+    client = make_client([])
+    save_snapshot(path, StateSnapshot(saved_at=time.time(), username="someone-else"))
+    assert SnapshotKeeper(client, path).restore(max_age=120) is None
+
+
+def test_last_known_reports_the_current_probe_baseline(tmp_path):
+    path = tmp_path / "state.json"
+    client = make_client([])
+    client.probe.test_url = "http://probe"
+    write(path, client, age=5, online=True, last_probe=100.0, probe_latency_ms={"http://probe": 12.0})
+    keeper = SnapshotKeeper(client, path)
+    keeper.restore(max_age=120)
+    assert keeper.last_known() == {"online": True, "last_probe": 100.0, "last_login": 0.0, "probe_latency_ms": 12.0}
@@ -0,0 +1,36 @@
+import pytest
+
+from app.state import StateStore
+
+
+def test_only_real_transitions_are_published():
+    store = StateStore()
+    seen = []
+    store.subscribe(lambda state, changed: seen.append(changed))
+    assert store.update(online=True, last_probe=1.0) == {"online", "last_probe"}
+    assert store.update(online=True) == set()
+    assert seen == [{"online", "last_probe"}]
+    assert store.published == 1
+
+
+def test_field_filter_and_unsubscribe():
+    store = StateStore()
+    seen = []
+    unsubscribe = store.subscribe(lambda state, changed: seen.append(state.online), fields=("online",))
+    store.update(last_probe=5.0)
+    store.update(online=False)
+    unsubscribe()
+    store.update(online=True)
+    assert seen == [False]
+
+
+def test_broken_subscriber_does_not_break_updates():
+    store = StateStore()
+    store.subscribe(lambda state, changed: 1 / 0)
+    assert store.update(running=True) == {"running"}
+    assert store.state.running
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(AttributeError):
+        StateStore().update(onlien=True)
@@ -0,0 +1,55 @@
+import pytest
+
+from app.timeseries import RingSeries, TimeSeriesStore, sparkline
+
+
+def test_ring_consolidates_and_recycles_slots():
+    ring = RingSeries(step=60, slots=3)
+    ring.add(0, 10)
+    ring.add(30, 20)
+    ring.add(60, 5)
+    view = ring.window(now=90, points=2)
+    assert view["start"] == 0 and view["step"] == 60
+    assert view["mean"] == [15.0, 5.0]
+    assert view["max"] == [20.0, 5.0]
+    assert view["count"] == [2, 1]
+
+    ring.add(180, 7)  # Bucket 3 reuses slot 0
+    assert ring.window(now=180, points=3)["mean"] == [5.0, None, 7.0]
+    assert len(ring.window(now=180, points=10)["mean"]) == 3  # Never more than the ring holds
+
+
+def test_store_feeds_every_resolution_from_hooks():
+    now = [1000.0]
+    store = TimeSeriesStore(clock=lambda: now[0])
+    store.on_probe(True, 12.0)
+    store.on_probe(False, 3000.0)
+    store.on_login(True, 250.0, "")
+
+    minute = store.window("minute", points=1)
+    assert minute["probe_ms"]["mean"] == [12.0]        # Failed probes carry no latency
+    assert minute["probe_fail"]["mean"] == [0.5]
+    assert minute["login_ms"]["count"] == [1]
+    assert store.window("hour", points=1)["probe_fail"]["count"] == [2]
+
+    now[0] += 3600 * 24
+    assert store.window("minute", points=1)["probe_ms"]["mean"] == [None]
+
+
+def test_unknown_resolution_is_rejected():
+    with pytest.raises(ValueError):
+        TimeSeriesStore().window("week")
+
+
+def test_footprint_is_fixed():
+    store = TimeSeriesStore(clock=lambda: 0.0)
+    size = store.nbytes
+    for i in range(1000):
+        store.add("probe_ms", float(i), ts=float(i))
+    assert store.nbytes == size
+
+
+def test_sparkline():
+    assert sparkline([]) == ""
+    assert sparkline([None, None]) == "  "
+    assert sparkline([0, None, 10]) == "▁ █"
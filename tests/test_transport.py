@@ -0,0 +1,111 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.transport import HTTPStatusError, StdlibTransport, TransportError
+
+BIG = b"x" * 200_000
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections.append(self.connection)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b"", **headers):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/ok":
+            self._reply(200, b"hello " + self.path.encode())
+        elif path == "/big":
+            self._reply(200, BIG)
+        elif path == "/redirect":
+            self._reply(302, b"moved", Location="/ok")
+        elif path == "/loop":
+            self._reply(302, Location="/loop")
+        else:
+            self._reply(404, b"not found")
+
+    do_HEAD = do_GET
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    httpd.connections = []
+    threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def transport():
+    t = StdlibTransport()
+    yield t
+    t.close()
+
+
+def fetch(transport, url, **kwargs):
+    resp = transport.get(url, **kwargs)
+    try:
+        return resp.status_code, resp.content
+    finally:
+        resp.close()
+
+
+def test_fully_read_replies_reuse_one_connection(server, transport):
+    for i in range(3):
+        assert fetch(transport, server.url + "/ok", params={"n": i}) == (200, f"hello /ok?n={i}".encode())
+    assert len(server.connections) == 1
+
+
+def test_half_read_reply_discards_its_connection(server, transport):
+    resp = transport.get(server.url + "/big")
+    assert len(next(resp.iter_content(512))) <= 512
+    resp.close()  # Rest of the body still on the wire: must not go back to the pool
+    assert fetch(transport, server.url + "/ok") == (200, b"hello /ok")
+    assert len(server.connections) == 2
+
+
+def test_stale_keep_alive_connection_is_retried_once(server, transport):
+    assert fetch(transport, server.url + "/ok")[0] == 200
+    for conn in server.connections:
+        conn.shutdown(socket.SHUT_RDWR)  # Server drops the idle connection behind our back
+    assert fetch(transport, server.url + "/ok") == (200, b"hello /ok")
+    assert len(server.connections) == 2
+
+
+def test_raise_for_status(server, transport):
+    resp = transport.get(server.url + "/missing")
+    with pytest.raises(HTTPStatusError, match="404"):
+        resp.raise_for_status()
+    ok = transport.get(server.url + "/ok")
+    ok.raise_for_status()
+    ok.close()
+
+
+def test_get_follows_redirects_and_head_does_not(server, transport):
+    assert fetch(transport, server.url + "/redirect") == (200, b"hello /ok")
+    assert fetch(transport, server.url + "/redirect", allow_redirects=False)[0] == 302
+    assert transport.head(server.url + "/redirect").status_code == 302
+    assert transport.head(server.url + "/redirect", allow_redirects=True).status_code == 200
+    with pytest.raises(TransportError, match="redirects"):
+        transport.get(server.url + "/loop")